@@ -5,8 +5,10 @@ from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 
 from .database import engine, Base
-from .routes import analysis, auth, users, history, stats, paddle, admin
+from .routes import analysis, auth, users, history, stats, paddle, admin, dictionaries, live, results, jobs
 from .glitchtip import init_glitchtip
+from .services.global_stats import global_counters
+from .services.history_writer import history_writer
 from .middleware.rate_limiter import api_rate_limit_middleware, analysis_rate_limit_middleware, auth_rate_limit_middleware
 
 load_dotenv("/app/.env")
@@ -48,8 +50,23 @@ app.include_router(history.router, prefix="/api/history", tags=["history"])
 app.include_router(stats.router, prefix="/api/stats", tags=["stats"])
 app.include_router(paddle.router, prefix="/api/paddle", tags=["paddle"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(dictionaries.router, prefix="/api/dictionaries", tags=["dictionaries"])
+app.include_router(live.router, prefix="/api/live", tags=["live"])
+app.include_router(results.router, prefix="/api/results", tags=["results"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
 # app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])  # Analytics route not yet implemented
 
+@app.on_event("startup")
+def start_background_writers():
+    history_writer.start()
+    global_counters.start()
+
+@app.on_event("shutdown")
+def stop_background_writers():
+    # Write out history and stats still queued before the process exits
+    history_writer.stop()
+    global_counters.stop()
+
 @app.get("/")
 def read_root():
     return {"message": "DashAway Backend is running"}
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, DateTime, JSON, ForeignKey
+from ..database import Base
+from datetime import datetime
+
+class CustomDictionary(Base):
+    __tablename__ = "custom_dictionaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False, index=True)
+    entries = Column(JSON, nullable=False, default=dict)  # {phrase: [suggestions]}
+    version = Column(Integer, nullable=False, default=1)  # Bumped on every edit; part of the matcher cache key
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
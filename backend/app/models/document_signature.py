@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, BigInteger, LargeBinary, ForeignKey, Index
+from ..database import Base
+
+class DocumentSignature(Base):
+    __tablename__ = "document_signatures"
+
+    history_id = Column(Integer, ForeignKey("document_history.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    signature = Column(LargeBinary, nullable=False)  # MinHash signature, NUM_PERM little-endian uint32s
+
+
+class DocumentBand(Base):
+    """One LSH bucket per signature band; documents sharing a bucket are near-duplicate candidates."""
+    __tablename__ = "document_lsh_bands"
+
+    id = Column(Integer, primary_key=True, index=True)
+    history_id = Column(Integer, ForeignKey("document_history.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    bucket = Column(BigInteger, nullable=False)  # Hash of (band index, band values)
+
+    __table_args__ = (Index("ix_document_lsh_bands_user_bucket", "user_id", "bucket"),)
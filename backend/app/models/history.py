@@ -10,6 +10,8 @@ class DocumentHistory(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     original_text = Column(Text, nullable=False)
     cleaned_text = Column(Text, nullable=False)
+    issue_counts = Column(JSON, nullable=True)  # Hits per issue type when the document was analyzed
+    history_key = Column(String(32), unique=True, index=True, nullable=True)  # Returned by /process before the entry is written
     created_at = Column(String, default=lambda: datetime.utcnow().isoformat())
 
     # user = relationship("User", back_populates="history")
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, LargeBinary, ForeignKey
+from ..database import Base
+from datetime import datetime
+
+class IgnoreList(Base):
+    __tablename__ = "ignore_lists"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False, index=True)
+    phrases = Column(JSON, nullable=False, default=list)  # Source of truth, used to rebuild the bitset
+    bitset = Column(LargeBinary, nullable=True)  # Bitset over global phrase IDs
+    lexicon_version = Column(String(32), nullable=True)  # Lexicon the bitset was built against
+    version = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,22 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from ..database import SessionLocal
-from ..services.segmenter import segment_text
-from ..models.stats import GlobalStats
+from ..services.segmenter import segment_text, segment_texts
+from ..services.detectors import AnalysisContext, resolve_checks
+from ..services.admission import TIERS, Overloaded, analysis_limiter
+from ..services.cancellation import CancelToken, Cancelled
+from ..services.diff import diff_documents
+from ..services.global_stats import global_counters
+from ..services.history_writer import history_writer
+from ..services.heatmap import readability_summary
+from ..services.readability import grade, text_counts
+from ..services.lexicon import LEXICON_VERSION
+from ..services.incremental import LOCAL_CHECKS
+from ..services.user_lexicon import get_user_matcher, get_ignore_mask
+from ..services.replacements import Replacement, apply_replacements
+from ..services.result_store import save_result
+from ..services.similarity import index_document, minhash, remove_document, similar_documents
+from ..services.singleflight import SingleFlight
+from ..services import metrics
+from ..utils.cache import LRUCache
 from ..models.history import DocumentHistory
 from ..models.subscription import Subscription
 from ..auth.supabase_auth import get_current_user_supabase, get_current_user_optional_supabase
 from ..models.user import User
 from ..models.feedback import Feedback
 from ..models.faq import FAQ
+import asyncio
+import hashlib
+import os
 import random
 import re
+import time
 import textstat
 import nltk
 from nltk.corpus import wordnet
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from ..data.ai_tells import AI_TELLS
 from ..data.ai_tell_suggestions import AI_TELL_SUGGESTIONS
 from ..data.cliches import CLICHES
@@ -30,10 +51,65 @@ router = APIRouter()
 class TextProcessRequest(BaseModel):
     text: str
 
+class BatchProcessRequest(BaseModel):
+    texts: List[str]
+
+# Batch analysis is a Pro feature; each document keeps the Pro per-text limit
+MAX_BATCH_DOCUMENTS = 50
+MAX_BATCH_CHARS = 2000000
+
+class ReplacementItem(BaseModel):
+    start: int
+    end: int
+    replacement: str
+    original: Optional[str] = None
+
+class ApplyRequest(BaseModel):
+    text: str
+    replacements: List[ReplacementItem]
+    history_id: Optional[int] = None
+    history_key: Optional[str] = None  # From /process, whose history entry may still be queued
+
+# Text length limits per tier
+PRO_MAX_CHARS = 500000
+FREE_MAX_CHARS = 15000
+
+# Last tier seen per user, used to pick the admission lane before the tier check finishes
+_tier_hints = LRUCache(4096)
+
+# Time budget per /process request; past it the analysis returns what it has finished
+ANALYSIS_BUDGET_SECONDS = {
+    "pro": float(os.getenv("ANALYSIS_BUDGET_PRO", "20")),
+    "basic": float(os.getenv("ANALYSIS_BUDGET_BASIC", "8")),
+    "anonymous": float(os.getenv("ANALYSIS_BUDGET_ANONYMOUS", "5")),
+}
+
+# How often a running /process request checks whether its client is still there
+DISCONNECT_POLL_SECONDS = 0.25
+
+MAX_APPLY_CHARS = 500000
+MAX_REPLACEMENTS = 100000
+
+class DiffRequest(BaseModel):
+    before: str
+    after: str
+
 class FeedbackRequest(BaseModel):
     feedback_type: str
     content: str
 
+_analysis_flight = SingleFlight()
+
+def analysis_key(text: str, checks: Optional[List[str]], ignore_mask: int, custom_matcher, tier: str) -> tuple:
+    """
+    Identity of an analysis: same text, checks, lexicon and user dictionaries give the
+    same result. The tier is part of it too, since it picks the admission lane and the
+    time budget; a Pro request never waits on an anonymous one's lane or deadline.
+    """
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    # Custom matchers are cached per dictionary version, so the object identifies the dictionary
+    return (digest, tuple(checks) if checks is not None else None, ignore_mask, id(custom_matcher), LEXICON_VERSION, tier)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -64,45 +140,304 @@ def test_auth(http_request: Request, current_user: Optional[User] = Depends(get_
     return debug_info
 
 @router.post("/process")
-def process_text(request: TextProcessRequest, http_request: Request, response: Response, db: Session = Depends(get_db), current_user: Optional[User] = Depends(get_current_user_optional_supabase)):
+async def process_text(request: TextProcessRequest, http_request: Request, response: Response, background_tasks: BackgroundTasks, checks: Optional[str] = None, store: bool = False, db: Session = Depends(get_db), current_user: Optional[User] = Depends(get_current_user_optional_supabase)):
+    # The analysis runs in the threadpool; if the client goes away meanwhile, the token
+    # takes it out of the admission queue or stops it between detectors
+    cancel = CancelToken()
+    watcher = asyncio.create_task(watch_disconnect(http_request, cancel))
+    try:
+        return await _process_text(request, http_request, response, background_tasks, checks, store, db, current_user, cancel)
+    finally:
+        watcher.cancel()
+
+async def _process_text(request: TextProcessRequest, http_request: Request, response: Response, background_tasks: BackgroundTasks, checks: Optional[str], store: bool, db: Session, current_user: Optional[User], cancel: CancelToken):
+    started = time.monotonic()
+    analysis = None
+    try:
+        # Optional comma-separated detector selection, e.g. ?checks=em_dash,readability
+        try:
+            selected_checks = resolve_checks(checks.split(",")) if checks else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        text = request.text
+        if len(text) > PRO_MAX_CHARS:
+            raise HTTPException(status_code=400, detail=f"Text too long. Maximum {PRO_MAX_CHARS:,} characters allowed.")
+
+        # Analysis starts before the tier and usage checks and runs alongside them. Until the
+        # tier is known, the admission lane and time budget come from the user's last known tier.
+        user_id = current_user.id if current_user else None
+        hinted_tier = (_tier_hints.get(user_id) or "basic") if current_user else "anonymous"
+        deadline = started + ANALYSIS_BUDGET_SECONDS[hinted_tier]
+        # The user's lexicon settings come from the request's session before the analysis
+        # starts, so the speculative analysis never needs a connection of its own
+        ignore_mask, custom_matcher = await run_in_threadpool(_user_lexicon, current_user, db)
+        analysis_tier = hinted_tier
+        if len(text) <= FREE_MAX_CHARS or hinted_tier == "pro":
+            analysis = asyncio.ensure_future(run_in_threadpool(
+                _analyze, text, ignore_mask, custom_matcher, hinted_tier, selected_checks, deadline, cancel))
+
+        user_tier = await run_in_threadpool(_authorize, current_user, len(text), http_request, response, db)
+        deadline = started + ANALYSIS_BUDGET_SECONDS[user_tier]
+
+        if analysis is None:
+            analysis_tier = user_tier
+            analysis = asyncio.ensure_future(run_in_threadpool(
+                _analyze, text, ignore_mask, custom_matcher, user_tier, selected_checks, deadline, cancel))
+        # A hint that undersold the tier (none cached yet, say) ran the analysis in a lower
+        # lane under a shorter budget; if that cost anything, the real tier gets its own run
+        upgraded = TIERS.index(user_tier) < TIERS.index(analysis_tier)
+        try:
+            result = await analysis
+        except HTTPException as e:
+            if not (upgraded and e.status_code == 503):
+                raise
+            result = None
+        if upgraded and (result is None or result.get("partial")):
+            metrics.increment("analysis.tier_rerun")
+            result = await run_in_threadpool(
+                _analyze, text, ignore_mask, custom_matcher, user_tier, selected_checks, deadline, cancel)
+        if custom_matcher is not None and user_tier != "pro":
+            # Custom dictionaries are a Pro feature; a lapsed subscription re-runs without one
+            result = await run_in_threadpool(
+                _analyze, text, ignore_mask, None, user_tier, selected_checks, deadline, cancel)
+        # Nobody to answer: skip usage, history and serializing the response
+        cancel.raise_if_cancelled()
+
+        return await run_in_threadpool(_finish_process, text, result, user_tier, current_user, store, response, background_tasks, db)
+    except HTTPException:
+        if analysis is not None and not analysis.done():
+            # Not authorized (or otherwise rejected): the speculative analysis is discarded
+            cancel.cancel()
+            analysis.add_done_callback(lambda future: future.cancelled() or future.exception())
+        db.rollback()
+        raise
+    except Cancelled:
+        db.rollback()
+        metrics.increment("analysis.cancelled")
+        # 499 is nginx's "client closed request"; nobody will read it
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except Exception as e:
+        print(f"DEBUG: Exception caught: {type(e).__name__}: {str(e)}")
+        db.rollback()
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _authorize(user: Optional[User], length: int, http_request: Request, response: Response, db: Session) -> str:
+    """Resolve the user's tier and enforce its size and usage limits; returns the tier."""
+    user_tier = get_user_tier(user, db)
+    if user is not None:
+        _tier_hints.set(user.id, user_tier)
+
+    max_chars = PRO_MAX_CHARS if user_tier == "pro" else FREE_MAX_CHARS
+    if length > max_chars:
+        raise HTTPException(status_code=400, detail=f"Text too long. Maximum {max_chars:,} characters allowed for {user_tier} users.")
+
+    can_use, error_message = check_usage_limits(user, user_tier, http_request, response)
+    if not can_use:
+        raise HTTPException(status_code=403, detail=error_message)
+    return user_tier
+
+def _user_lexicon(user: Optional[User], db: Session) -> tuple:
+    """The user's ignore mask and custom matcher (None without a dictionary)."""
+    return get_ignore_mask(user, db), get_user_matcher(user, db)
+
+def _analyze(text: str, ignore_mask: int, custom_matcher, tier: str, selected_checks: Optional[List[str]],
+             deadline: float, cancel: CancelToken) -> dict:
+    """Run (or join) the analysis; returns a copy of the result."""
+    # Identical requests already in flight (double clicks, client retries) wait for the
+    # same analysis instead of running their own
+    def analyze(shared_cancel):
+        # Analyses run through the admission limiter's per-tier lanes; past the queue
+        # bound the request is shed, anonymous and basic traffic before Pro. Shared work
+        # is only cancelled once every request waiting on it has gone.
+        with analysis_limiter.admit(tier, len(text), cancel=shared_cancel):
+            return segment_text(text, custom_matcher=custom_matcher, ignore_mask=ignore_mask,
+                                checks=selected_checks, deadline=deadline, cancel=shared_cancel)
+
+    key = analysis_key(text, selected_checks, ignore_mask, custom_matcher, tier)
+    try:
+        # Being shed is the leader's own outcome; a request waiting on it goes to admission itself
+        result, shared = _analysis_flight.do(key, analyze, cancel, retry_on=(Overloaded,))
+    except Overloaded as e:
+        raise server_busy(e)
+    if shared:
+        metrics.increment("analysis.coalesced")
+    # Each request annotates its own copy of the shared result
+    return dict(result)
+
+def _finish_process(text: str, result: dict, user_tier: str, user: Optional[User], store: bool,
+                    response: Response, background_tasks: BackgroundTasks, db: Session) -> dict:
+    """Usage accounting and response assembly; stats and history are written after the response."""
+    user_id = user.id if user else None
+    # Signed-in users keep history; point out earlier drafts of the same document
+    signature = minhash(text) if user else None
+    if user:
+        result["similar_documents"] = similar_documents(user_id, signature, db)
+
+    # Handle usage tracking based on user tier
+    if user_tier == "anonymous":
+        response.set_cookie("anonymous_used", "true", max_age=86400)
+    elif user_tier == "basic":
+        user.usage_count -= 1
+
+    db.commit()
+    print("DEBUG: Database committed")
+
+    # Basic and Pro users keep history. Queuing is a local write, so it happens now and the
+    # entry's key can be returned for /process/apply; the writer stores it in its next batch
+    if user:
+        try:
+            result["history_key"] = history_writer.enqueue(user_id, text, signature, counts=result.get("counts"))
+        except Exception as e:
+            print(f"DEBUG: Failed to queue history: {e}")
+    background_tasks.add_task(record_analysis, dict(result))
+
+    if store:
+        # Large documents: keep the segments server-side and let the client page them
+        # through /api/results/{id}/segments
+        result["result_id"] = save_result(text, result, user_id)
+        result["segment_count"] = len(result.pop("segments"))
+    return result
+
+def record_analysis(result: dict):
+    """Count a finished /process request in the global stats (runs after the response)."""
+    update_global_stats(result)
+
+@router.post("/process/batch")
+def process_batch(request: BatchProcessRequest, checks: Optional[str] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_supabase)):
+    """Analyze several documents in one call; ?checks=ai_score scores them all in one pass."""
+    try:
+        try:
+            selected_checks = resolve_checks(checks.split(",")) if checks else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if get_user_tier(current_user, db) != "pro":
+            raise HTTPException(status_code=403, detail="Batch analysis requires a Pro subscription.")
+
+        if not request.texts:
+            raise HTTPException(status_code=400, detail="No texts provided.")
+        if len(request.texts) > MAX_BATCH_DOCUMENTS:
+            raise HTTPException(status_code=400, detail=f"Too many documents. Maximum {MAX_BATCH_DOCUMENTS} per batch.")
+        if any(len(text) > 500000 for text in request.texts):
+            raise HTTPException(status_code=400, detail="Text too long. Maximum 500,000 characters allowed per document.")
+        if sum(len(text) for text in request.texts) > MAX_BATCH_CHARS:
+            raise HTTPException(status_code=400, detail=f"Batch too large. Maximum {MAX_BATCH_CHARS:,} characters in total.")
+
+        custom_matcher = get_user_matcher(current_user, db)
+        ignore_mask = get_ignore_mask(current_user, db)
+
+        try:
+            with analysis_limiter.admit("pro", sum(len(text) for text in request.texts)):
+                results = segment_texts(request.texts, custom_matcher=custom_matcher, ignore_mask=ignore_mask, checks=selected_checks)
+        except Overloaded as e:
+            raise server_busy(e)
+
+        # History goes through the write-behind spool, like /process; each result gets its entry's key
+        for text, result in zip(request.texts, results):
+            update_global_stats(result)
+            result["history_key"] = history_writer.enqueue(current_user.id, text, minhash(text), counts=result.get("counts"))
+
+        return {"results": results}
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        print(f"DEBUG: Exception caught: {type(e).__name__}: {str(e)}")
+        db.rollback()
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/process/apply")
+def apply_suggestions(request: ApplyRequest, db: Session = Depends(get_db), current_user: Optional[User] = Depends(get_current_user_optional_supabase)):
+    """
+    Build the cleaned document from chosen replacements. Offsets index the submitted
+    text (segment offsets are the running total of segment content lengths). With
+    history_id (or the history_key /process or /process/batch returned), the cleaned text is also
+    stored on that history entry.
+    """
+    if len(request.text) > MAX_APPLY_CHARS:
+        raise HTTPException(status_code=400, detail=f"Text too long. Maximum {MAX_APPLY_CHARS:,} characters allowed.")
+    if len(request.replacements) > MAX_REPLACEMENTS:
+        raise HTTPException(status_code=400, detail=f"Too many replacements. Maximum {MAX_REPLACEMENTS:,} allowed.")
+
+    try:
+        cleaned_text = apply_replacements(request.text, [
+            Replacement(r.start, r.end, r.replacement, r.original) for r in request.replacements
+        ])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if request.history_id is not None or request.history_key is not None:
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Sign in to update document history.")
+        # An entry /process queued moments ago may not have reached document_history yet
+        queued = None
+        if request.history_key is not None:
+            queued = history_writer.set_cleaned_text(request.history_key, current_user.id, request.text, cleaned_text)
+        if queued is False:
+            raise HTTPException(status_code=409, detail="Text does not match the saved document.")
+        if queued is None:
+            query = db.query(DocumentHistory).filter(DocumentHistory.user_id == current_user.id)
+            if request.history_id is not None:
+                query = query.filter(DocumentHistory.id == request.history_id)
+            else:
+                query = query.filter(DocumentHistory.history_key == request.history_key)
+            document = query.first()
+            if not document:
+                raise HTTPException(status_code=404, detail="Document not found")
+            if document.original_text != request.text:
+                raise HTTPException(status_code=409, detail="Text does not match the saved document.")
+            document.cleaned_text = cleaned_text
+            db.commit()
+
+    return {
+        "cleaned_text": cleaned_text,
+        "applied": len(request.replacements),
+        "history_id": request.history_id,
+        "history_key": request.history_key
+    }
+
+@router.post("/analyze/diff")
+def analyze_diff(request: DiffRequest, http_request: Request, response: Response, checks: Optional[str] = None, db: Session = Depends(get_db), current_user: Optional[User] = Depends(get_current_user_optional_supabase)):
+    """Compare two drafts: changed spans, added/removed issues and the readability delta."""
     try:
-        # Check text length limit based on user tier
+        try:
+            selected_checks = resolve_checks(checks.split(",")) if checks else list(LOCAL_CHECKS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        unsupported = [name for name in selected_checks if name not in LOCAL_CHECKS]
+        if unsupported:
+            raise HTTPException(status_code=400, detail=f"Check(s) not supported for diffs: {', '.join(unsupported)}. Available: {', '.join(LOCAL_CHECKS)}")
+
         user_tier = get_user_tier(current_user, db)
-        
-        if user_tier == "pro":
-            max_chars = 500000  # 500K for Pro users
-        else:
-            max_chars = 15000   # 15K for Free/Basic users
-            
-        if len(request.text) > max_chars:
+        max_chars = 500000 if user_tier == "pro" else 15000
+        if max(len(request.before), len(request.after)) > max_chars:
             raise HTTPException(status_code=400, detail=f"Text too long. Maximum {max_chars:,} characters allowed for {user_tier} users.")
-        
-        # Check usage limits
+
         can_use, error_message = check_usage_limits(current_user, user_tier, http_request, response)
-        
         if not can_use:
             raise HTTPException(status_code=403, detail=error_message)
-        
-        # Process the text
-        result = segment_text(request.text)
-        
-        # Update global stats
-        update_global_stats(result, db)
-        
-        # Handle usage tracking and history saving based on user tier
+
+        ignore_mask = get_ignore_mask(current_user, db)
+        try:
+            with analysis_limiter.admit(user_tier, len(request.before) + len(request.after)):
+                result = diff_documents(request.before, request.after, checks=selected_checks, ignore_mask=ignore_mask)
+        except Overloaded as e:
+            raise server_busy(e)
+
         if user_tier == "anonymous":
             response.set_cookie("anonymous_used", "true", max_age=86400)
         elif user_tier == "basic":
             current_user.usage_count -= 1
-            # Save to history for basic users
-            save_to_history(current_user, request.text, result, db)
-        elif user_tier == "pro":
-            # Save to history for pro users
-            save_to_history(current_user, request.text, result, db)
-        
         db.commit()
-        print("DEBUG: Database committed")
         return result
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         print(f"DEBUG: Exception caught: {type(e).__name__}: {str(e)}")
         db.rollback()
@@ -111,39 +446,37 @@ def process_text(request: TextProcessRequest, http_request: Request, response: R
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/readability")
-def get_readability(request: TextProcessRequest):
+def get_readability(request: TextProcessRequest, aggregate: bool = False):
+    """
+    Readability score with long sentences and complex words. With aggregate=true,
+    complex words come back once each with a count, and long sentences as start/end
+    offsets instead of their text, which keeps the response small for big documents.
+    """
     try:
         from ..services.segmenter import clean_text_for_readability
+        from ..services.structure import find_excluded_ranges, strip_excluded
         
         text = request.text
-        cleaned_text = clean_text_for_readability(text)
-        
-        # Use cleaned text for more accurate readability calculation
-        score = textstat.flesch_kincaid_grade(cleaned_text) if cleaned_text.strip() else 0.0
-        
-        # Debug information for readability calculation
-        sentences_count = textstat.sentence_count(cleaned_text)
-        words_count = textstat.lexicon_count(cleaned_text)
-        syllables_count = textstat.syllable_count(cleaned_text)
-        print(f"DEBUG - Readability calculation:")
-        print(f"  Original text length: {len(text)}")
-        print(f"  Cleaned text length: {len(cleaned_text)}")
-        print(f"  Sentences: {sentences_count}, Words: {words_count}, Syllables: {syllables_count}")
-        print(f"  FK Grade Level: {score}")
-        
-        # Manual FK calculation for verification
-        if sentences_count > 0 and words_count > 0:
-            manual_fk = 0.39 * (words_count / sentences_count) + 11.8 * (syllables_count / words_count) - 15.59
-            print(f"  Manual FK calculation: {manual_fk:.2f}")
-        print(f"  Cleaned text sample: {cleaned_text[:200]}...")
+        # One counts pass gives the grade /process reports (and, aggregated, the counts behind it)
+        counts = text_counts(text)
+        if aggregate:
+            ctx = AnalysisContext(text)
+            summary = readability_summary(ctx.tokens, ctx.sentences, counts)
+            summary["original_text_length"] = len(text)
+            return summary
+        score = grade(*counts)
+
+        # Code blocks, URLs and markup are not prose; keep them out of every readability figure
+        prose = strip_excluded(text, find_excluded_ranges(text))
+        cleaned_text = clean_text_for_readability(prose)
         
-        # Use original text for sentence analysis (to preserve user's actual content)
-        sentences = nltk.sent_tokenize(text)
+        # Use uncleaned prose for sentence analysis (to preserve user's actual content)
+        sentences = nltk.sent_tokenize(prose)
         long_sentences = [
             s for s in sentences if len(
                 nltk.word_tokenize(s)) > 20]
         complex_words = [
-            word for word in nltk.word_tokenize(text) if textstat.syllable_count(
+            word for word in nltk.word_tokenize(prose) if textstat.syllable_count(
                 word) >= 3 and word.isalpha()]
         
         return {
@@ -173,6 +506,19 @@ def get_faq(db: Session = Depends(get_db)):
     return db.query(FAQ).all()
 
 
+async def watch_disconnect(request: Request, cancel: CancelToken, interval: float = DISCONNECT_POLL_SECONDS):
+    """Cancel the token once the client has disconnected."""
+    while not await request.is_disconnected():
+        await asyncio.sleep(interval)
+    cancel.cancel()
+
+
+def server_busy(e: Overloaded) -> HTTPException:
+    """503 for a request the admission limiter shed, telling the client when to retry."""
+    return HTTPException(status_code=503, detail="The server is busy. Please try again shortly.",
+                         headers={"Retry-After": str(e.retry_after)})
+
+
 def get_user_tier(user: Optional[User], db: Session) -> str:
     """Determine user tier: anonymous, basic, or pro"""
     if not user:
@@ -216,38 +562,43 @@ def check_usage_limits(user: Optional[User], tier: str, request: Request, respon
 
 
 
-def save_to_history(user: User, text: str, result: dict, db: Session):
-    """Save document analysis to user history"""
+def save_to_history(user_id: int, text: str, result: dict, db: Session, signature=None):
+    """Save document analysis to user history, indexing its MinHash signature for near-duplicate lookup.
+    Returns the new entry's id, or None if saving failed."""
     try:
-        # Generate cleaned text from segments
-        cleaned_segments = result.get('segments', [])
-        cleaned_text = ''.join([seg.get('content', '') for seg in cleaned_segments])
-        
+        # Nothing is applied yet; /process/apply stores the real cleaned text
         history_entry = DocumentHistory(
-            user_id=user.id,
+            user_id=user_id,
             original_text=text,
-            cleaned_text=cleaned_text
+            cleaned_text=text,
+            issue_counts=result.get("counts")
         )
         db.add(history_entry)
-        print(f"DEBUG: Saved history entry for user {user.id}")
+        db.flush()  # Assigns history_entry.id
+        if signature is not None:
+            index_document(history_entry.id, user_id, signature, db)
+        print(f"DEBUG: Saved history entry for user {user_id}")
+        return history_entry.id
     except Exception as e:
         print(f"DEBUG: Failed to save history: {e}")
         # Don't fail the entire request if history saving fails
+        return None
 
 
-def update_global_stats(result: dict, db: Session):
-    """Update global statistics"""
-    stats = db.query(GlobalStats).first()
-    if not stats:
-        stats = GlobalStats()
-        db.add(stats)
-    
-    stats.total_texts_cleaned += 1
-    stats.total_em_dashes_found += len([s for s in result['segments'] if s['type'] == 'em_dash'])
-    stats.total_cliches_found += len([s for s in result['segments'] if s['type'] == 'cliche'])
-    stats.total_jargon_found += len([s for s in result['segments'] if s['type'] == 'jargon'])
-    stats.total_ai_tells_found += len([s for s in result['segments'] if s['type'] == 'ai_tell'])
-    stats.total_documents_processed += 1
+def update_global_stats(result: dict):
+    """Update global statistics (accumulated in memory and flushed to global_stats periodically)"""
+    # Per-type hit counts from the engine; no pass over the segments
+    counts = result.get("counts", {})
+    global_counters.add({
+        "total_texts_cleaned": 1,
+        "total_em_dashes_found": counts.get("em_dash", 0),
+        "total_cliches_found": counts.get("cliche", 0),
+        "total_jargon_found": counts.get("jargon", 0),
+        "total_ai_tells_found": counts.get("ai_tell", 0),
+        "total_documents_processed": 1,
+    })
+    for issue_type, count in counts.items():
+        metrics.increment(f"issues.{issue_type}", count)
 
 
 @router.get("/history")
@@ -284,6 +635,7 @@ def get_document_details(document_id: int, db: Session = Depends(get_db), curren
         "title": document.original_text[:50] + ("..." if len(document.original_text) > 50 else ""),  # Generate title from content
         "original_text": document.original_text,
         "cleaned_text": document.cleaned_text,
+        "issue_counts": document.issue_counts,
         "created_at": document.created_at.isoformat()
     }
 
@@ -299,6 +651,7 @@ def delete_document(document_id: int, db: Session = Depends(get_db), current_use
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
+    remove_document(document.id, db)
     db.delete(document)
     db.commit()
     
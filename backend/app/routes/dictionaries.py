@@ -0,0 +1,120 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import Dict, List
+
+from ..database import SessionLocal
+from ..models.dictionary import CustomDictionary
+from ..models.ignore_list import IgnoreList
+from ..models.user import User
+from ..auth.supabase_auth import get_current_user_supabase
+from ..services.user_lexicon import MAX_CUSTOM_PHRASES, MAX_PHRASE_LENGTH, build_ignore_bitset
+from ..services.lexicon import LEXICON_VERSION, ids_for_phrases
+from .analysis import get_user_tier
+
+router = APIRouter()
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+class DictionaryUpdateRequest(BaseModel):
+    entries: Dict[str, List[str]]  # phrase -> suggested replacements (may be empty)
+
+class IgnoreListUpdateRequest(BaseModel):
+    phrases: List[str]  # Built-in lexicon phrases that should never be flagged
+
+def serialize_dictionary(dictionary: CustomDictionary) -> dict:
+    return {
+        "entries": dictionary.entries or {},
+        "version": dictionary.version,
+        "updated_at": dictionary.updated_at.isoformat() if dictionary.updated_at else None
+    }
+
+@router.get("/")
+def get_dictionary(current_user: User = Depends(get_current_user_supabase), db: Session = Depends(get_db)):
+    """Get the current user's custom phrase dictionary"""
+    dictionary = db.query(CustomDictionary).filter(CustomDictionary.user_id == current_user.id).first()
+    if not dictionary:
+        return {"entries": {}, "version": 0, "updated_at": None}
+    return serialize_dictionary(dictionary)
+
+@router.put("/")
+def replace_dictionary(request: DictionaryUpdateRequest, current_user: User = Depends(get_current_user_supabase), db: Session = Depends(get_db)):
+    """Replace the current user's custom phrase dictionary (Pro only)"""
+    if get_user_tier(current_user, db) != "pro":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Custom dictionaries are available on the Pro plan."
+        )
+
+    if len(request.entries) > MAX_CUSTOM_PHRASES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many phrases. Maximum {MAX_CUSTOM_PHRASES:,} allowed."
+        )
+
+    entries = {}
+    for phrase, suggestions in request.entries.items():
+        phrase = phrase.strip()
+        if not phrase:
+            continue
+        if len(phrase) > MAX_PHRASE_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Phrase too long. Maximum {MAX_PHRASE_LENGTH} characters allowed."
+            )
+        entries[phrase] = [s for s in suggestions if s.strip()]
+
+    dictionary = db.query(CustomDictionary).filter(CustomDictionary.user_id == current_user.id).first()
+    if dictionary:
+        dictionary.entries = entries
+        dictionary.version += 1
+    else:
+        dictionary = CustomDictionary(user_id=current_user.id, entries=entries, version=1)
+        db.add(dictionary)
+
+    db.commit()
+    db.refresh(dictionary)
+    return serialize_dictionary(dictionary)
+
+@router.delete("/")
+def delete_dictionary(current_user: User = Depends(get_current_user_supabase), db: Session = Depends(get_db)):
+    """Delete the current user's custom phrase dictionary"""
+    dictionary = db.query(CustomDictionary).filter(CustomDictionary.user_id == current_user.id).first()
+    if not dictionary:
+        raise HTTPException(status_code=404, detail="Dictionary not found")
+
+    db.delete(dictionary)
+    db.commit()
+    return {"message": "Dictionary deleted successfully"}
+
+@router.get("/ignore")
+def get_ignore_list(current_user: User = Depends(get_current_user_supabase), db: Session = Depends(get_db)):
+    """Get the built-in phrases the current user has chosen to ignore"""
+    ignore_list = db.query(IgnoreList).filter(IgnoreList.user_id == current_user.id).first()
+    return {"phrases": ignore_list.phrases if ignore_list else []}
+
+@router.put("/ignore")
+def replace_ignore_list(request: IgnoreListUpdateRequest, current_user: User = Depends(get_current_user_supabase), db: Session = Depends(get_db)):
+    """Replace the current user's ignore list; only built-in lexicon phrases are kept"""
+    requested = list(dict.fromkeys(p.strip().lower() for p in request.phrases if p.strip()))
+    _, unmatched = ids_for_phrases(requested)
+    unmatched_set = set(unmatched)
+    phrases = [p for p in requested if p not in unmatched_set]
+
+    ignore_list = db.query(IgnoreList).filter(IgnoreList.user_id == current_user.id).first()
+    if not ignore_list:
+        ignore_list = IgnoreList(user_id=current_user.id, version=0)
+        db.add(ignore_list)
+
+    ignore_list.phrases = phrases
+    ignore_list.bitset = build_ignore_bitset(phrases)
+    ignore_list.lexicon_version = LEXICON_VERSION
+    ignore_list.version += 1
+
+    db.commit()
+    return {"phrases": phrases, "unmatched": unmatched}
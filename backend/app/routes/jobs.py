@@ -0,0 +1,152 @@
+import asyncio
+import json
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..auth.supabase_auth import get_current_user_optional_supabase, get_current_user_supabase
+from ..database import SessionLocal
+from ..models.user import User
+from ..services import jobs, metrics
+from ..services.detectors import resolve_checks
+from ..services.result_store import load_result
+from .analysis import get_user_tier
+
+router = APIRouter()
+
+MAX_CHARS = 500000
+# How often the event stream re-reads the job, and how often it sends a keep-alive comment
+EVENT_POLL_SECONDS = 0.5
+KEEPALIVE_SECONDS = 15
+
+
+class JobRequest(BaseModel):
+    text: str
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@router.post("")
+def create_job(request: JobRequest, checks: Optional[str] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_supabase)):
+    """Queue a document for background analysis (Pro). Follow it with GET /{job_id}/events."""
+    try:
+        selected_checks = resolve_checks(checks.split(",")) if checks else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if get_user_tier(current_user, db) != "pro":
+        raise HTTPException(status_code=403, detail="Background analysis requires a Pro subscription.")
+    if len(request.text) > MAX_CHARS:
+        raise HTTPException(status_code=400, detail=f"Text too long. Maximum {MAX_CHARS:,} characters allowed.")
+
+    job_id = jobs.enqueue(current_user.id, request.text, selected_checks)
+    metrics.increment("jobs.queued")
+    return {"job_id": job_id, "status": jobs.QUEUED}
+
+
+@router.get("/{job_id}")
+def get_job_status(job_id: str, current_user: User = Depends(get_current_user_supabase)):
+    """Status, progress (0-100) and, once done, the result id."""
+    return _public(_load_owned(job_id, current_user))
+
+
+@router.delete("/{job_id}")
+def cancel_job(job_id: str, current_user: User = Depends(get_current_user_supabase)):
+    """Cancel a queued or running job. A running job stops at its worker's next progress update."""
+    _load_owned(job_id, current_user)
+    if not jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    metrics.increment("jobs.cancel_requested")
+    return _public(jobs.get_job(job_id))
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str, current_user: User = Depends(get_current_user_supabase)):
+    """The full analysis result of a finished job. Large results can be paged via /api/results/{result_id}."""
+    job = _load_owned(job_id, current_user)
+    if job["status"] == jobs.FAILED:
+        raise HTTPException(status_code=500, detail=job["error"] or "Analysis failed")
+    if job["status"] == jobs.CANCELLED:
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    if job["status"] != jobs.DONE:
+        raise HTTPException(status_code=409, detail="Job has not finished yet")
+    stored = load_result(job["result_id"])
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Result has expired")
+    return {"result_id": job["result_id"], **stored.summary, "segments": stored.window(0, len(stored.text))}
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, request: Request, token: Optional[str] = None,
+                     current_user: Optional[User] = Depends(get_current_user_optional_supabase)):
+    """
+    Server-Sent Events with the job's progress. EventSource can't set headers, so the
+    token may also be passed as a query parameter. Each "progress" event carries the
+    status and percentage; the stream ends with a "done", "failed" or "cancelled" event.
+    """
+    if current_user is None and token:
+        current_user = await run_in_threadpool(_user_from_token, token)
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    _load_owned(job_id, current_user)
+
+    async def stream():
+        last = None
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            job = await run_in_threadpool(jobs.get_job, job_id)
+            if job is None:
+                return
+            state = (job["status"], job["progress"])
+            if state != last:
+                last, last_sent = state, time.monotonic()
+                event = job["status"] if job["status"] in jobs.FINISHED else "progress"
+                yield f"event: {event}\ndata: {json.dumps(_public(job))}\n\n"
+                if event != "progress":
+                    return
+            elif time.monotonic() - last_sent > KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+
+    # X-Accel-Buffering stops nginx from holding events back until its buffer fills
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _user_from_token(token: str) -> Optional[User]:
+    db = SessionLocal()
+    try:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        return get_current_user_optional_supabase(credentials, db)
+    finally:
+        db.close()
+
+
+def _load_owned(job_id: str, user: User) -> dict:
+    job = jobs.get_job(job_id)
+    if job is None or job["user_id"] != user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _public(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": round(job["progress"] * 100),
+        "result_id": job["result_id"],
+        "error": job["error"],
+    }
@@ -0,0 +1,115 @@
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+
+from ..auth.supabase_auth import get_current_user_optional_supabase
+from ..database import SessionLocal
+from ..services.detectors import resolve_checks
+from ..services.incremental import LOCAL_CHECKS
+from ..services.sessions import close_session, create_session, get_session
+from ..services.user_lexicon import get_ignore_mask
+from .analysis import get_user_tier
+
+router = APIRouter()
+
+MAX_CHARS = 500000
+
+
+def _authorize(token: Optional[str]) -> Optional[Tuple[int, int]]:
+    """The Pro user's id and ignore mask for a token, or None. Blocking; run it in the threadpool."""
+    db = SessionLocal()
+    try:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token) if token else None
+        user = get_current_user_optional_supabase(credentials, db) if credentials else None
+        if not user or get_user_tier(user, db) != "pro":
+            return None
+        return user.id, get_ignore_mask(user, db)
+    finally:
+        db.close()
+
+
+@router.websocket("/ws")
+async def live_analysis(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Live analysis over a WebSocket (Pro). Messages are JSON objects:
+
+    - {"type": "open", "text": ..., "checks": [...]} starts a session and replies with a snapshot
+    - {"type": "resume", "session_id": ...} reattaches to a session that hasn't been evicted
+    - {"type": "edit", "version": n, "start": s, "end": e, "text": t} replaces text[s:e] and
+      replies with {"type": "delta", "added": [...], "removed": [ids], "readability": ...}
+    - {"type": "close"} drops the session
+
+    Errors are {"type": "error", "code": ..., "detail": ...}; "stale_version" and
+    "session_expired" mean the client should send "open" again with its full text.
+    """
+    # Token verification and the tier lookup block, so they stay off the event loop
+    authorized = await run_in_threadpool(_authorize, token)
+    if authorized is None:
+        await websocket.close(code=4403)
+        return
+    user_id, ignore_mask = authorized
+
+    await websocket.accept()
+    session = None
+
+    async def error(code: str, detail: str):
+        await websocket.send_json({"type": "error", "code": code, "detail": detail})
+
+    while True:
+        try:
+            message = await websocket.receive_json()
+        except WebSocketDisconnect:
+            break
+        except ValueError:
+            await error("bad_message", "Messages must be JSON objects")
+            continue
+        if not isinstance(message, dict):
+            await error("bad_message", "Messages must be JSON objects")
+            continue
+
+        kind = message.get("type")
+        try:
+            if kind == "open":
+                text = message.get("text", "")
+                checks = resolve_checks(message["checks"]) if message.get("checks") else list(LOCAL_CHECKS)
+                unsupported = [name for name in checks if name not in LOCAL_CHECKS]
+                if not isinstance(text, str) or unsupported:
+                    await error("bad_message", f"Live sessions support text with checks: {', '.join(LOCAL_CHECKS)}")
+                    continue
+                if session is not None:
+                    close_session(session.id)
+                session = await run_in_threadpool(create_session, user_id, text, checks, ignore_mask, MAX_CHARS)
+                await websocket.send_json(await run_in_threadpool(session.snapshot))
+
+            elif kind == "resume":
+                resumed = get_session(message.get("session_id"), user_id)
+                if resumed is None:
+                    await error("session_expired", "Session not found; open a new one")
+                    continue
+                session = resumed
+                await websocket.send_json(await run_in_threadpool(session.snapshot))
+
+            elif kind == "edit":
+                if session is None:
+                    await error("no_session", "Open a session before sending edits")
+                    continue
+                if message.get("version") != session.version:
+                    await error("stale_version", f"Session is at version {session.version}")
+                    continue
+                reply = await run_in_threadpool(
+                    session.apply_edit, int(message["start"]), int(message["end"]), str(message.get("text", ""))
+                )
+                await websocket.send_json(reply)
+
+            elif kind == "close":
+                if session is not None:
+                    close_session(session.id)
+                    session = None
+                await websocket.send_json({"type": "closed"})
+
+            else:
+                await error("bad_message", f"Unknown message type: {kind}")
+        except (KeyError, TypeError, ValueError) as e:
+            await error("bad_edit", str(e))
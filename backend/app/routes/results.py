@@ -0,0 +1,67 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..auth.supabase_auth import get_current_user_optional_supabase
+from ..models.user import User
+from ..services.result_store import load_result
+
+router = APIRouter()
+
+# Upper bound on one window, so a client can't page the whole document in one request
+MAX_WINDOW_CHARS = 50000
+
+
+@router.get("/{result_id}")
+def get_result_summary(result_id: str, current_user: Optional[User] = Depends(get_current_user_optional_supabase)):
+    """Everything about a stored result except its segments."""
+    stored = _load_owned(result_id, current_user)
+    return {
+        "result_id": result_id,
+        "text_length": len(stored.text),
+        "segment_count": len(stored.starts),
+        "paragraph_starts": stored.paragraphs,
+        **stored.summary
+    }
+
+
+@router.get("/{result_id}/segments")
+def get_result_segments(result_id: str, start: Optional[int] = None, end: Optional[int] = None,
+                        paragraph_start: Optional[int] = None, paragraph_end: Optional[int] = None,
+                        current_user: Optional[User] = Depends(get_current_user_optional_supabase)):
+    """
+    Segments overlapping a character range [start, end) or a paragraph range
+    [paragraph_start, paragraph_end), clipped to the range. Each segment carries
+    its clipped start/end and the full segment's segment_start/segment_end.
+    """
+    stored = _load_owned(result_id, current_user)
+
+    if paragraph_start is not None or paragraph_end is not None:
+        if start is not None or end is not None:
+            raise HTTPException(status_code=400, detail="Use either a character range or a paragraph range, not both.")
+        first = paragraph_start or 0
+        last = paragraph_end if paragraph_end is not None else len(stored.paragraphs)
+        start, end = stored.paragraph_range(first, last)
+    else:
+        start = start or 0
+        end = end if end is not None else len(stored.text)
+    start, end = max(start, 0), min(end, len(stored.text))
+
+    if end - start > MAX_WINDOW_CHARS:
+        raise HTTPException(status_code=400, detail=f"Range too large. Maximum {MAX_WINDOW_CHARS:,} characters per request.")
+
+    return {
+        "result_id": result_id,
+        "start": start,
+        "end": end,
+        "text_length": len(stored.text),
+        "segment_count": len(stored.starts),
+        "segments": stored.window(start, end)
+    }
+
+
+def _load_owned(result_id: str, user: Optional[User]):
+    stored = load_result(result_id)
+    if stored is None or (stored.owner_id is not None and (user is None or user.id != stored.owner_id)):
+        raise HTTPException(status_code=404, detail="Result not found")
+    return stored
@@ -4,6 +4,9 @@ from sqlalchemy.orm import Session
 from ..schemas import stats as stats_schema
 from ..database import SessionLocal
 from ..models.stats import GlobalStats
+from ..services import metrics
+from ..services.admission import analysis_limiter
+from ..services.global_stats import FIELDS, global_counters
 
 router = APIRouter()
 
@@ -22,4 +25,14 @@ def read_global_stats(db: Session = Depends(get_db)):
         db.add(stats)
         db.commit()
         db.refresh(stats)
-    return stats
+    # Include this process's counts that haven't been flushed yet
+    pending = global_counters.pending()
+    return {
+        "id": stats.id,
+        **{field: (getattr(stats, field) or 0) + pending[field] for field in FIELDS},
+    }
+
+@router.get("/engine")
+def read_engine_metrics():
+    """Per-process analysis engine counters, per-detector timing summaries and admission state"""
+    return {**metrics.snapshot(), "admission": analysis_limiter.snapshot()}
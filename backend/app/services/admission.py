@@ -0,0 +1,237 @@
+"""
+Adaptive admission control and priority lanes for analyses.
+
+At most `limit` analyses run at once; further requests wait in a bounded
+queue with one lane per tier. Each lane may only be joined while the
+whole queue is shorter than that tier's bound, so under overload
+anonymous traffic is turned away first and Pro last. A request that
+can't queue, or waits too long, is shed with Overloaded, whose
+retry_after estimates when a slot will free.
+
+Freed slots are shared between lanes by weight (stride scheduling): each
+grant advances the lane's pass by 1/weight and the non-empty lane with
+the lowest pass goes next, so with weights 6:3:1 a backlog in every lane
+is served in that ratio. A lane that was idle rejoins at the current
+pass rather than with banked credit. As starvation protection, a request
+that has waited STARVATION_SECONDS goes next whatever its lane. Queue
+waits are recorded per lane.
+
+The limit follows AIMD on observed latency. Analysis time grows with
+document size, so each sample is normalized per 10K characters and
+compared with a slowly adapting baseline. A sample well above the
+baseline means the box is saturated and the limit is cut
+multiplicatively (at most once per typical request duration). Otherwise,
+if the limit was actually reached, it grows by 1/limit, about one slot
+per limit's worth of completions.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+from . import metrics
+from .cancellation import CancelToken, Cancelled
+
+TIERS = ("pro", "basic", "anonymous")
+QUEUE_LIMITS = {"pro": 16, "basic": 8, "anonymous": 4}
+MAX_WAIT_SECONDS = 10.0
+STARVATION_SECONDS = 3.0
+# How often a queued request checks whether its client has gone
+_CANCEL_POLL = 0.1
+# Recent waits kept per lane for the percentiles in snapshot()
+_WAIT_WINDOW = 512
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    """Lane weights from "pro:6,basic:3,anonymous:1"; unlisted lanes get weight 1."""
+    weights = {tier: 1.0 for tier in TIERS}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        tier, _, weight = item.partition(":")
+        if tier in weights and float(weight) > 0:
+            weights[tier] = float(weight)
+    return weights
+
+
+LANE_WEIGHTS = _parse_weights(os.getenv("ADMISSION_LANE_WEIGHTS", "pro:6,basic:3,anonymous:1"))
+
+INITIAL_LIMIT = 2.0
+MIN_LIMIT = 1.0
+MAX_LIMIT = 8.0
+BACKOFF = 0.75
+# A normalized latency this many times the baseline counts as congestion
+TOLERANCE = 2.0
+# How fast the baseline follows slower samples (it drops to faster ones at once)
+BASELINE_DRIFT = 0.01
+LATENCY_SMOOTHING = 0.1
+_SIZE_UNIT = 10000
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("event", "granted", "queued_at")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.queued_at = time.monotonic()
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 1)
+
+
+class AdmissionLimiter:
+    def __init__(self, initial_limit: float = INITIAL_LIMIT, min_limit: float = MIN_LIMIT,
+                 max_limit: float = MAX_LIMIT, max_wait: float = MAX_WAIT_SECONDS,
+                 weights: Optional[Dict[str, float]] = None, starvation: float = STARVATION_SECONDS):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_wait = max_wait
+        self.weights = dict(weights or LANE_WEIGHTS)
+        self.starvation = starvation
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Waiter]] = {tier: deque() for tier in TIERS}
+        self._pass: Dict[str, float] = {tier: 0.0 for tier in TIERS}
+        self._waits: Dict[str, Deque[float]] = {tier: deque(maxlen=_WAIT_WINDOW) for tier in TIERS}
+        self._baseline = None  # ms per size unit
+        self._latency_ms = 1000.0  # smoothed raw latency, for Retry-After
+        self._last_decrease = 0.0
+
+    @contextmanager
+    def admit(self, tier: str, size: int, cancel: Optional[CancelToken] = None):
+        """
+        Hold a slot for the duration of the block. Raises Overloaded when shedding,
+        and Cancelled if cancel is cancelled while the request is still queued.
+        """
+        self._acquire(tier, cancel)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(time.perf_counter() - start, size)
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _acquire(self, tier: str, cancel: Optional[CancelToken] = None) -> float:
+        tier = tier if tier in self._queues else "anonymous"
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self.queued():
+                self.in_flight += 1
+                self._record_wait(tier, 0.0)
+                return 0.0
+            if self.queued() >= QUEUE_LIMITS[tier]:
+                raise self._shed(tier, "queue_full")
+            if not self._queues[tier]:
+                # An idle lane rejoins at the current pass instead of spending credit it banked while idle
+                active = [self._pass[t] for t, queue in self._queues.items() if queue]
+                self._pass[tier] = max(self._pass[tier], min(active, default=self._pass[tier]))
+            waiter = _Waiter()
+            self._queues[tier].append(waiter)
+
+        give_up = waiter.queued_at + self.max_wait
+        while not waiter.event.wait(min(_CANCEL_POLL, max(give_up - time.monotonic(), 0))):
+            if time.monotonic() >= give_up or (cancel is not None and cancel.is_cancelled()):
+                break
+        with self._lock:
+            waited = time.monotonic() - waiter.queued_at
+            if waiter.granted:
+                self._record_wait(tier, waited)
+                return waited
+            self._queues[tier].remove(waiter)
+            self._record_wait(tier, waited)
+            if cancel is not None and cancel.is_cancelled():
+                metrics.increment(f"admission.cancelled.{tier}")
+                raise Cancelled()
+            raise self._shed(tier, "timeout")
+
+    def _record_wait(self, tier: str, seconds: float) -> None:
+        self._waits[tier].append(seconds * 1000)
+        metrics.record_timing("admission.wait", seconds * 1000)
+        metrics.record_timing(f"admission.wait.{tier}", seconds * 1000)
+
+    def _release(self, elapsed: float, size: int) -> None:
+        with self._lock:
+            saturated = self.in_flight >= int(self.limit) or self.queued() > 0
+            self.in_flight -= 1
+            self._update_limit(elapsed, size, saturated)
+            self._grant()
+
+    def _update_limit(self, elapsed: float, size: int, saturated: bool) -> None:
+        ms = elapsed * 1000
+        self._latency_ms += (ms - self._latency_ms) * LATENCY_SMOOTHING
+        sample = ms / max(size / _SIZE_UNIT, 1.0)
+        if self._baseline is None or sample < self._baseline:
+            self._baseline = sample
+        else:
+            self._baseline += (sample - self._baseline) * BASELINE_DRIFT
+
+        now = time.monotonic()
+        if sample > TOLERANCE * self._baseline:
+            if now - self._last_decrease > self._latency_ms / 1000:
+                self.limit = max(self.min_limit, self.limit * BACKOFF)
+                self._last_decrease = now
+                metrics.increment("admission.limit_decreased")
+        elif saturated:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _next_lane(self) -> Optional[str]:
+        lanes = [tier for tier in TIERS if self._queues[tier]]
+        if not lanes:
+            return None
+        oldest = min(lanes, key=lambda tier: self._queues[tier][0].queued_at)
+        if time.monotonic() - self._queues[oldest][0].queued_at >= self.starvation:
+            metrics.increment(f"admission.starvation_grant.{oldest}")
+            return oldest
+        return min(lanes, key=lambda tier: self._pass[tier])
+
+    def _grant(self) -> None:
+        while self.in_flight < int(self.limit):
+            tier = self._next_lane()
+            if tier is None:
+                return
+            waiter = self._queues[tier].popleft()
+            self._pass[tier] += 1 / self.weights[tier]
+            waiter.granted = True
+            self.in_flight += 1
+            waiter.event.set()
+
+    def _shed(self, tier: str, reason: str) -> Overloaded:
+        metrics.increment(f"admission.shed.{tier}")
+        metrics.increment(f"admission.shed.{reason}")
+        # Everyone queued has to get through limit slots at the typical request duration
+        retry_after = (self.queued() + 1) * (self._latency_ms / 1000) / max(int(self.limit), 1)
+        return Overloaded(min(max(math.ceil(retry_after), 1), 60))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queued": {tier: len(queue) for tier, queue in self._queues.items()},
+                "weights": self.weights,
+                "wait_ms": {
+                    tier: {"p50": _percentile(waits, 0.5), "p95": _percentile(waits, 0.95),
+                           "p99": _percentile(waits, 0.99), "samples": len(waits)}
+                    for tier, waits in self._waits.items()
+                },
+                "baseline_ms_per_10k_chars": round(self._baseline, 1) if self._baseline is not None else None,
+                "latency_ms": round(self._latency_ms, 1),
+            }
+
+
+analysis_limiter = AdmissionLimiter()
@@ -0,0 +1,80 @@
+"""
+Document-level AI-likeness score.
+
+A logistic model over hashed word 1-2 grams plus the per-100-word density
+of each detector signal (em-dashes, clichés, jargon, AI tells). The
+hashing vectorizer is stateless, so the model file only holds a weight
+vector and an intercept. It is trained offline (train_ai_score.py) and
+loaded once per process with joblib's mmap_mode="r", so workers share the
+weights through the page cache. Scoring a batch is a single sparse
+matrix-vector product. Without a model file every score is None.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.getenv("AI_SCORE_MODEL_PATH", "ai_score_model.joblib")
+N_HASH_FEATURES = 2 ** 18
+# Detector signals appended after the hashed columns, in this order
+COUNT_FEATURES = ("em_dash", "cliche", "jargon", "ai_tell")
+
+_vectorizer = HashingVectorizer(
+    n_features=N_HASH_FEATURES, ngram_range=(1, 2), alternate_sign=False, norm="l2"
+)
+
+_lock = threading.Lock()
+_models: Dict[str, Optional[dict]] = {}
+
+
+def feature_matrix(texts: List[str], counts: List[Dict[str, int]]) -> sparse.csr_matrix:
+    """One row per document: hashed n-grams, then signal densities per 100 words."""
+    hashed = _vectorizer.transform(texts)
+    words = np.maximum(np.fromiter((len(t.split()) for t in texts), dtype=np.float64, count=len(texts)), 1.0)
+    signals = np.array([[c.get(name, 0) for name in COUNT_FEATURES] for c in counts], dtype=np.float64)
+    signals = signals.reshape(len(texts), len(COUNT_FEATURES)) * (100.0 / words[:, None])
+    return sparse.hstack([hashed, sparse.csr_matrix(signals)], format="csr")
+
+
+def _load(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        logger.info(f"No AI-likeness model at {path} - scores will be null")
+        return None
+    try:
+        model = joblib.load(path, mmap_mode="r")
+    except Exception as e:
+        logger.error(f"Failed to load AI-likeness model from {path}: {e}")
+        return None
+    expected = N_HASH_FEATURES + len(COUNT_FEATURES)
+    if model.get("coef") is None or model["coef"].shape != (expected,):
+        logger.error(f"AI-likeness model at {path} has the wrong shape; expected {expected} weights")
+        return None
+    return model
+
+
+def get_model() -> Optional[dict]:
+    """The model at MODEL_PATH, loaded on first use."""
+    path = MODEL_PATH
+    if path not in _models:
+        with _lock:
+            if path not in _models:
+                _models[path] = _load(path)
+    return _models[path]
+
+
+def score(texts: List[str], counts: List[Dict[str, int]]) -> List[Optional[float]]:
+    """AI-likeness probability (0-1) per document, or None for all if no model is loaded."""
+    model = get_model()
+    if model is None or not texts:
+        return [None] * len(texts)
+    logits = feature_matrix(texts, counts) @ model["coef"] + model["intercept"]
+    probabilities = 1.0 / (1.0 + np.exp(-logits))
+    return np.round(probabilities, 3).tolist()
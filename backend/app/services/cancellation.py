@@ -0,0 +1,45 @@
+"""
+Cooperative cancellation for analysis work.
+
+A CancelToken is set by whoever notices the work is no longer wanted (a
+client disconnect, a cancelled job) and checked by the engine between
+units of work. SharedCancelToken is for work done on behalf of several
+callers: it only counts as cancelled once every caller's token is.
+"""
+
+import threading
+from typing import List
+
+
+class Cancelled(Exception):
+    """Raised when work stops because its token was cancelled."""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.is_cancelled():
+            raise Cancelled()
+
+
+class SharedCancelToken(CancelToken):
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._tokens: List[CancelToken] = []
+
+    def join(self, token: CancelToken) -> None:
+        with self._lock:
+            self._tokens.append(token)
+
+    def is_cancelled(self) -> bool:
+        with self._lock:
+            return bool(self._tokens) and all(token.is_cancelled() for token in self._tokens)
@@ -0,0 +1,333 @@
+"""
+Pluggable detector pipeline.
+
+Each check registers itself with the resources it needs (normalized view,
+tokens, lexicon matches, sentences, paragraphs, prose). Resources are built lazily,
+at most once per analysis, and only when a selected detector needs them,
+so a client asking only for em-dashes never tokenizes the document.
+Every resource build and detector run is timed.
+"""
+
+import re
+import time
+from collections import Counter
+from functools import cached_property
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..data.ai_tell_suggestions import AI_TELL_SUGGESTIONS
+from ..data.cliche_suggestions import CLICHE_SUGGESTIONS
+from ..data.jargon_suggestions import JARGON_SUGGESTIONS
+from ..data.em_dash_suggestions import EM_DASH_SUGGESTIONS
+from . import ai_score, metrics
+from .cancellation import CancelToken, Cancelled
+from .heatmap import paragraph_heatmap
+from .lexicon import LEXICON_TRIE, lemmatize
+from .matcher import PhraseTrie, TokenStream, tokenize_view
+from .normalizer import TextView, normalize
+from .readability import readability_score
+from .repetition import find_repeats
+from .structure import find_excluded_ranges, strip_excluded
+
+EM_DASH_PATTERN = re.compile("[—–―]")
+# Matches handled between deadline/cancel checkpoints in the matching detectors
+_CHECKPOINT_EVERY = 4096
+
+# A sentence ends at terminal punctuation (plus closing quotes/brackets) or a blank line
+_SENTENCE_BREAK = re.compile(r"[.!?]+[\"')\]]*(?=\s|\x00|$)|\n[ \t]*\n")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+# Whitespace plus the excluded-region barrier, trimmed from sentence and paragraph spans
+_TRIM = " \t\n\r\f\v\x00"
+
+LEXICON_SUGGESTIONS = {
+    "cliche": CLICHE_SUGGESTIONS,
+    "jargon": JARGON_SUGGESTIONS,
+    "ai_tell": AI_TELL_SUGGESTIONS,
+}
+
+
+def _split_spans(view: TextView, breaks: "re.Pattern", keep_punctuation: bool) -> List[Tuple[int, int]]:
+    """Spans of the view between break matches, trimmed and mapped to original offsets."""
+    text = view.text
+    spans = []
+    pos = 0
+    for match in breaks.finditer(text):
+        end = match.end() if keep_punctuation and text[match.start()] in ".!?" else match.start()
+        chunk = text[pos:end]
+        stripped = chunk.strip(_TRIM)
+        if stripped:
+            start = pos + (len(chunk) - len(chunk.lstrip(_TRIM)))
+            spans.append(view.to_original(start, start + len(stripped)))
+        pos = match.end()
+    chunk = text[pos:]
+    stripped = chunk.strip(_TRIM)
+    if stripped:
+        start = pos + (len(chunk) - len(chunk.lstrip(_TRIM)))
+        spans.append(view.to_original(start, start + len(stripped)))
+    return spans
+
+
+def split_sentences(view: TextView) -> List[Tuple[int, int]]:
+    """Sentence spans of the view, trimmed and mapped to original offsets."""
+    return _split_spans(view, _SENTENCE_BREAK, keep_punctuation=True)
+
+
+def split_paragraphs(view: TextView) -> List[Tuple[int, int]]:
+    """Paragraph spans (separated by blank lines), mapped to original offsets."""
+    return _split_spans(view, _PARAGRAPH_BREAK, keep_punctuation=False)
+
+
+class _OverBudget(Exception):
+    """Raised by AnalysisContext.checkpoint once the analysis deadline has passed."""
+
+
+class AnalysisContext:
+    """One document's analysis state: lazily built shared resources plus detector output."""
+
+    def __init__(self, text: str, custom_matcher: Optional[PhraseTrie] = None, ignore_mask: int = 0):
+        self.text = text
+        self.custom_matcher = custom_matcher
+        self.ignore_mask = ignore_mask
+        self.issues: List[dict] = []
+        # Hits per issue type, counted as detectors report them
+        self.counts: Counter = Counter()
+        self.results: Dict[str, object] = {}
+        self.timings: Dict[str, float] = {}
+        # Set by run_detectors for the detectors' checkpoint() calls
+        self.deadline: Optional[float] = None
+        self.cancel: Optional[CancelToken] = None
+
+    @cached_property
+    def excluded(self) -> List[Tuple[int, int]]:
+        return find_excluded_ranges(self.text)
+
+    @cached_property
+    def view(self) -> TextView:
+        return normalize(self.text, self.excluded)
+
+    @cached_property
+    def tokens(self) -> TokenStream:
+        return tokenize_view(self.view)
+
+    @cached_property
+    def lexicon_matches(self) -> List[Tuple[int, int, tuple]]:
+        return list(LEXICON_TRIE.scan(lemmatize(self.tokens.tokens)))
+
+    @cached_property
+    def sentences(self) -> List[Tuple[int, int]]:
+        return split_sentences(self.view)
+
+    @cached_property
+    def paragraphs(self) -> List[Tuple[int, int]]:
+        return split_paragraphs(self.view)
+
+    @cached_property
+    def prose(self) -> str:
+        return strip_excluded(self.text, self.excluded)
+
+    def add_issue(self, issue: dict) -> None:
+        self.issues.append(issue)
+        self.counts[issue["type"]] += 1
+
+    def discard_issues(self, keep: int) -> None:
+        """Drop every issue after the first keep."""
+        for issue in self.issues[keep:]:
+            self.counts[issue["type"]] -= 1
+            if not self.counts[issue["type"]]:
+                del self.counts[issue["type"]]
+        del self.issues[keep:]
+
+    def checkpoint(self) -> None:
+        """Called by detectors between chunks of work; stops them once cancelled or past the deadline."""
+        if self.cancel is not None and self.cancel.is_cancelled():
+            raise Cancelled()
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise _OverBudget()
+
+    def require(self, resource: str) -> None:
+        """Build a resource if it isn't built yet, recording how long it took."""
+        if resource in self.__dict__:
+            return
+        start = time.perf_counter()
+        getattr(self, resource)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.timings[resource] = round(elapsed, 3)
+        metrics.record_timing(f"resource.{resource}", elapsed)
+
+
+class Detector:
+    def __init__(self, name: str, fn: Callable[[AnalysisContext], None], requires: Tuple[str, ...], default: bool):
+        self.name = name
+        self.fn = fn
+        self.requires = requires
+        self.default = default
+
+
+# Registration order is run order, which also breaks ties between equal-priority issues
+DETECTORS: Dict[str, Detector] = {}
+
+
+def detector(name: str, requires: Iterable[str] = (), default: bool = True):
+    """Register a check under name; requires lists the AnalysisContext resources it reads."""
+    def register(fn: Callable[[AnalysisContext], None]):
+        DETECTORS[name] = Detector(name, fn, tuple(requires), default)
+        return fn
+    return register
+
+
+def resolve_checks(checks: Optional[Iterable[str]]) -> List[str]:
+    """Validate requested check names; None selects every default detector."""
+    if checks is None:
+        return [name for name, det in DETECTORS.items() if det.default]
+    requested = {c.strip() for c in checks if c and c.strip()}
+    unknown = sorted(requested - DETECTORS.keys())
+    if unknown:
+        raise ValueError(f"Unknown check(s): {', '.join(unknown)}. Available: {', '.join(DETECTORS)}")
+    return [name for name in DETECTORS if name in requested]
+
+
+def run_detectors(ctx: AnalysisContext, checks: List[str],
+                  on_progress: Optional[Callable[[float], None]] = None,
+                  deadline: Optional[float] = None,
+                  cancel: Optional[CancelToken] = None) -> List[str]:
+    """
+    Run the selected detectors in registry order, timing each one. on_progress,
+    if given, is called with the fraction of detectors finished after each one.
+    Past deadline (a time.monotonic() value) no further detector is started,
+    though the first always starts, and long detectors stop at their next
+    checkpoint, dropping what they found; returns the names of the detectors
+    that didn't finish. Raises Cancelled if cancel is cancelled before a
+    detector starts or at a checkpoint.
+    """
+    ctx.deadline, ctx.cancel = deadline, cancel
+    for done, name in enumerate(checks, 1):
+        if cancel is not None and cancel.is_cancelled():
+            metrics.increment("detector.cancelled")
+            raise Cancelled()
+        if deadline is not None and done > 1 and time.monotonic() >= deadline:
+            metrics.increment("detector.deadline_exceeded")
+            return list(checks[done - 1:])
+        det = DETECTORS[name]
+        issues_before = len(ctx.issues)
+        try:
+            for resource in det.requires:
+                ctx.require(resource)
+            if done > 1:
+                # Building the resources may have used up the budget
+                ctx.checkpoint()
+            start = time.perf_counter()
+            det.fn(ctx)
+            elapsed = (time.perf_counter() - start) * 1000
+            ctx.timings[name] = round(elapsed, 3)
+            metrics.record_timing(f"detector.{name}", elapsed)
+        except Cancelled:
+            metrics.increment("detector.cancelled")
+            raise
+        except _OverBudget:
+            # A detector cut short reports nothing, so every reported check is complete
+            ctx.discard_issues(issues_before)
+            metrics.increment("detector.deadline_exceeded")
+            return list(checks[done - 1:])
+        except Exception as e:
+            print(f"Error processing {name}: {e}")
+            metrics.increment(f"detector.{name}.errors")
+        if on_progress is not None:
+            on_progress(done / len(checks))
+    return []
+
+
+@detector("em_dash", requires=("view",))
+def detect_em_dashes(ctx: AnalysisContext) -> None:
+    view = ctx.view
+    for i, match in enumerate(EM_DASH_PATTERN.finditer(view.text)):
+        if i and not i % _CHECKPOINT_EVERY:
+            ctx.checkpoint()
+        start, end = view.to_original(match.start(), match.end())
+        ctx.add_issue({
+            "start": start, "end": end, "type": "em_dash",
+            "suggestions": EM_DASH_SUGGESTIONS, "priority": 0
+        })
+
+
+def _lexicon_detector(issue_type: str) -> Callable[[AnalysisContext], None]:
+    """Detector reporting one issue type from the shared lexicon trie scan."""
+    suggestions = LEXICON_SUGGESTIONS[issue_type]
+
+    def detect(ctx: AnalysisContext) -> None:
+        starts, ends = ctx.tokens.starts, ctx.tokens.ends
+        ignore_mask = ctx.ignore_mask
+        for i, (first, last, entries) in enumerate(ctx.lexicon_matches):
+            if i and not i % _CHECKPOINT_EVERY:
+                ctx.checkpoint()
+            for entry_type, pid, phrase in entries:
+                if entry_type != issue_type or (ignore_mask >> pid) & 1:
+                    continue
+                ctx.add_issue({
+                    "start": starts[first], "end": ends[last - 1], "type": issue_type,
+                    "suggestions": suggestions, "priority": 1,
+                    "phrase": phrase, "phrase_id": pid
+                })
+    return detect
+
+
+for _issue_type in LEXICON_SUGGESTIONS:
+    detector(_issue_type, requires=("tokens", "lexicon_matches"))(_lexicon_detector(_issue_type))
+
+
+@detector("custom", requires=("tokens",))
+def detect_custom_phrases(ctx: AnalysisContext) -> None:
+    # User-defined phrases; their payload is the suggestion list
+    if ctx.custom_matcher is None:
+        return
+    stream = ctx.tokens
+    for i, (first, last, suggestions) in enumerate(ctx.custom_matcher.scan(stream.tokens)):
+        if i and not i % _CHECKPOINT_EVERY:
+            ctx.checkpoint()
+        ctx.add_issue({
+            "start": stream.starts[first], "end": stream.ends[last - 1], "type": "custom",
+            "suggestions": suggestions[:4], "priority": 1
+        })
+
+
+@detector("repetition", requires=("tokens",))
+def detect_repetition(ctx: AnalysisContext) -> None:
+    # Lower priority than the lexicon, so a cliché inside a repeated phrase keeps its own type
+    stream = ctx.tokens
+    for first, last in find_repeats(stream.tokens, ctx.checkpoint, stream.starts, stream.ends):
+        ctx.add_issue({
+            "start": stream.starts[first], "end": stream.ends[last - 1], "type": "repetition",
+            "suggestions": [], "priority": 2
+        })
+
+
+@detector("readability")
+def detect_readability(ctx: AnalysisContext) -> None:
+    ctx.results["readability_score"] = readability_score(ctx.text, ctx.checkpoint)
+
+
+@detector("heatmap", requires=("tokens", "sentences", "paragraphs"), default=False)
+def detect_paragraph_heatmap(ctx: AnalysisContext) -> None:
+    # Registered last so it counts the issues of every detector that ran before it
+    ctx.results["paragraphs"] = paragraph_heatmap(ctx.tokens, ctx.sentences, ctx.paragraphs, ctx.issues)
+
+
+def signal_counts(ctx: AnalysisContext) -> Dict[str, int]:
+    """
+    Raw detector signal counts for the AI-likeness model. Built from the shared
+    resources rather than ctx.issues, so the score doesn't depend on which checks
+    ran or on the user's ignore list.
+    """
+    counts = {"em_dash": sum(1 for _ in EM_DASH_PATTERN.finditer(ctx.view.text))}
+    for _, _, entries in ctx.lexicon_matches:
+        for entry_type, _, _ in entries:
+            counts[entry_type] = counts.get(entry_type, 0) + 1
+    return counts
+
+
+def score_contexts(contexts: List[AnalysisContext]) -> List[Optional[float]]:
+    """AI-likeness scores for many documents in one matrix operation."""
+    return ai_score.score([ctx.prose for ctx in contexts], [signal_counts(ctx) for ctx in contexts])
+
+
+@detector("ai_score", requires=("view", "tokens", "lexicon_matches", "prose"), default=False)
+def detect_ai_score(ctx: AnalysisContext) -> None:
+    ctx.results["ai_score"] = score_contexts([ctx])[0]
@@ -0,0 +1,270 @@
+"""
+Version diffing with incremental re-analysis.
+
+Both versions are split into blank-line blocks, and whole blocks shared at
+the start and end are skipped by plain string comparison. The remaining
+region of each version is tokenized and diffed with Myers' O((N+M)D)
+algorithm. Block breaks are part of the token sequence, so splitting or
+joining paragraphs counts as a change. Only the blocks a change touches
+are re-analyzed (through the block cache). Every other block has the same
+tokens in both versions, so its issues are unchanged and are never
+computed. Readability counts are per block (see readability.py) and come
+from the block counts cache, so shared blocks are counted once, across
+diffs too, and each grade equals readability_score of its version.
+"""
+
+import time
+from typing import List, Optional, Sequence, Set, Tuple
+
+from . import metrics
+from .incremental import LOCAL_CHECKS, analyze_block, cached_block_counts, issue_dict, match_issues, split_blocks
+from .matcher import tokenize_view
+from .normalizer import normalize
+from .readability import Counts, grade
+from .structure import find_excluded_ranges
+
+# Beyond this many token edits the versions are unrelated; treat everything as changed
+MAX_EDIT_DISTANCE = 4000
+
+# Stands for a block break in the token sequence; the tokenizer never emits whitespace
+_BLOCK_MARKER = "\n\n"
+
+Hunk = Tuple[int, int, int, int]  # [a_start, a_end) replaced by [b_start, b_end)
+
+
+def _myers_runs(a: Sequence, b: Sequence, max_d: int) -> Optional[List[Tuple[int, int, int]]]:
+    """Matching runs (a_start, b_start, length) of a shortest edit script, or None past max_d edits."""
+    n, m = len(a), len(b)
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, max_d) + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace: List[dict], x: int, y: int) -> List[Tuple[int, int, int]]:
+    runs = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        prev_k = k + 1 if k == -d or (k != d and v[k - 1] < v[k + 1]) else k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        # The snake after this step's edit runs diagonally from (mid_x, mid_y) to (x, y)
+        mid_x, mid_y = (prev_x, prev_x - k) if prev_k == k + 1 else (prev_x + 1, prev_x + 1 - k)
+        if d == 0:
+            mid_x, mid_y = 0, 0
+        if x > mid_x:
+            runs.append((mid_x, mid_y, x - mid_x))
+        x, y = prev_x, prev_y
+    runs.reverse()
+    return runs
+
+
+def diff_hunks(a: Sequence, b: Sequence, max_d: int = MAX_EDIT_DISTANCE) -> List[Hunk]:
+    """Token-level hunks turning a into b."""
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[len(a) - 1 - suffix] == b[len(b) - 1 - suffix]:
+        suffix += 1
+    a_mid, b_mid = a[prefix:len(a) - suffix], b[prefix:len(b) - suffix]
+    if not a_mid and not b_mid:
+        return []
+
+    runs = _myers_runs(a_mid, b_mid, max_d)
+    if runs is None:
+        return [(prefix, len(a) - suffix, prefix, len(b) - suffix)]
+
+    hunks = []
+    x = y = 0
+    for run_x, run_y, length in runs + [(len(a_mid), len(b_mid), 0)]:
+        if run_x > x or run_y > y:
+            hunks.append((prefix + x, prefix + run_x, prefix + y, prefix + run_y))
+        x, y = run_x + length, run_y + length
+    return hunks
+
+
+class _Region:
+    """A run of whole blocks of one version: its token stream and diffable item sequence."""
+
+    def __init__(self, text: str, lo: int, hi: int):
+        self.text = text
+        self.lo = lo
+        region = text[lo:hi]
+        excluded = find_excluded_ranges(region)
+        self.view = normalize(region, excluded)
+        self.stream = tokenize_view(self.view)
+        self.blocks = [(start + lo, end + lo) for start, end in split_blocks(region, excluded)]
+
+        items, item_block, item_start, item_end = [], [], [], []
+        b = 0
+        for token, start, end in zip(self.stream.tokens, self.stream.starts, self.stream.ends):
+            while start + lo >= self.blocks[b][1]:
+                items.append(_BLOCK_MARKER)
+                item_block.append(b)
+                item_start.append(self.blocks[b][1])
+                item_end.append(self.blocks[b][1])
+                b += 1
+            items.append(token)
+            item_block.append(b)
+            item_start.append(start + lo)
+            item_end.append(end + lo)
+        while b < len(self.blocks) - 1:
+            items.append(_BLOCK_MARKER)
+            item_block.append(b)
+            item_start.append(self.blocks[b][1])
+            item_end.append(self.blocks[b][1])
+            b += 1
+        self.items, self.item_block, self.item_start, self.item_end = items, item_block, item_start, item_end
+        self.hi = hi
+
+    def dirty_blocks(self, lo: int, hi: int) -> Set[int]:
+        """Blocks whose content changes when items [lo, hi) are replaced."""
+        if lo == hi:
+            # Pure insertion before item lo (a marker's block is the one it ends)
+            return {self.item_block[lo] if lo < len(self.items) else len(self.blocks) - 1}
+        dirty = set()
+        for i in range(lo, hi):
+            dirty.add(self.item_block[i])
+            if self.items[i] == _BLOCK_MARKER:
+                dirty.add(self.item_block[i] + 1)
+        return dirty
+
+    def char_span(self, lo: int, hi: int) -> Tuple[int, int]:
+        if lo == hi:
+            pos = self.item_start[lo] if lo < len(self.items) else self.hi
+            return pos, pos
+        return self.item_start[lo], self.item_end[hi - 1]
+
+    def block_issues(self, blocks: Set[int], checks: Tuple[str, ...], ignore_mask: int) -> List[Tuple[int, tuple]]:
+        entries = []
+        for b in sorted(blocks):
+            start, end = self.blocks[b]
+            for issue in analyze_block(self.text[start:end], checks, ignore_mask).issues:
+                entries.append((start, issue))
+        return entries
+
+
+def _blocks_counts(text: str, blocks: Sequence[Tuple[int, int]]) -> Counts:
+    """Words, sentences and syllables of some of a text's blocks, as readability_score counts them."""
+    words = sentences = syllables = 0
+    for start, end in blocks:
+        w, s, y = cached_block_counts(text[start:end])
+        words, sentences, syllables = words + w, sentences + s, syllables + y
+    return words, sentences, syllables
+
+
+def diff_documents(before: str, after: str, checks: Sequence[str] = LOCAL_CHECKS, ignore_mask: int = 0) -> dict:
+    """Changed spans, added/removed issues and the readability delta between two versions."""
+    checks = tuple(checks)
+    timings = {}
+
+    # Whole blocks shared at both ends are compared as strings and never tokenized twice
+    start = time.perf_counter()
+    old_blocks, new_blocks = split_blocks(before), split_blocks(after)
+    limit = min(len(old_blocks), len(new_blocks))
+    prefix = 0
+    while prefix < limit and _block_text(before, old_blocks[prefix]) == _block_text(after, new_blocks[prefix]):
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and _block_text(before, old_blocks[-1 - suffix]) == _block_text(after, new_blocks[-1 - suffix]):
+        suffix += 1
+    old, new = _Region(before, *_changed_range(before, old_blocks, prefix, suffix)), \
+        _Region(after, *_changed_range(after, new_blocks, prefix, suffix))
+    timings["tokenize"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    hunks = diff_hunks(old.items, new.items)
+    timings["diff"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    dirty_old, dirty_new = set(), set()
+    for a_lo, a_hi, b_lo, b_hi in hunks:
+        dirty_old |= old.dirty_blocks(a_lo, a_hi)
+        dirty_new |= new.dirty_blocks(b_lo, b_hi)
+    relocate = _relocator(old, new, hunks)
+    added, removed, _ = match_issues(
+        old.block_issues(dirty_old, checks, ignore_mask),
+        new.block_issues(dirty_new, checks, ignore_mask),
+        relocate
+    )
+    timings["reanalyze"] = (time.perf_counter() - start) * 1000
+
+    # Shared blocks contribute the same counts to both grades, so they are counted once
+    start = time.perf_counter()
+    shared = _blocks_counts(before, old_blocks[:prefix] + old_blocks[len(old_blocks) - suffix:])
+    grade_before, grade_after = (
+        grade(*(a + b for a, b in zip(shared, _blocks_counts(text, blocks[prefix:len(blocks) - suffix]))))
+        for text, blocks in ((before, old_blocks), (after, new_blocks))
+    )
+    timings["readability"] = (time.perf_counter() - start) * 1000
+
+    for name, ms in timings.items():
+        metrics.record_timing(f"diff.{name}", ms)
+
+    return {
+        "changes": [
+            {"before": list(old.char_span(a_lo, a_hi)), "after": list(new.char_span(b_lo, b_hi))}
+            for a_lo, a_hi, b_lo, b_hi in hunks
+        ],
+        "added": [issue_dict(after, offset, issue) for offset, issue in added],
+        "removed": [issue_dict(before, offset, issue) for offset, issue in removed],
+        "readability": {
+            "before": grade_before,
+            "after": grade_after,
+            "delta": round(grade_after - grade_before, 1),
+        },
+        "reanalyzed_chars": {
+            "before": sum(old.blocks[b][1] - old.blocks[b][0] for b in dirty_old),
+            "after": sum(new.blocks[b][1] - new.blocks[b][0] for b in dirty_new),
+        },
+        "timings": {name: round(ms, 3) for name, ms in timings.items()},
+    }
+
+
+def _relocator(old: _Region, new: _Region, hunks: List[Hunk]):
+    """Map an old issue span to the new version through the unchanged tokens around the hunks."""
+    start_map, end_map = {}, {}
+    i = j = 0
+    for a_lo, a_hi, b_lo, b_hi in hunks + [(len(old.items), len(old.items), len(new.items), len(new.items))]:
+        for offset in range(a_lo - i):
+            if old.items[i + offset] != _BLOCK_MARKER:
+                start_map[old.item_start[i + offset]] = new.item_start[j + offset]
+                end_map[old.item_end[i + offset]] = new.item_end[j + offset]
+        i, j = a_hi, b_hi
+
+    def relocate(start: int, end: int) -> Optional[Tuple[int, int]]:
+        new_start, new_end = start_map.get(start), end_map.get(end)
+        if new_start is None or new_end is None:
+            return None
+        return new_start, new_end
+    return relocate
+
+
+def _changed_range(text: str, blocks: List[Tuple[int, int]], prefix: int, suffix: int) -> Tuple[int, int]:
+    """Character range of the blocks between the shared prefix and suffix (empty if there are none)."""
+    lo = blocks[prefix][0] if prefix < len(blocks) else len(text)
+    if len(blocks) - suffix <= prefix:
+        # Every block is shared, e.g. the other version only added a paragraph at the top
+        return lo, lo
+    # Blocks tile the text, so the region ends where the first suffix block starts
+    return lo, blocks[len(blocks) - suffix][0] if suffix else len(text)
+
+
+def _block_text(text: str, block: Tuple[int, int]) -> str:
+    return text[block[0]:block[1]]
@@ -0,0 +1,179 @@
+"""
+In-memory accumulation of the site-wide counters in global_stats.
+
+Every analysis used to load the single global_stats row, bump six columns
+and commit, so concurrent requests queued on that row's lock. Now each
+process adds its counts to in-memory shards (one lock per shard, threads
+spread across them) and a background thread folds them into the row with
+a single UPDATE ... SET x = x + :delta every FLUSH_INTERVAL_SECONDS, or
+sooner once FLUSH_THRESHOLD documents are waiting. The increments are
+relative, so any number of processes can flush into the same row.
+
+Counts not yet flushed are lost if the process is killed; stop() flushes
+them on a clean shutdown. read_global_stats adds them to what the row
+holds so this process's own view is never behind.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+FIELDS = (
+    "total_texts_cleaned",
+    "total_em_dashes_found",
+    "total_cliches_found",
+    "total_jargon_found",
+    "total_ai_tells_found",
+    "total_documents_processed",
+)
+SHARDS = 8
+FLUSH_INTERVAL_SECONDS = float(os.getenv("GLOBAL_STATS_FLUSH_SECONDS", "5"))
+FLUSH_THRESHOLD = int(os.getenv("GLOBAL_STATS_FLUSH_THRESHOLD", "200"))
+
+
+def _default_session():
+    from ..database import SessionLocal
+    return SessionLocal()
+
+
+class _Shard:
+    __slots__ = ("lock", "counts")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+
+class GlobalCounters:
+    def __init__(self, shards: int = SHARDS, flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 flush_threshold: int = FLUSH_THRESHOLD, session_factory: Callable = _default_session):
+        self._shards: List[_Shard] = [_Shard() for _ in range(shards)]
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+        self.flush_interval = flush_interval
+        # Checked per shard, so the whole process flushes at roughly flush_threshold documents
+        self._shard_threshold = max(flush_threshold // shards, 1)
+        self._session_factory = session_factory
+        # Only one flush at a time, so a failed one can't interleave with the next
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _shard(self) -> _Shard:
+        index = getattr(self._local, "shard", None)
+        if index is None:
+            index = self._local.shard = next(self._next_shard) % len(self._shards)
+        return self._shards[index]
+
+    def add(self, deltas: Dict[str, int]) -> None:
+        """Add to the counters; nothing touches the database here."""
+        unknown = set(deltas) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown global stats: {', '.join(sorted(unknown))}")
+        shard = self._shard()
+        with shard.lock:
+            shard.counts.update(deltas)
+            due = shard.counts["total_documents_processed"] >= self._shard_threshold
+        if due:
+            self._wake.set()
+
+    def pending(self) -> Counter:
+        """Counts added in this process and not yet flushed."""
+        total = Counter()
+        for shard in self._shards:
+            with shard.lock:
+                total.update(shard.counts)
+        return total
+
+    def _take(self) -> Counter:
+        total = Counter()
+        for shard in self._shards:
+            with shard.lock:
+                total.update(shard.counts)
+                shard.counts = Counter()
+        return +total
+
+    def flush(self) -> bool:
+        """Write the pending counts to global_stats; False if there was nothing to write."""
+        from ..models.stats import GlobalStats
+
+        with self._flush_lock:
+            deltas = self._take()
+            if not deltas:
+                return False
+
+            start = time.perf_counter()
+            db = None
+            try:
+                db = self._session_factory()
+                row_id = db.query(func.min(GlobalStats.id)).scalar()
+                if row_id is None:
+                    db.add(GlobalStats(**{field: deltas[field] for field in FIELDS}))
+                else:
+                    db.query(GlobalStats).filter(GlobalStats.id == row_id).update(
+                        {getattr(GlobalStats, field): func.coalesce(getattr(GlobalStats, field), 0) + delta
+                         for field, delta in deltas.items()},
+                        synchronize_session=False
+                    )
+                db.commit()
+            except Exception:
+                if db is not None:
+                    db.rollback()
+                # Keep the counts for the next attempt
+                shard = self._shards[0]
+                with shard.lock:
+                    shard.counts.update(deltas)
+                raise
+            finally:
+                if db is not None:
+                    db.close()
+
+        metrics.increment("global_stats.flushes")
+        metrics.record_timing("global_stats.flush", (time.perf_counter() - start) * 1000)
+        return True
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopping:
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Global stats flush failed: {e}")
+                metrics.increment("global_stats.flush_failed")
+
+    def start(self) -> None:
+        """Start the background flusher."""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="global-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and write whatever is still pending."""
+        thread, self._thread = self._thread, None
+        self._stopping = True
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Could not flush global stats on shutdown: {e}")
+
+
+global_counters = GlobalCounters()
@@ -0,0 +1,138 @@
+"""
+Per-paragraph readability and issue-density heatmap.
+
+Word, syllable and issue counts are gathered into flat NumPy arrays, then
+bucketed into sentences and paragraphs with searchsorted + bincount.
+The per-paragraph Flesch-Kincaid grades come out of one vectorized
+expression, so the cost stays close to the single-score path even on
+very large documents. Syllables are counted once per distinct word.
+"""
+
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+from .matcher import TokenStream
+from .readability import Counts, grade, syllables
+
+# Word-internal joiners; a token glued to one of these continues the previous word
+_JOINERS = {"'", "-"}
+
+# Thresholds used by the /readability complex-word and long-sentence lists
+COMPLEX_WORD_SYLLABLES = 3
+LONG_SENTENCE_WORDS = 20
+
+
+def word_arrays(stream: TokenStream, complex_words: Optional[Counter] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Start offsets and syllable counts of each word ("it's" and "end-to-end" count once).
+    If complex_words is given, alphabetic words of COMPLEX_WORD_SYLLABLES or more are
+    tallied into it (lowercased) along the way.
+    """
+    tokens, starts, ends = stream.tokens, stream.starts, stream.ends
+    word_starts: List[int] = []
+    word_syllables: List[int] = []
+    for i, token in enumerate(tokens):
+        if not token[0].isalnum():
+            continue
+        if (i >= 2 and tokens[i - 1] in _JOINERS and tokens[i - 2][0].isalnum()
+                and ends[i - 2] == starts[i - 1] and ends[i - 1] == starts[i]):
+            # Continuation of the previous word; fold its syllables in
+            if word_syllables and token.isalpha() and len(token) > 1:
+                word_syllables[-1] += syllables(token)
+            continue
+        count = syllables(token) if token.isalpha() else 1
+        word_starts.append(starts[i])
+        word_syllables.append(count)
+        if complex_words is not None and count >= COMPLEX_WORD_SYLLABLES and token.isalpha():
+            complex_words[token.lower()] += 1
+    return np.asarray(word_starts, dtype=np.int64), np.asarray(word_syllables, dtype=np.int64)
+
+
+def _bucket(positions: np.ndarray, spans: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Index of the [start, end) span containing each position, plus a mask of positions inside any span."""
+    if not len(spans):
+        return np.zeros(len(positions), dtype=np.int64), np.zeros(len(positions), dtype=bool)
+    idx = np.searchsorted(spans[:, 0], positions, side="right") - 1
+    inside = (idx >= 0) & (positions < spans[np.clip(idx, 0, None), 1])
+    return np.clip(idx, 0, None), inside
+
+
+def span_counts(stream: TokenStream, sentences: List[Tuple[int, int]],
+                spans: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Words, sentences (that contain a word) and syllables inside each [start, end) span."""
+    spans = np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+    sent_spans = np.asarray(sentences, dtype=np.int64).reshape(-1, 2)
+    n_spans = len(spans)
+
+    word_starts, word_syllables = word_arrays(stream)
+
+    # Words -> sentences; only sentences that contain words count toward the grade
+    sent_idx, in_sentence = _bucket(word_starts, sent_spans)
+    sent_words = np.bincount(sent_idx[in_sentence], minlength=len(sent_spans))
+
+    # Sentences and words -> spans
+    sent_span, sent_in_span = _bucket(sent_spans[:, 0], spans)
+    span_sentences = np.bincount(sent_span[sent_in_span & (sent_words > 0)], minlength=n_spans)
+    word_span, word_in_span = _bucket(word_starts, spans)
+    span_words = np.bincount(word_span[word_in_span], minlength=n_spans)
+    span_syllables = np.bincount(word_span[word_in_span], weights=word_syllables[word_in_span], minlength=n_spans)
+    return span_words, span_sentences, span_syllables.astype(np.int64)
+
+
+def fk_grade(words, sentences, syllables) -> np.ndarray:
+    """Flesch-Kincaid grade from counts (elementwise); 0.0 where there are no words or sentences."""
+    words, sentences, syllables = (np.asarray(a, dtype=np.float64) for a in (words, sentences, syllables))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grade = 0.39 * (words / sentences) + 11.8 * (syllables / words) - 15.59
+    return np.where((words > 0) & (sentences > 0), np.round(grade, 1), 0.0)
+
+
+def paragraph_heatmap(stream: TokenStream, sentences: List[Tuple[int, int]],
+                      paragraphs: List[Tuple[int, int]], issues: List[dict]) -> dict:
+    """Compact per-paragraph arrays: offsets, FK grade, word and issue counts."""
+    par_spans = np.asarray(paragraphs, dtype=np.int64).reshape(-1, 2)
+    n_par = len(par_spans)
+    par_words, par_sentences, par_syllables = span_counts(stream, sentences, paragraphs)
+    grade = fk_grade(par_words, par_sentences, par_syllables)
+
+    issue_starts = np.asarray([issue["start"] for issue in issues], dtype=np.int64)
+    is_ai_tell = np.asarray([issue["type"] == "ai_tell" for issue in issues], dtype=bool)
+    issue_par, issue_in_par = _bucket(issue_starts, par_spans)
+    par_issues = np.bincount(issue_par[issue_in_par], minlength=n_par)
+    par_ai_tells = np.bincount(issue_par[issue_in_par & is_ai_tell], minlength=n_par)
+
+    return {
+        "start": par_spans[:, 0].tolist(),
+        "end": par_spans[:, 1].tolist(),
+        "grade": grade.tolist(),
+        "words": par_words.tolist(),
+        "issues": par_issues.tolist(),
+        "ai_tells": par_ai_tells.tolist(),
+    }
+
+
+def readability_summary(stream: TokenStream, sentences: List[Tuple[int, int]], counts: Counts) -> dict:
+    """
+    The grade with the counts behind it (readability.text_counts of the text, so
+    both match every other endpoint), plus unique complex words with their counts
+    (most frequent first) and the offsets of long sentences from one pass over
+    the tokens.
+    """
+    complex_words: Counter = Counter()
+    word_starts, _ = word_arrays(stream, complex_words)
+    sent_spans = np.asarray(sentences, dtype=np.int64).reshape(-1, 2)
+    sent_idx, in_sentence = _bucket(word_starts, sent_spans)
+    sent_words = np.bincount(sent_idx[in_sentence], minlength=len(sent_spans))
+
+    words, n_sentences, n_syllables = counts
+    long_spans = sent_spans[sent_words > LONG_SENTENCE_WORDS]
+    ranked = complex_words.most_common()
+    return {
+        "readability_score": grade(words, n_sentences, n_syllables),
+        "words": words,
+        "sentences": n_sentences,
+        "syllables": n_syllables,
+        "complex_words": {"word": [word for word, _ in ranked], "count": [count for _, count in ranked]},
+        "long_sentences": {"start": long_spans[:, 0].tolist(), "end": long_spans[:, 1].tolist()},
+    }
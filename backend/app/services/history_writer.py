@@ -0,0 +1,297 @@
+"""
+Write-behind persistence for document history.
+
+/process used to insert the submitted text into document_history (twice:
+original and cleaned, up to 1 MB per row for Pro) before it could answer.
+Entries now go to a local spool, a small SQLite database of its own
+(HISTORY_SPOOL_PATH, default ./history_spool.db), and a background thread
+moves them into the main database in batches: one transaction per batch
+instead of one per request.
+
+Each entry gets a random history key when it is queued. /process returns
+it, and /process/apply uses it to store the cleaned text: on the spooled
+entry while it is still queued, on the document_history row once written.
+
+The spool is durable, so entries queued when the process dies are written
+by the next one to start. A batch is only removed from the spool after its
+transaction commits. If a crash comes in between, the retried batch skips
+entries whose key is already in document_history, so nothing is lost or
+written twice.
+
+The spool is bounded. Once MAX_PENDING entries are waiting, callers block
+until the flusher catches up, and after MAX_BLOCK_SECONDS write a batch
+themselves. stop() drains the spool on shutdown.
+
+Each API process needs a spool file of its own.
+"""
+
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+HISTORY_SPOOL_PATH = os.getenv("HISTORY_SPOOL_PATH", "history_spool.db")
+MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", "500"))
+BATCH_SIZE = 50
+FLUSH_INTERVAL_SECONDS = 1.0
+MAX_BLOCK_SECONDS = 2.0
+# How long a failed batch waits before it is retried
+RETRY_SECONDS = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    signature BLOB,
+    counts TEXT,
+    created_at TEXT NOT NULL
+);
+"""
+# Columns added since the first spool schema, for spools left over from older versions
+_ADDED_COLUMNS = {"history_key": "TEXT", "cleaned_text": "TEXT"}
+
+
+def _default_session():
+    from ..database import SessionLocal
+    return SessionLocal()
+
+
+class HistoryWriter:
+    def __init__(self, path: Optional[str] = None, max_pending: int = MAX_PENDING, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS, session_factory: Callable = _default_session):
+        self.path = path or HISTORY_SPOOL_PATH
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._session_factory = session_factory
+        self._cond = threading.Condition()
+        # Only one batch is written at a time, so two flushes never take the same rows
+        self._flush_lock = threading.Lock()
+        # Guards the connection enqueue inserts through; _cond is never held while writing
+        self._insert_lock = threading.Lock()
+        self._insert_conn: Optional[sqlite3.Connection] = None
+        self._pending: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def _connect(self, shared: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=not shared)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init(self) -> None:
+        # Called with self._cond held
+        if self._pending is None:
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(pending)")}
+                for name, column_type in _ADDED_COLUMNS.items():
+                    if name not in columns:
+                        conn.execute(f"ALTER TABLE pending ADD COLUMN {name} {column_type}")
+                conn.execute("CREATE INDEX IF NOT EXISTS pending_history_key ON pending (history_key)")
+                self._pending = conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+            finally:
+                conn.close()
+
+    def enqueue(self, user_id: int, text: str, signature=None, counts: Optional[dict] = None) -> str:
+        """Queue a history entry with its issue counts and return its history key; blocks while the spool is full."""
+        from .similarity import encode_signature
+
+        with self._cond:
+            self._init()
+            if self._pending >= self.max_pending:
+                metrics.increment("history.backpressure")
+                deadline = time.monotonic() + MAX_BLOCK_SECONDS
+                while self._pending >= self.max_pending and time.monotonic() < deadline:
+                    self._cond.notify_all()
+                    self._cond.wait(deadline - time.monotonic())
+            full = self._pending >= self.max_pending
+        if full:
+            # The flusher isn't keeping up (or isn't running): write a batch ourselves
+            self.flush()
+
+        history_key = secrets.token_hex(16)
+        created_at = datetime.utcnow().isoformat()
+        blob = encode_signature(signature) if signature is not None else None
+        # Counted before the row exists, so a flush that takes it never counts below it
+        with self._cond:
+            self._pending += 1
+        try:
+            with self._insert_lock:
+                if self._insert_conn is None:
+                    self._insert_conn = self._connect(shared=True)
+                self._insert_conn.execute(
+                    "INSERT INTO pending (user_id, text, signature, counts, created_at, history_key) VALUES (?, ?, ?, ?, ?, ?)",
+                    (user_id, text, blob, json.dumps(counts) if counts is not None else None, created_at, history_key)
+                )
+        except Exception:
+            with self._cond:
+                self._pending -= 1
+            raise
+        with self._cond:
+            if self._pending >= self.batch_size:
+                self._cond.notify_all()
+        metrics.increment("history.queued")
+        return history_key
+
+    def set_cleaned_text(self, history_key: str, user_id: int, text: str, cleaned_text: str) -> Optional[bool]:
+        """
+        Store the cleaned text on a queued entry. Returns None if the entry isn't queued
+        (it may already be in document_history), False if its original text differs.
+        """
+        # Holding the flush lock, the entry can't be written and dropped from the spool meanwhile
+        with self._flush_lock:
+            with self._cond:
+                self._init()
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT id, text FROM pending WHERE history_key = ? AND user_id = ?", (history_key, user_id)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["text"] != text:
+                    return False
+                conn.execute("UPDATE pending SET cleaned_text = ? WHERE id = ?", (cleaned_text, row["id"]))
+                return True
+            finally:
+                conn.close()
+
+    def pending(self) -> int:
+        with self._cond:
+            self._init()
+            return self._pending
+
+    def flush(self) -> int:
+        """Write the oldest batch to the main database; returns how many entries were written."""
+        from ..models.history import DocumentHistory
+        from .similarity import decode_signature, index_document
+
+        with self._flush_lock:
+            with self._cond:
+                self._init()
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT id, user_id, text, signature, counts, created_at, history_key, cleaned_text "
+                    "FROM pending ORDER BY id LIMIT ?",
+                    (self.batch_size,)
+                ).fetchall()
+                if not rows:
+                    return 0
+
+                start = time.perf_counter()
+                db = self._session_factory()
+                try:
+                    # Entries a crashed flush committed but couldn't drop from the spool
+                    keys = [row["history_key"] for row in rows if row["history_key"] is not None]
+                    written = {
+                        key for (key,) in db.query(DocumentHistory.history_key).filter(DocumentHistory.history_key.in_(keys))
+                    } if keys else set()
+                    new_rows = [row for row in rows if row["history_key"] is None or row["history_key"] not in written]
+                    for row in rows:
+                        if row["history_key"] in written and row["cleaned_text"] is not None:
+                            db.query(DocumentHistory).filter(DocumentHistory.history_key == row["history_key"]).update(
+                                {DocumentHistory.cleaned_text: row["cleaned_text"]}, synchronize_session=False
+                            )
+                    # Until /process/apply stores the real cleaned text, it is the original
+                    entries = [
+                        DocumentHistory(user_id=row["user_id"], original_text=row["text"],
+                                        cleaned_text=row["cleaned_text"] if row["cleaned_text"] is not None else row["text"],
+                                        created_at=row["created_at"], history_key=row["history_key"],
+                                        issue_counts=json.loads(row["counts"]) if row["counts"] is not None else None)
+                        for row in new_rows
+                    ]
+                    db.add_all(entries)
+                    db.flush()  # Assigns the entries' ids
+                    for row, entry in zip(new_rows, entries):
+                        if row["signature"] is not None:
+                            index_document(entry.id, row["user_id"], decode_signature(row["signature"]), db)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+
+                conn.execute("DELETE FROM pending WHERE id <= ?", (rows[-1]["id"],))
+            finally:
+                conn.close()
+
+        with self._cond:
+            self._pending = max(self._pending - len(rows), 0)
+            self._cond.notify_all()
+        metrics.increment("history.flushed", len(rows))
+        metrics.record_timing("history.flush", (time.perf_counter() - start) * 1000)
+        return len(rows)
+
+    def drain(self) -> int:
+        """Flush until the spool is empty; returns how many entries were written."""
+        total = 0
+        while True:
+            written = self.flush()
+            if not written:
+                return total
+            total += written
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and self._pending < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            try:
+                # Keep going while full batches are waiting
+                while self.flush() == self.batch_size and not self._stopping:
+                    pass
+            except Exception as e:
+                logger.error(f"History flush failed, retrying in {RETRY_SECONDS:.0f}s: {e}")
+                metrics.increment("history.flush_failed")
+                with self._cond:
+                    self._cond.wait(RETRY_SECONDS)
+
+    def start(self) -> None:
+        """Start the background flusher; anything left in the spool from a previous run is written first."""
+        with self._cond:
+            self._init()
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and write everything still queued."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+        with self._insert_lock:
+            if self._insert_conn is not None:
+                self._insert_conn.close()
+                self._insert_conn = None
+        try:
+            written = self.drain()
+            if written:
+                logger.info(f"Wrote {written} queued history entries on shutdown")
+        except Exception as e:
+            # They stay in the spool for the next start
+            logger.error(f"Could not drain history spool on shutdown: {e}")
+
+
+history_writer = HistoryWriter()
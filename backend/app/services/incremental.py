@@ -0,0 +1,97 @@
+"""
+Block-level building blocks for incremental analysis.
+
+A document is tiled into blocks at blank lines (never inside a code fence
+or other excluded region). The local checks (em-dashes and the lexicon)
+never match across a blank line, so each block can be analyzed on its own
+and the result cached by content. Version diffs and live editing sessions
+then re-analyze only the blocks an edit touches.
+
+Repetition is document-wide and the custom dictionary is per user, so
+neither takes part in incremental analysis.
+"""
+
+from collections import defaultdict
+from hashlib import blake2b
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..utils.cache import LRUCache
+from .detectors import AnalysisContext, run_detectors
+from .lexicon import LEXICON_VERSION
+from .readability import Counts, block_counts
+from .structure import split_blocks  # Re-exported for diff, sessions and the result store
+
+LOCAL_CHECKS = ("em_dash", "cliche", "jargon", "ai_tell")
+
+_block_cache = LRUCache(8192)
+# Readability counts don't depend on the checks or ignore list, so blocks share them by content alone
+_counts_cache = LRUCache(8192)
+
+
+class BlockAnalysis(NamedTuple):
+    issues: Tuple[Tuple[int, int, str, str], ...]  # (start, end, type, key), offsets relative to the block
+    words: int
+    sentences: int
+    syllables: int
+
+
+def _digest(text: str) -> bytes:
+    return blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def cached_block_counts(text: str, digest: Optional[bytes] = None) -> Counts:
+    """Readability counts for one block, cached by content; analyze_block fills the same cache."""
+    return _counts_cache.get_or_create(digest or _digest(text), lambda: block_counts(text))
+
+
+def _analyze(text: str, digest: bytes, checks: Tuple[str, ...], ignore_mask: int) -> BlockAnalysis:
+    ctx = AnalysisContext(text, ignore_mask=ignore_mask)
+    run_detectors(ctx, list(checks))
+    issues = tuple(
+        (issue["start"], issue["end"], issue["type"], issue.get("phrase") or text[issue["start"]:issue["end"]].lower())
+        for issue in sorted(ctx.issues, key=lambda i: (i["start"], i["end"]))
+    )
+    return BlockAnalysis(issues, *cached_block_counts(text, digest))
+
+
+def analyze_block(text: str, checks: Sequence[str] = LOCAL_CHECKS, ignore_mask: int = 0) -> BlockAnalysis:
+    """Local issues and readability counts for one block, cached by content."""
+    checks = tuple(checks)
+    digest = _digest(text)
+    key = (digest, checks, ignore_mask, LEXICON_VERSION)
+    return _block_cache.get_or_create(key, lambda: _analyze(text, digest, checks, ignore_mask))
+
+
+def issue_dict(text: str, offset: int, issue: Tuple[int, int, str, str]) -> dict:
+    """Response form of a block issue; offset is the block's start in text."""
+    start, end, issue_type, _ = issue
+    return {"start": offset + start, "end": offset + end, "type": issue_type, "content": text[offset + start:offset + end]}
+
+
+def match_issues(old: List[tuple], new: List[tuple], relocate: Callable[[int, int], Optional[Tuple[int, int]]]):
+    """
+    Pair old and new (block_offset, issue, ...) entries that are the same issue:
+    same type and phrase, at the span relocate() maps the old span to (None when
+    that text was edited). Returns (added, removed, matched): the unpaired new
+    entries, the unpaired old entries, and (old, new) pairs.
+    """
+    pending: Dict[tuple, List[tuple]] = defaultdict(list)
+    removed = []
+    for entry in old:
+        offset, (start, end, issue_type, key) = entry[0], entry[1]
+        span = relocate(offset + start, offset + end)
+        if span is None:
+            removed.append(entry)
+        else:
+            pending[(issue_type, key) + span].append(entry)
+    added, matched = [], []
+    for entry in new:
+        offset, (start, end, issue_type, key) = entry[0], entry[1]
+        candidates = pending.get((issue_type, key, offset + start, offset + end))
+        if candidates:
+            matched.append((candidates.pop(), entry))
+        else:
+            added.append(entry)
+    removed.extend(entry for entries in pending.values() for entry in entries)
+    removed.sort(key=lambda e: e[0] + e[1][0])
+    return added, removed, matched
@@ -0,0 +1,196 @@
+"""
+Durable queue for long-running analyses.
+
+Jobs live in a small SQLite database of their own (JOB_QUEUE_PATH, default
+./jobs.db) so the API and any number of worker processes on the same host
+can share it without touching the main database. A worker claims the
+oldest queued job inside an IMMEDIATE transaction, so two workers never
+take the same one, and holds a lease on it that every progress update
+renews. A job whose lease runs out (its worker died) goes back to the
+queue, up to MAX_ATTEMPTS times.
+
+The finished result goes to the result store (see result_store.py); the
+job row only keeps its id. The submitted text is dropped once the job
+has finished.
+
+Cancelling a queued job removes it from the queue; cancelling a running
+one marks it cancelled, and its worker notices at its next progress
+update and stops.
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import time
+from typing import List, NamedTuple, Optional
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.db")
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+# Finished jobs are kept as long as their results
+JOB_TTL_SECONDS = int(os.getenv("RESULT_TTL_SECONDS", str(24 * 3600)))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    text TEXT,
+    checks TEXT,
+    result_id TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+"""
+
+_initialized = set()
+
+
+class Job(NamedTuple):
+    id: str
+    user_id: int
+    text: str
+    checks: Optional[List[str]]
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(JOB_QUEUE_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if JOB_QUEUE_PATH not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _initialized.add(JOB_QUEUE_PATH)
+    return conn
+
+
+def enqueue(user_id: int, text: str, checks: Optional[List[str]] = None) -> str:
+    """Queue a document for analysis and return the job id."""
+    job_id = secrets.token_urlsafe(16)
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT INTO jobs (id, user_id, status, text, checks, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, user_id, QUEUED, text, json.dumps(checks) if checks is not None else None, now, now)
+        )
+    finally:
+        conn.close()
+    return job_id
+
+
+def claim(lease_seconds: float = LEASE_SECONDS) -> Optional[Job]:
+    """Take the oldest queued job, first re-queuing any whose worker stopped renewing its lease."""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = 'Worker stopped responding', text = NULL, updated_at = ? "
+            "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+            (FAILED, now, RUNNING, now, MAX_ATTEMPTS)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, progress = 0, updated_at = ? WHERE status = ? AND lease_until < ?",
+            (QUEUED, now, RUNNING, now)
+        )
+        row = conn.execute(
+            "SELECT id, user_id, text, checks FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, updated_at = ? WHERE id = ?",
+            (RUNNING, now + lease_seconds, now, row["id"])
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    checks = json.loads(row["checks"]) if row["checks"] is not None else None
+    return Job(row["id"], row["user_id"], row["text"], checks)
+
+
+def set_progress(job_id: str, progress: float, lease_seconds: float = LEASE_SECONDS) -> bool:
+    """Record progress (0..1) and renew the job's lease; False if the job is no longer running."""
+    now = time.time()
+    conn = _connect()
+    try:
+        cursor = conn.execute(
+            "UPDATE jobs SET progress = ?, lease_until = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (min(max(progress, 0.0), 1.0), now + lease_seconds, now, job_id, RUNNING)
+        )
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+
+def cancel(job_id: str) -> bool:
+    """Cancel a queued or running job; False if it had already finished."""
+    conn = _connect()
+    try:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, text = NULL, lease_until = NULL, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+            (CANCELLED, time.time(), job_id, QUEUED, RUNNING)
+        )
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+
+def complete(job_id: str, result_id: str) -> None:
+    _finish(job_id, DONE, result_id=result_id)
+
+
+def fail(job_id: str, error: str) -> None:
+    _finish(job_id, FAILED, error=error)
+
+
+def _finish(job_id: str, status: str, result_id: Optional[str] = None, error: Optional[str] = None) -> None:
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = ?, progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END, "
+            "result_id = ?, error = ?, text = NULL, lease_until = NULL, updated_at = ? WHERE id = ? AND status = ?",
+            (status, status, result_id, error, time.time(), job_id, RUNNING)
+        )
+    finally:
+        conn.close()
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Job status without its text, or None if unknown."""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT id, user_id, status, progress, result_id, error, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row is not None else None
+
+
+def prune_finished() -> int:
+    """Delete finished jobs older than JOB_TTL_SECONDS; returns how many were removed."""
+    conn = _connect()
+    try:
+        cursor = conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?, ?) AND updated_at < ?",
+            (*FINISHED, time.time() - JOB_TTL_SECONDS)
+        )
+        return cursor.rowcount
+    finally:
+        conn.close()
@@ -0,0 +1,152 @@
+"""
+Global lexicon registry.
+
+Every built-in phrase gets a stable integer ID, so per-user settings
+(such as ignore lists) can be stored as compact bitsets over those IDs.
+IDs are only stable for a given LEXICON_VERSION.
+
+All phrases are compiled into one token trie over base forms. A precomputed
+inflection table maps variants ("leveraging", "leveraged") of every lexicon
+word to their base form, so variants match in the same single pass without
+growing the lexicon.
+
+Phrases are compiled from their normalized form, and a trailing ellipsis
+("it’s important to note that…") is treated as "followed by anything"
+rather than as literal dots.
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..data.ai_tells import AI_TELLS
+from ..data.cliches import CLICHES
+from ..data.jargon import JARGON
+from .matcher import PhraseTrie, tokenize
+from .normalizer import normalize_text
+
+LEXICON: Dict[str, List[str]] = {
+    "cliche": CLICHES,
+    "jargon": JARGON,
+    "ai_tell": AI_TELLS,
+}
+
+# (issue_type, phrase) in ID order
+PHRASES: List[Tuple[str, str]] = [
+    (issue_type, phrase.lower())
+    for issue_type, phrases in LEXICON.items()
+    for phrase in phrases
+]
+
+PHRASE_IDS: Dict[Tuple[str, str], int] = {entry: i for i, entry in enumerate(PHRASES)}
+
+# Normalized phrase -> IDs across every issue type that lists it
+IDS_BY_PHRASE: Dict[str, List[int]] = {}
+for (_, _phrase), _pid in PHRASE_IDS.items():
+    IDS_BY_PHRASE.setdefault(normalize_text(_phrase), []).append(_pid)
+
+LEXICON_VERSION = hashlib.sha1(json.dumps(PHRASES).encode("utf-8")).hexdigest()[:12]
+
+
+def ids_for_phrases(phrases: Iterable[str]) -> Tuple[List[int], List[str]]:
+    """
+    Resolve phrases to global IDs across every issue type they appear in.
+    Returns (ids, unmatched_phrases).
+    """
+    ids, unmatched = [], []
+    for phrase in phrases:
+        matched = IDS_BY_PHRASE.get(normalize_text(phrase.strip()))
+        if matched:
+            ids.extend(matched)
+        else:
+            unmatched.append(phrase)
+    return ids, unmatched
+
+
+def encode_bitset(ids: Iterable[int]) -> bytes:
+    """Pack phrase IDs into a little-endian bitset."""
+    mask = 0
+    for pid in ids:
+        mask |= 1 << pid
+    return mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+
+def decode_bitset(data: Optional[bytes]) -> int:
+    """Unpack a stored bitset into an int; test membership with (mask >> pid) & 1."""
+    return int.from_bytes(data, "little") if data else 0
+
+
+_TRAILING_ELLIPSIS = re.compile(r"[\s,]*\.\.\.$")
+
+
+def phrase_tokens(phrase: str) -> List[str]:
+    """Tokens a lexicon phrase must match, without its trailing continuation marker."""
+    return tokenize(_TRAILING_ELLIPSIS.sub("", normalize_text(phrase))).tokens
+
+
+# Function words are left uninflected so "it" never matches "its", "in" never "ins", etc.
+_UNINFLECTED = {
+    "that", "this", "with", "from", "have", "here", "there", "what", "when",
+    "where", "which", "your", "more", "most", "than", "then", "into", "onto",
+    "over", "also", "just", "only", "very", "will", "would", "could", "should",
+}
+_VOWELS = set("aeiou")
+
+
+def inflections(word: str) -> List[str]:
+    """Regular English plural, third-person, past and progressive forms of a word."""
+    if len(word) < 4 or not word.isalpha() or word in _UNINFLECTED:
+        return []
+
+    forms = []
+    if word.endswith("y") and word[-2] not in _VOWELS:
+        forms += [word[:-1] + "ies", word[:-1] + "ied", word + "ing"]
+    elif word.endswith("ie"):
+        forms += [word + "s", word + "d", word[:-2] + "ying"]
+    elif word.endswith("e"):
+        forms += [word + "s", word + "d", (word if word.endswith("ee") else word[:-1]) + "ing"]
+    else:
+        plural = word + "es" if word.endswith(("s", "x", "z", "ch", "sh")) else word + "s"
+        forms += [plural, word + "ed", word + "ing"]
+        # Consonant-vowel-consonant endings may double the final letter (plan -> planned)
+        if word[-1] not in _VOWELS | {"w", "x", "y"} and word[-2] in _VOWELS and word[-3] not in _VOWELS:
+            forms += [word + word[-1] + "ed", word + word[-1] + "ing"]
+    return forms
+
+
+def build_inflection_table(phrases: Iterable[str]) -> Dict[str, str]:
+    """Map each inflected form of a lexicon word to its base form."""
+    words = {token for phrase in phrases for token in phrase_tokens(phrase)}
+    table: Dict[str, str] = {}
+    for word in sorted(words):
+        for form in inflections(word):
+            # A form that is itself a lexicon word keeps its own identity
+            if form not in words:
+                table.setdefault(form, word)
+    return table
+
+
+INFLECTIONS: Dict[str, str] = build_inflection_table(phrase for _, phrase in PHRASES)
+
+
+def lemmatize(tokens: List[str]) -> List[str]:
+    """Replace inflected tokens with their lexicon base form (one dict lookup per token)."""
+    get = INFLECTIONS.get
+    return [get(token, token) for token in tokens]
+
+
+def build_lexicon_trie() -> PhraseTrie:
+    """Compile every lexicon phrase into one trie; payload is a tuple of (issue_type, phrase_id, phrase)."""
+    grouped: Dict[Tuple[str, ...], List[Tuple[str, int, str]]] = {}
+    for (issue_type, phrase), pid in PHRASE_IDS.items():
+        key = tuple(lemmatize(phrase_tokens(phrase)))
+        grouped.setdefault(key, []).append((issue_type, pid, phrase))
+
+    trie = PhraseTrie()
+    for key, entries in grouped.items():
+        trie.add_tokens(list(key), tuple(entries))
+    return trie
+
+
+LEXICON_TRIE: PhraseTrie = build_lexicon_trie()
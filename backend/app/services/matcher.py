@@ -0,0 +1,107 @@
+"""
+Token-level phrase matching.
+
+Phrases are compiled into a trie keyed on tokens, so scanning a document
+costs one walk per token position (bounded by the longest phrase) no matter
+how many phrases the trie holds. Documents and phrases are tokenized from
+their normalized view, so curly/straight quotes and case never cause misses.
+"""
+
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from .normalizer import TextView, normalize
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Marks a trie node that completes a phrase; never collides with a token
+_TERMINAL = object()
+
+
+class TokenStream:
+    """Tokens of a document with their character offsets."""
+
+    __slots__ = ("tokens", "starts", "ends")
+
+    def __init__(self, tokens: List[str], starts: List[int], ends: List[int]):
+        self.tokens = tokens
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+
+def tokenize_view(view: TextView) -> TokenStream:
+    """Split a normalized view into word and punctuation tokens with original-text offsets."""
+    tokens, starts, ends = [], [], []
+    for match in TOKEN_PATTERN.finditer(view.text):
+        tokens.append(match.group())
+        starts.append(match.start())
+        ends.append(match.end())
+    offsets = view.offsets
+    if offsets is not None:
+        starts = [offsets[i] for i in starts]
+        ends = [offsets[i - 1] + 1 for i in ends]
+    return TokenStream(tokens, starts, ends)
+
+
+def tokenize(text: str) -> TokenStream:
+    """Normalize text and split it into tokens with offsets into text."""
+    return tokenize_view(normalize(text))
+
+
+class PhraseTrie:
+    """Trie of tokenized phrases, each carrying an arbitrary payload."""
+
+    def __init__(self, phrases: Iterable[Tuple[str, Any]] = ()):
+        self.root: Dict[Any, Any] = {}
+        self.size = 0
+        for phrase, payload in phrases:
+            self.add(phrase, payload)
+
+    def add(self, phrase: str, payload: Any) -> None:
+        self.add_tokens(tokenize(phrase).tokens, payload)
+
+    def add_tokens(self, tokens: List[str], payload: Any) -> None:
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if _TERMINAL not in node:
+            self.size += 1
+        node[_TERMINAL] = payload
+
+    def scan(self, tokens: List[str]) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Yield (first_token, end_token, payload) for leftmost-longest,
+        non-overlapping matches, like re.finditer does for a single pattern.
+        """
+        root = self.root
+        n = len(tokens)
+        i = 0
+        while i < n:
+            node = root.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+            best_end, best_payload = -1, None
+            j = i + 1
+            while True:
+                if _TERMINAL in node:
+                    best_end, best_payload = j, node[_TERMINAL]
+                if j >= n:
+                    break
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+            if best_end < 0:
+                i += 1
+                continue
+            yield i, best_end, best_payload
+            i = best_end
+
+    def __len__(self) -> int:
+        return self.size
@@ -0,0 +1,48 @@
+"""
+In-process engine metrics.
+
+Counters and timing summaries are kept per worker process and exposed
+through /api/stats/engine, so we can see which checks dominate cost and
+how the admission and caching layers behave.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = defaultdict(int)
+_timings: Dict[str, Dict[str, float]] = {}
+
+
+def increment(name: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[name] += amount
+
+
+def record_timing(name: str, ms: float) -> None:
+    with _lock:
+        summary = _timings.get(name)
+        if summary is None:
+            _timings[name] = {"count": 1, "total_ms": ms, "max_ms": ms}
+            return
+        summary["count"] += 1
+        summary["total_ms"] += ms
+        if ms > summary["max_ms"]:
+            summary["max_ms"] = ms
+
+
+def snapshot() -> dict:
+    """Copy of all counters and timing summaries, with mean_ms filled in."""
+    with _lock:
+        timings = {
+            name: {**summary, "mean_ms": summary["total_ms"] / summary["count"]}
+            for name, summary in _timings.items()
+        }
+        return {"counters": dict(_counters), "timings": timings}
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _timings.clear()
@@ -0,0 +1,110 @@
+"""
+Normalized matching view of a document.
+
+The view is built in one pass: compatibility forms are folded (NFKC), text
+is casefolded, curly quotes become straight quotes, "…" becomes "...", and
+zero-width characters are dropped. An array-backed offset map points every
+view character back to the original text, so matches found in the view
+report offsets into what the user actually typed.
+
+Excluded (non-prose) ranges are collapsed to a single NUL barrier, so no
+phrase can match inside them or across them.
+"""
+
+import re
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+_NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+BARRIER = "\x00"
+
+_CHAR_MAP: Dict[str, str] = {
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201b": "'", "\u2032": "'",
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u201f": '"', "\u2033": '"',
+    # Soft hyphen and zero-width characters vanish from the view
+    "\u00ad": "", "\u200b": "", "\u200c": "", "\u200d": "", "\u2060": "", "\ufeff": "",
+}
+
+# Per-character results are memoized; documents reuse a small set of non-ASCII characters
+_fold_cache: Dict[str, str] = {}
+
+
+def fold_char(ch: str) -> str:
+    folded = _fold_cache.get(ch)
+    if folded is None:
+        folded = _CHAR_MAP.get(ch)
+        if folded is None:
+            folded = unicodedata.normalize("NFKC", ch).casefold()
+        _fold_cache[ch] = folded
+    return folded
+
+
+class TextView:
+    """A normalized copy of a document plus a map from view offsets to original offsets."""
+
+    __slots__ = ("text", "original_length", "offsets")
+
+    def __init__(self, text: str, original_length: int, offsets: Optional[array]):
+        self.text = text
+        self.original_length = original_length
+        # offsets[i] is the original index of view character i; None means identity
+        self.offsets = offsets
+
+    def to_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a [start, end) span of the view back to the original text."""
+        if self.offsets is None:
+            return start, end
+        if end <= start:
+            pos = self.offsets[start] if start < len(self.offsets) else self.original_length
+            return pos, pos
+        return self.offsets[start], self.offsets[end - 1] + 1
+
+    def original_index(self, pos: int) -> int:
+        """Map a single view offset back to the original text."""
+        if self.offsets is None:
+            return pos
+        return self.offsets[pos] if pos < len(self.offsets) else self.original_length
+
+
+def _fold_run(text: str, start: int, end: int, parts: List[str], offsets: array) -> None:
+    """Append the folded form of text[start:end] to parts/offsets."""
+    last = start
+    # ASCII runs are copied and lowered wholesale; only non-ASCII runs go char by char
+    for match in _NON_ASCII.finditer(text, start, end):
+        if match.start() > last:
+            parts.append(text[last:match.start()].lower())
+            offsets.extend(range(last, match.start()))
+        for i in range(match.start(), match.end()):
+            folded = fold_char(text[i])
+            if folded:
+                parts.append(folded)
+                offsets.extend([i] * len(folded))
+        last = match.end()
+    if last < end:
+        parts.append(text[last:end].lower())
+        offsets.extend(range(last, end))
+
+
+def normalize(text: str, excluded: Optional[List[Tuple[int, int]]] = None) -> TextView:
+    """Build the normalized, casefolded view of text in a single pass."""
+    if not excluded and text.isascii():
+        return TextView(text.lower(), len(text), None)
+
+    parts: List[str] = []
+    offsets = array("l")
+    last = 0
+    for start, end in excluded or ():
+        _fold_run(text, last, start, parts, offsets)
+        parts.append(BARRIER)
+        offsets.append(start)
+        last = end
+    _fold_run(text, last, len(text), parts, offsets)
+
+    return TextView("".join(parts), len(text), offsets)
+
+
+def normalize_text(text: str) -> str:
+    """Normalized form of a short string (lexicon phrases, user phrases)."""
+    return normalize(text).text
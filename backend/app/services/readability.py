@@ -0,0 +1,126 @@
+"""
+Readability scoring helpers shared by the analysis detectors and routes.
+
+Scores are the Flesch-Kincaid grade exactly as textstat computes it, but
+from word, sentence and syllable counts that add up across blank-line
+blocks: a paragraph break also ends a sentence. That lets the detector,
+live sessions and version diffs count each block on its own and still
+report the same grade for the same text, and lets long documents be
+scored in pieces that can stop between chunks.
+"""
+
+import math
+import re
+import string
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+
+import textstat
+
+from .structure import find_excluded_ranges, split_blocks, strip_excluded
+
+Counts = Tuple[int, int, int]  # words, sentences, syllables
+
+# textstat's sentence split; pieces of two words or fewer don't count as sentences
+_SENTENCE_BREAK = re.compile(r' *[\.\?!][\'"\)\]]*[ |\n](?=[A-Z])')
+_PUNCTUATION = re.compile(f'[{re.escape(string.punctuation)}]')
+# Words counted between checkpoint calls
+_CHUNK_WORDS = 4096
+
+
+@lru_cache(maxsize=65536)
+def syllables(word: str) -> int:
+    return textstat.syllable_count(word)
+
+def clean_text_for_readability(text: str) -> str:
+    """Clean text for more accurate readability calculation"""
+    # Remove URLs
+    text = re.sub(r'https?://\S+', '', text)
+    
+    # Remove HTML-like headers and formatting that break sentence detection
+    text = re.sub(r'H[1-6]:\s*', '', text)  # Remove H1:, H2:, etc.
+    text = re.sub(r'<[^<>\n]{0,200}>', '', text)  # Remove HTML tags (bounded, so stray '<'s stay linear)
+    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Remove markdown bold **text**
+    text = re.sub(r'\*([^*]+)\*', r'\1', text)  # Remove markdown italic *text*
+    
+    # Convert colons followed by capital letters to periods (likely heading breaks)
+    text = re.sub(r':\s+([A-Z])', r'. \1', text)
+    
+    # Remove emojis (Unicode emoji ranges)
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"  # emoticons
+        "\U0001F300-\U0001F5FF"  # symbols & pictographs
+        "\U0001F680-\U0001F6FF"  # transport & map symbols
+        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+        "\U00002702-\U000027B0"  # Dingbats
+        "\U000024C2-\U0001F251"
+        "]+", flags=re.UNICODE
+    )
+    text = emoji_pattern.sub('', text)
+    
+    # Normalize em-dashes to regular dashes for readability calculation
+    text = re.sub(r'[—–―]', '-', text)
+    
+    # Remove extra whitespace
+    text = re.sub(r'\s+', ' ', text).strip()
+    
+    return text
+
+
+def _round(number: float, points: int = 0) -> float:
+    # textstat's rounding (half away from zero)
+    p = 10 ** points
+    return float(math.floor((number * p) + math.copysign(0.5, number))) / p
+
+
+def prose_counts(prose: str, checkpoint: Optional[Callable[[], None]] = None) -> Counts:
+    """
+    textstat's lexicon, sentence and syllable counts of one block of prose, except
+    that a block with no countable sentence has 0 sentences rather than 1.
+    checkpoint, if given, is called between chunks of words.
+    """
+    cleaned = clean_text_for_readability(prose)
+    if not cleaned:
+        return 0, 0, 0
+    pieces = _SENTENCE_BREAK.split(cleaned)
+    sentences = sum(1 for piece in pieces if len(_PUNCTUATION.sub('', piece).split()) > 2)
+    bare = _PUNCTUATION.sub('', cleaned)
+    words = len(bare.split())
+    syllable_total = 0
+    for i, word in enumerate(bare.lower().split(' ')):
+        if checkpoint is not None and i and not i % _CHUNK_WORDS:
+            checkpoint()
+        # textstat counts every space-separated piece, empty ones as one syllable
+        syllable_total += syllables(word) if word else 1
+    return words, sentences, syllable_total
+
+
+def block_counts(text: str, checkpoint: Optional[Callable[[], None]] = None) -> Counts:
+    """Counts of one blank-line block, leaving out code, URLs and markup."""
+    return prose_counts(strip_excluded(text, find_excluded_ranges(text)), checkpoint)
+
+
+def text_counts(text: str, checkpoint: Optional[Callable[[], None]] = None) -> Counts:
+    """Counts of a whole text, summed over its blank-line blocks."""
+    words = sentences = syllable_total = 0
+    for start, end in split_blocks(text):
+        if checkpoint is not None and start:
+            checkpoint()
+        w, s, y = block_counts(text[start:end], checkpoint)
+        words, sentences, syllable_total = words + w, sentences + s, syllable_total + y
+    return words, sentences, syllable_total
+
+
+def grade(words: int, sentences: int, syllables: int) -> float:
+    """Flesch-Kincaid grade from counts, rounded as textstat rounds it; 0.0 without words."""
+    if words <= 0:
+        return 0.0
+    sentence_length = _round(words / max(sentences, 1), 1)
+    syllables_per_word = _round(syllables / words, 1)
+    return _round(0.39 * sentence_length + 11.8 * syllables_per_word - 15.59, 1)
+
+
+def readability_score(text: str, checkpoint: Optional[Callable[[], None]] = None) -> float:
+    """Flesch-Kincaid grade of a text's prose; the one score every endpoint reports."""
+    return grade(*text_counts(text, checkpoint))
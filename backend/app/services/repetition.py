@@ -0,0 +1,132 @@
+"""
+Repeated-phrase detection over the shared token stream.
+
+Word n-grams (2-6 tokens) are hashed with a Rabin-Karp rolling hash, one
+pass per n, so the whole search is linear in document length. The only
+table is keyed by window hash, so memory is bounded by the number of
+windows in the document. Longer repeats are claimed first, and shorter
+n-grams inside them are not reported again.
+
+Tokens joined by a hyphen or apostrophe ("decision-making", "it's") form a
+single word, so a repeated compound is not a repeated phrase, and a repeat
+never starts or ends partway through one.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+MIN_NGRAM = 2
+MAX_NGRAM = 6
+
+_MOD = (1 << 61) - 1
+_BASE = 1_000_003
+
+# Joiners touching a word on both sides ("end-to-end", "it's") make one word of its parts
+_JOINERS = {"-", "'"}
+
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "of", "to", "in", "on", "at",
+    "by", "for", "with", "from", "as", "is", "are", "was", "were", "be", "been",
+    "it", "its", "this", "that", "these", "those", "we", "you", "they", "he",
+    "she", "i", "our", "your", "their", "not", "no", "so", "can", "will", "do",
+    "does", "s", "t", "more", "most", "than", "then", "there", "here", "all",
+    "just", "also", "only", "very", "how", "what", "why", "when", "where", "which",
+    "who", "isn", "aren", "don", "doesn", "re", "ve", "ll", "d", "m",
+    "has", "have", "had", "about", "into", "over", "like", "one",
+}
+
+
+def _word_runs(tokens: List[str], starts: Optional[List[int]] = None, ends: Optional[List[int]] = None):
+    """
+    Map words to vocabulary ids. A word is a run of word tokens joined by joiners;
+    with token offsets, a joiner only joins tokens it touches. Returns (ids, first,
+    last, content, runs): ids[k] is the k-th word's id, first[k]/last[k] its first
+    and last token, content[k] whether it isn't a stopword, and runs are [start, end)
+    ranges of ids not interrupted by punctuation.
+    """
+    vocab: Dict[str, int] = {}
+    ids, first, last, content, runs = [], [], [], [], []
+    run_start = 0
+    i, n = 0, len(tokens)
+
+    def attached(j: int) -> bool:
+        return starts is None or ends[j - 1] == starts[j]
+
+    while i < n:
+        token = tokens[i]
+        if token[0].isalnum() or token[0] == "_":
+            j = i
+            while (j + 2 < n and tokens[j + 1] in _JOINERS and attached(j + 1) and attached(j + 2)
+                   and (tokens[j + 2][0].isalnum() or tokens[j + 2][0] == "_")):
+                j += 2
+            parts = tokens[i:j + 1:2]
+            ids.append(vocab.setdefault("".join(tokens[i:j + 1]), len(vocab) + 1))
+            first.append(i)
+            last.append(j)
+            content.append(any(part not in _STOPWORDS for part in parts))
+            i = j + 1
+            continue
+        if len(ids) > run_start:
+            runs.append((run_start, len(ids)))
+        run_start = len(ids)
+        i += 1
+    if len(ids) > run_start:
+        runs.append((run_start, len(ids)))
+    return ids, first, last, content, runs
+
+
+def find_repeats(tokens: List[str], checkpoint: Optional[Callable[[], None]] = None,
+                 starts: Optional[List[int]] = None, ends: Optional[List[int]] = None) -> List[Tuple[int, int]]:
+    """
+    Return (first_token, end_token) spans of every occurrence of a word n-gram
+    that appears more than once. An n-gram must contain at least two non-stopwords.
+    checkpoint, if given, is called between the per-length passes. With the
+    tokens' offsets, only joiners without space around them join words.
+    """
+    ids, first, last, content, runs = _word_runs(tokens, starts, ends)
+    covered = bytearray(len(ids))
+    spans: List[Tuple[int, int]] = []
+
+    for n in range(MAX_NGRAM, MIN_NGRAM - 1, -1):
+        if checkpoint is not None and n < MAX_NGRAM:
+            checkpoint()
+        high = pow(_BASE, n - 1, _MOD)
+        windows: Dict[int, List[int]] = {}
+
+        for run_start, run_end in runs:
+            if run_end - run_start < n:
+                continue
+            h = 0
+            for k in range(run_start, run_start + n):
+                h = (h * _BASE + ids[k]) % _MOD
+            k = run_start
+            while True:
+                windows.setdefault(h, []).append(k)
+                if k + n >= run_end:
+                    break
+                h = ((h - ids[k] * high) * _BASE + ids[k + n]) % _MOD
+                k += 1
+
+        for starts in windows.values():
+            if len(starts) < 2:
+                continue
+            # Group by actual content so hash collisions never merge different n-grams
+            groups: Dict[Tuple[int, ...], List[int]] = {}
+            for k in starts:
+                if any(covered[k:k + n]) or sum(content[k:k + n]) < 2:
+                    continue
+                groups.setdefault(tuple(ids[k:k + n]), []).append(k)
+
+            for occurrences in groups.values():
+                kept, last_end = [], -1
+                for k in occurrences:
+                    if k >= last_end:
+                        kept.append(k)
+                        last_end = k + n
+                if len(kept) < 2:
+                    continue
+                for k in kept:
+                    covered[k:k + n] = b"\x01" * n
+                    spans.append((first[k], last[k + n - 1] + 1))
+
+    spans.sort()
+    return spans
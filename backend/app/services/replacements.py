@@ -0,0 +1,38 @@
+"""
+Apply a set of replacements to a document in one pass.
+
+Replacements are [start, end) spans of the original text, as reported by
+the analysis. They are sorted once, checked for overlaps, and the output is
+assembled as a piece list (untouched runs of the original interleaved with
+replacement strings) joined at the end. The cost is linear in the document
+plus the replacements, however many there are.
+"""
+
+from typing import List, NamedTuple, Optional
+
+
+class Replacement(NamedTuple):
+    start: int
+    end: int
+    text: str
+    original: Optional[str] = None  # Expected current content, to catch stale offsets
+
+
+def apply_replacements(text: str, replacements: List[Replacement]) -> str:
+    """Return text with every replacement applied. Raises ValueError on invalid or overlapping spans."""
+    # Stable sort keeps the client's order for insertions at the same position
+    ordered = sorted(replacements, key=lambda r: (r.start, r.end))
+    pieces = []
+    last = 0
+    for r in ordered:
+        if r.start < 0 or r.end < r.start or r.end > len(text):
+            raise ValueError(f"Replacement span [{r.start}, {r.end}) is outside the document")
+        if r.start < last:
+            raise ValueError(f"Replacement span [{r.start}, {r.end}) overlaps the previous one")
+        if r.original is not None and text[r.start:r.end] != r.original:
+            raise ValueError(f"Text at [{r.start}, {r.end}) no longer matches {r.original!r}")
+        pieces.append(text[last:r.start])
+        pieces.append(r.text)
+        last = r.end
+    pieces.append(text[last:])
+    return "".join(pieces)
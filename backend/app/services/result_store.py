@@ -0,0 +1,169 @@
+"""
+Server-side store for analysis results, so huge documents can be paged.
+
+A stored result keeps the text once plus parallel arrays: segment start
+offsets, types and suggestions, and paragraph start offsets. Segment
+content is sliced from the text on demand. A window of segments for a
+character range is found by binary search over the start offsets, so a
+request costs O(log n + window) however large the document.
+
+Results are written as JSON files under RESULT_STORE_DIR (default
+./results), with the most recently used ones also kept parsed in memory.
+Files older than RESULT_TTL_SECONDS are pruned.
+"""
+
+import bisect
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import List, Optional
+
+from ..utils.cache import LRUCache
+from . import metrics
+from .incremental import split_blocks
+
+logger = logging.getLogger(__name__)
+
+RESULT_STORE_DIR = os.getenv("RESULT_STORE_DIR", "results")
+RESULT_TTL_SECONDS = int(os.getenv("RESULT_TTL_SECONDS", str(24 * 3600)))
+# Prune expired files on every Nth save rather than on a timer
+_PRUNE_EVERY = 100
+
+_cache = LRUCache(64)
+_lock = threading.Lock()
+_saves = 0
+
+
+class StoredResult:
+    def __init__(self, data: dict):
+        self.owner_id: Optional[int] = data["owner_id"]
+        self.created_at: float = data["created_at"]
+        self.text: str = data["text"]
+        self.starts: List[int] = data["starts"]
+        self.types: List[str] = data["types"]
+        self.suggestions: List[List[str]] = data["suggestions"]
+        self.paragraphs: List[int] = data["paragraphs"]
+        self.summary: dict = data["summary"]
+
+    def to_dict(self) -> dict:
+        return {
+            "owner_id": self.owner_id, "created_at": self.created_at, "text": self.text,
+            "starts": self.starts, "types": self.types, "suggestions": self.suggestions,
+            "paragraphs": self.paragraphs, "summary": self.summary,
+        }
+
+    def segment_end(self, i: int) -> int:
+        return self.starts[i + 1] if i + 1 < len(self.starts) else len(self.text)
+
+    def paragraph_range(self, first: int, last: int) -> tuple:
+        """Character range covering paragraphs [first, last)."""
+        first = max(first, 0)
+        last = min(last, len(self.paragraphs))
+        if first >= last:
+            return 0, 0
+        end = self.paragraphs[last] if last < len(self.paragraphs) else len(self.text)
+        return self.paragraphs[first], end
+
+    def window(self, start: int, end: int) -> List[dict]:
+        """
+        Segments overlapping [start, end), clipped to it. Each carries its clipped
+        [start, end) and the whole segment's span, so a client can tell a piece
+        of a segment (whose suggestions are for the whole) from a complete one.
+        """
+        if start >= end or not self.starts:
+            return []
+        first = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        last = bisect.bisect_left(self.starts, end)
+        window = []
+        for i in range(first, last):
+            segment_start, segment_end = self.starts[i], self.segment_end(i)
+            clip_start, clip_end = max(segment_start, start), min(segment_end, end)
+            window.append({
+                "start": clip_start,
+                "end": clip_end,
+                "segment_start": segment_start,
+                "segment_end": segment_end,
+                "type": self.types[i],
+                "content": self.text[clip_start:clip_end],
+                "suggestions": self.suggestions[i],
+            })
+        return window
+
+
+def _path(result_id: str) -> str:
+    return os.path.join(RESULT_STORE_DIR, f"{result_id}.json")
+
+
+def save_result(text: str, result: dict, owner_id: Optional[int]) -> str:
+    """Persist an analysis result and return its id."""
+    global _saves
+    starts, offset = [], 0
+    for segment in result.get("segments", []):
+        starts.append(offset)
+        offset += len(segment["content"])
+    stored = StoredResult({
+        "owner_id": owner_id,
+        "created_at": time.time(),
+        "text": text,
+        "starts": starts,
+        "types": [segment["type"] for segment in result.get("segments", [])],
+        "suggestions": [segment["suggestions"] for segment in result.get("segments", [])],
+        "paragraphs": [start for start, _ in split_blocks(text)],
+        "summary": {key: value for key, value in result.items() if key != "segments"},
+    })
+
+    result_id = secrets.token_urlsafe(16)
+    os.makedirs(RESULT_STORE_DIR, exist_ok=True)
+    tmp_path = _path(result_id) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stored.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp_path, _path(result_id))
+    _cache.set(result_id, stored)
+    metrics.increment("results.saved")
+
+    with _lock:
+        _saves += 1
+        prune = _saves % _PRUNE_EVERY == 0
+    if prune:
+        prune_expired()
+    return result_id
+
+
+def load_result(result_id: str) -> Optional[StoredResult]:
+    """The stored result, or None if unknown or expired."""
+    # Ids are urlsafe tokens; anything else could escape the store directory
+    if not result_id or not all(c.isalnum() or c in "-_" for c in result_id):
+        return None
+    stored = _cache.get(result_id)
+    if stored is None:
+        try:
+            with open(_path(result_id), encoding="utf-8") as f:
+                stored = StoredResult(json.load(f))
+        except FileNotFoundError:
+            return None
+        _cache.set(result_id, stored)
+    if time.time() - stored.created_at > RESULT_TTL_SECONDS:
+        return None
+    return stored
+
+
+def prune_expired() -> int:
+    """Delete result files past their TTL; returns how many were removed."""
+    removed = 0
+    cutoff = time.time() - RESULT_TTL_SECONDS
+    try:
+        entries = list(os.scandir(RESULT_STORE_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                _cache.pop(entry.name[:-len(".json")])
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Could not prune result file {entry.path}: {e}")
+    return removed
@@ -1,15 +1,12 @@
-import re
+import heapq
 import random
-import textstat
+import time
 import nltk
 from nltk.corpus import wordnet
-from ..data.ai_tells import AI_TELLS
-from ..data.ai_tell_suggestions import AI_TELL_SUGGESTIONS
-from ..data.cliches import CLICHES
-from ..data.cliche_suggestions import CLICHE_SUGGESTIONS
-from ..data.jargon import JARGON
-from ..data.jargon_suggestions import JARGON_SUGGESTIONS
-from ..data.em_dash_suggestions import EM_DASH_SUGGESTIONS
+from . import metrics
+from .cancellation import Cancelled
+from .detectors import AnalysisContext, resolve_checks, run_detectors, score_contexts
+from .readability import clean_text_for_readability  # Re-exported for existing callers
 
 def get_thesaurus_synonyms(word):
     """Gets the 3-4 closest thesaurus relatives for a word."""
@@ -29,97 +26,83 @@ def get_thesaurus_synonyms(word):
     
     return list(synonyms)[:4]
 
-def clean_text_for_readability(text: str) -> str:
-    """Clean text for more accurate readability calculation"""
-    # Remove URLs
-    text = re.sub(r'https?://\S+', '', text)
-    
-    # Remove HTML-like headers and formatting that break sentence detection
-    text = re.sub(r'H[1-6]:\s*', '', text)  # Remove H1:, H2:, etc.
-    text = re.sub(r'<[^>]+>', '', text)  # Remove any HTML tags
-    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Remove markdown bold **text**
-    text = re.sub(r'\*([^*]+)\*', r'\1', text)  # Remove markdown italic *text*
-    
-    # Convert colons followed by capital letters to periods (likely heading breaks)
-    text = re.sub(r':\s+([A-Z])', r'. \1', text)
-    
-    # Remove emojis (Unicode emoji ranges)
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-        "\U00002702-\U000027B0"  # Dingbats
-        "\U000024C2-\U0001F251"
-        "]+", flags=re.UNICODE
-    )
-    text = emoji_pattern.sub('', text)
-    
-    # Normalize em-dashes to regular dashes for readability calculation
-    text = re.sub(r'[—–―]', '-', text)
-    
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
-
-def segment_text(text: str):
+def segment_text(text: str, custom_matcher=None, ignore_mask: int = 0, checks=None, on_progress=None, deadline=None, cancel=None):
+    """
+    Split text into typed segments. custom_matcher is an optional per-user PhraseTrie;
+    ignore_mask is a bitset of global phrase IDs the user never wants flagged;
+    checks selects detectors by name (None runs every default detector);
+    on_progress, deadline and cancel are passed through to run_detectors. If the deadline
+    cut the analysis short, the result has partial=True, the range analyzed, and
+    the checks still pending, which the client can request on their own.
+    """
+    timings = {}
     try:
-        all_issues = []
-
-        # --- Pass 1: Atomic Issues (Highest Priority) ---
-        atomic_issue_types = {
-            "em_dash": {"pattern": re.compile("[—–―]"), "suggestions": EM_DASH_SUGGESTIONS, "priority": 0},
-            "cliche": {"pattern": re.compile('|'.join(r'(?<!\w)' + re.escape(c) + r'(?!\w)' for c in CLICHES), re.IGNORECASE), "suggestions": CLICHE_SUGGESTIONS, "priority": 1},
-            "jargon": {"pattern": re.compile('|'.join(r'(?<!\w)' + re.escape(j) + r'(?!\w)' for j in JARGON), re.IGNORECASE), "suggestions": JARGON_SUGGESTIONS, "priority": 1},
-            "ai_tell": {"pattern": re.compile('|'.join(r'(?<!\w)' + re.escape(a) + r'(?!\w)' for a in AI_TELLS), re.IGNORECASE), "suggestions": AI_TELL_SUGGESTIONS, "priority": 1},
-        }
-
-        for issue_type, data in atomic_issue_types.items():
-            try:
-                for match in data['pattern'].finditer(text):
-                    all_issues.append({
-                        "start": match.start(), "end": match.end(), "type": issue_type,
-                        "suggestions": data.get("suggestions", {}), "priority": data['priority']
-                    })
-            except Exception as e:
-                print(f"Error processing {issue_type}: {e}")
-                continue
-
-        # Calculate readability on cleaned text for more accurate results
-        cleaned_text = clean_text_for_readability(text)
-        if len(cleaned_text.strip()) > 0:
-            readability_score = textstat.flesch_kincaid_grade(cleaned_text)
-            
-            # Debug information for readability calculation
-            sentences_count = textstat.sentence_count(cleaned_text)
-            words_count = textstat.lexicon_count(cleaned_text)
-            syllables_count = textstat.syllable_count(cleaned_text)
-            print(f"DEBUG - Segmenter Readability:")
-            print(f"  Original text length: {len(text)}")
-            print(f"  Cleaned text length: {len(cleaned_text)}")
-            print(f"  Sentences: {sentences_count}, Words: {words_count}, Syllables: {syllables_count}")
-            print(f"  FK Grade Level: {readability_score}")
-            
-            # Manual FK calculation for verification
-            if sentences_count > 0 and words_count > 0:
-                manual_fk = 0.39 * (words_count / sentences_count) + 11.8 * (syllables_count / words_count) - 15.59
-                print(f"  Manual FK calculation: {manual_fk:.2f}")
-            print(f"  Cleaned text sample: {cleaned_text[:200]}...")
-        else:
-            readability_score = 0.0
+        ctx = AnalysisContext(text, custom_matcher=custom_matcher, ignore_mask=ignore_mask)
+        timings = ctx.timings
+        selected = resolve_checks(checks)
+        pending = run_detectors(ctx, selected, on_progress, deadline, cancel)
+    except Cancelled:
+        raise
     except Exception as e:
         print(f"Error in segment_text: {e}")
         # Return basic fallback if there's any error
         return {
             "segments": [{"type": "text", "content": text, "suggestions": []}], 
             "readability_score": 0.0,
+            "timings": timings,
+            "counts": {},
             "error": str(e)
         }
+    result = build_segments(ctx)
+    if pending:
+        # Every detector that ran covered the whole text; the rest can be requested by name
+        result["partial"] = True
+        result["analyzed_range"] = [0, len(text)]
+        result["completed_checks"] = selected[:len(selected) - len(pending)]
+        result["pending_checks"] = pending
+        metrics.increment("analysis.partial")
+    return result
+
+def segment_texts(texts, custom_matcher=None, ignore_mask: int = 0, checks=None):
+    """
+    Batch form of segment_text. Detectors run per document; the AI-likeness
+    score, if selected, is computed for the whole batch in one matrix operation.
+    """
+    selected = resolve_checks(checks)
+    per_document = [name for name in selected if name != "ai_score"]
+    contexts = []
+    for text in texts:
+        ctx = AnalysisContext(text, custom_matcher=custom_matcher, ignore_mask=ignore_mask)
+        run_detectors(ctx, per_document)
+        contexts.append(ctx)
+
+    if len(per_document) < len(selected) and contexts:
+        start = time.perf_counter()
+        try:
+            scores = score_contexts(contexts)
+        except Exception as e:
+            print(f"Error processing ai_score: {e}")
+            metrics.increment("detector.ai_score.errors")
+            scores = [None] * len(contexts)
+        elapsed = (time.perf_counter() - start) * 1000
+        metrics.record_timing("detector.ai_score.batch", elapsed)
+        for ctx, score in zip(contexts, scores):
+            ctx.results["ai_score"] = score
+            ctx.timings["ai_score"] = round(elapsed / len(contexts), 3)
+
+    return [build_segments(ctx) for ctx in contexts]
+
+def build_segments(ctx: AnalysisContext):
+    """Resolve a finished analysis into merged, typed segments."""
+    text, all_issues, timings = ctx.text, ctx.issues, ctx.timings
+    readability_score = ctx.results.get("readability_score")
+    # Optional detector output (e.g. the paragraph heatmap) rides along in the response,
+    # as do the per-type hit counts, which merging adjacent segments would otherwise hide
+    extras = {k: v for k, v in ctx.results.items() if k != "readability_score"}
+    extras["counts"] = dict(ctx.counts)
 
     if not all_issues:
-        return {"segments": [{"type": "text", "content": text, "suggestions": []}], "readability_score": readability_score}
+        return {"segments": [{"type": "text", "content": text, "suggestions": []}], "readability_score": readability_score, "timings": timings, **extras}
 
     points = set([0, len(text)])
     for issue in all_issues:
@@ -128,58 +111,71 @@ def segment_text(text: str):
     
     sorted_points = sorted(list(points))
 
+    # Sweep the boundaries once, keeping the issues that cover the current segment in a
+    # heap ordered by (priority, detector order); expired issues are dropped lazily
+    order = sorted(range(len(all_issues)), key=lambda k: all_issues[k]['start'])
+    active = []
+    next_issue = 0
+
     raw_segments = []
     for i in range(len(sorted_points) - 1):
         start, end = sorted_points[i], sorted_points[i+1]
         if start >= end: continue
 
-        content = text[start:end]
-        midpoint = start + (end - start) // 2
-        
-        best_issue = None
-        for issue in all_issues:
-            if issue['start'] <= midpoint < issue['end']:
-                if best_issue is None or issue['priority'] < best_issue['priority']:
-                    best_issue = issue
-        
-        segment_type = best_issue['type'] if best_issue else 'text'
-        
+        while next_issue < len(order) and all_issues[order[next_issue]]['start'] <= start:
+            k = order[next_issue]
+            heapq.heappush(active, (all_issues[k]['priority'], k))
+            next_issue += 1
+        while active and all_issues[active[0][1]]['end'] <= start:
+            heapq.heappop(active)
+
+        best = active[0][1] if active else None
+        # A lower-priority issue ending inside this one (e.g. a repeated phrase overlapping
+        # a lexicon phrase) splits it at a boundary it doesn't own; keep it in one piece
+        if best is not None and raw_segments and raw_segments[-1][3] == best and raw_segments[-1][1] == start:
+            raw_segments[-1][1] = end
+        else:
+            raw_segments.append([start, end, all_issues[best]['type'] if best is not None else 'text', best])
+
+    for segment in raw_segments:
+        start, end, segment_type, best = segment
+        best_issue = all_issues[best] if best is not None else None
         suggestions = []
+        if (segment_type == 'repetition' and (best_issue['start'], best_issue['end']) != (start, end)
+                and len(text[start:end].split()) < 2):
+            # What a higher-priority issue leaves of a repeated phrase ("the ") isn't a phrase
+            segment[2] = 'text'
         if best_issue and best_issue['start'] == start and best_issue['end'] == end:
+            content = text[start:end]
             raw_suggestions = best_issue.get('suggestions', {})
             if segment_type in ['cliche', 'ai_tell', 'jargon']:
-                for key, value in raw_suggestions.items():
-                    if key.lower() == content.lower():
-                        suggestions = random.sample(value, min(len(value), 4))
-                        break
+                # Keyed by the lexicon phrase, so inflected matches ("leveraging") still get suggestions
+                value = raw_suggestions.get(best_issue['phrase'], [])
+                suggestions = random.sample(value, min(len(value), 4))
             elif segment_type == 'em_dash':
                 suggestions = raw_suggestions.get(content, [])
             else:
                 suggestions = best_issue.get('suggestions', [])
 
-        if content and content[0].isupper():
-            suggestions = [s.capitalize() for s in suggestions]
-
-        raw_segments.append({
-            "type": segment_type,
-            "content": content,
-            "suggestions": suggestions
-        })
+            if content and content[0].isupper():
+                suggestions = [s.capitalize() for s in suggestions]
+        segment[3] = suggestions
 
     if not raw_segments:
-        return {"segments": [], "readability_score": readability_score}
-
-    merged_segments = []
-    current_segment = raw_segments[0]
-
-    for i in range(1, len(raw_segments)):
-        next_segment = raw_segments[i]
-        if next_segment['type'] == current_segment['type'] and not current_segment['suggestions'] and not next_segment['suggestions']:
-            current_segment['content'] += next_segment['content']
+        return {"segments": [], "readability_score": readability_score, "timings": timings, **extras}
+
+    # Merge adjacent same-type runs by offset and slice each merged segment once
+    merged = [raw_segments[0]]
+    for segment in raw_segments[1:]:
+        current = merged[-1]
+        if segment[2] == current[2] and not current[3] and not segment[3]:
+            current[1] = segment[1]
         else:
-            merged_segments.append(current_segment)
-            current_segment = next_segment
-    
-    merged_segments.append(current_segment)
+            merged.append(segment)
+
+    merged_segments = [
+        {"type": segment_type, "content": text[start:end], "suggestions": suggestions}
+        for start, end, segment_type, suggestions in merged
+    ]
 
-    return {"segments": merged_segments, "readability_score": readability_score}
+    return {"segments": merged_segments, "readability_score": readability_score, "timings": timings, **extras}
@@ -0,0 +1,201 @@
+"""
+Live analysis sessions.
+
+The server keeps each open document as a list of blocks (see incremental.py)
+with their cached analyses, stable issue ids and running readability
+counts. An edit re-splits and re-analyzes only a window of blocks around
+it: the touched blocks plus one neighbour on each side, in case a blank
+line was added or removed. Counts are adjusted by subtracting the old
+window and adding the new one. The reply lists added issues and removed
+issue ids. Edits that could open or close a multi-line region (code
+fences, comments, script/style) re-split the whole document instead;
+unchanged blocks still come from the block cache.
+
+Sessions live in a bounded LRU, so the least recently used ones are
+evicted once the store is full.
+"""
+
+import bisect
+import secrets
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..utils.cache import LRUCache
+from . import metrics
+from .incremental import LOCAL_CHECKS, BlockAnalysis, analyze_block, match_issues, split_blocks
+from .readability import grade
+
+MAX_SESSIONS = 256
+
+# Typing any of these can change which text is excluded well beyond the edit
+_MULTILINE_MARKERS = ("```", "~~~", "<!--", "-->", "<script", "</script", "<style", "</style")
+_MARKER_CONTEXT = max(len(marker) for marker in _MULTILINE_MARKERS)
+
+_sessions = LRUCache(MAX_SESSIONS)
+
+
+class EditSession:
+    """One client's document state between edits."""
+
+    def __init__(self, user_id: int, text: str, checks: Sequence[str] = LOCAL_CHECKS,
+                 ignore_mask: int = 0, max_chars: int = 500000):
+        self.id = secrets.token_urlsafe(16)
+        self.user_id = user_id
+        self.checks = tuple(checks)
+        self.ignore_mask = ignore_mask
+        self.max_chars = max_chars
+        self.version = 0
+        self.lock = threading.Lock()
+        self._next_id = 0
+
+        self.text = text
+        self.starts: List[int] = []
+        self.analyses: List[BlockAnalysis] = []
+        self.issue_ids: List[List[int]] = []
+        self.counts = [0, 0, 0]  # words, sentences, syllables
+        for start, end in split_blocks(text):
+            analysis = analyze_block(text[start:end], self.checks, ignore_mask)
+            self.starts.append(start)
+            self.analyses.append(analysis)
+            self.issue_ids.append([self._new_id() for _ in analysis.issues])
+            self._add_counts(analysis, 1)
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def _add_counts(self, analysis: BlockAnalysis, sign: int) -> None:
+        self.counts[0] += sign * analysis.words
+        self.counts[1] += sign * analysis.sentences
+        self.counts[2] += sign * analysis.syllables
+
+    def _block_end(self, k: int) -> int:
+        return self.starts[k + 1] if k + 1 < len(self.starts) else len(self.text)
+
+    def readability(self) -> float:
+        return grade(*self.counts)
+
+    def _issue(self, offset: int, issue: tuple, issue_id: int) -> dict:
+        start, end, issue_type, _ = issue
+        return {"id": issue_id, "start": offset + start, "end": offset + end, "type": issue_type,
+                "content": self.text[offset + start:offset + end]}
+
+    def snapshot(self) -> dict:
+        """Every current issue plus the readability grade."""
+        with self.lock:
+            issues = [
+                self._issue(offset, issue, issue_id)
+                for offset, analysis, ids in zip(self.starts, self.analyses, self.issue_ids)
+                for issue, issue_id in zip(analysis.issues, ids)
+            ]
+            return {"type": "snapshot", "session_id": self.id, "version": self.version,
+                    "issues": issues, "readability": self.readability()}
+
+    def apply_edit(self, start: int, end: int, replacement: str) -> dict:
+        """Replace text[start:end] and return the issue delta. Raises ValueError on a bad edit."""
+        began = time.perf_counter()
+        with self.lock:
+            text = self.text
+            if not 0 <= start <= end <= len(text):
+                raise ValueError(f"Edit span [{start}, {end}) is outside the document")
+            new_text = text[:start] + replacement + text[end:]
+            if len(new_text) > self.max_chars:
+                raise ValueError(f"Text too long. Maximum {self.max_chars:,} characters allowed.")
+            delta = len(replacement) - (end - start)
+
+            context_old = text[max(start - _MARKER_CONTEXT, 0):end + _MARKER_CONTEXT]
+            context_new = new_text[max(start - _MARKER_CONTEXT, 0):start + len(replacement) + _MARKER_CONTEXT]
+            if any(marker in context_old or marker in context_new for marker in _MULTILINE_MARKERS):
+                lo, hi = 0, len(self.starts) - 1
+            else:
+                lo = max(bisect.bisect_right(self.starts, start) - 2, 0)
+                hi = min(bisect.bisect_right(self.starts, end), len(self.starts) - 1)
+
+            window_start = self.starts[lo]
+            window_end = self._block_end(hi) + delta
+            window_text = new_text[window_start:window_end]
+
+            old_entries = [
+                (self.starts[k], issue, issue_id)
+                for k in range(lo, hi + 1)
+                for issue, issue_id in zip(self.analyses[k].issues, self.issue_ids[k])
+            ]
+            new_starts, new_analyses = [], []
+            new_entries = []
+            for block_start, block_end in split_blocks(window_text):
+                analysis = analyze_block(window_text[block_start:block_end], self.checks, self.ignore_mask)
+                new_starts.append(window_start + block_start)
+                new_analyses.append(analysis)
+                new_entries.extend((window_start + block_start, issue, len(new_analyses) - 1) for issue in analysis.issues)
+
+            def relocate(issue_start: int, issue_end: int) -> Optional[Tuple[int, int]]:
+                if issue_end <= start:
+                    return issue_start, issue_end
+                if issue_start >= end:
+                    return issue_start + delta, issue_end + delta
+                return None
+
+            added, removed, matched = match_issues(old_entries, new_entries, relocate)
+            kept: Dict[int, int] = {id(new): old[2] for old, new in matched}
+            new_ids: List[List[int]] = [[] for _ in new_analyses]
+            added_ids = set()
+            for entry in new_entries:
+                issue_id = kept.get(id(entry))
+                if issue_id is None:
+                    issue_id = self._new_id()
+                    added_ids.add(issue_id)
+                new_ids[entry[2]].append(issue_id)
+
+            for k in range(lo, hi + 1):
+                self._add_counts(self.analyses[k], -1)
+            for analysis in new_analyses:
+                self._add_counts(analysis, 1)
+            self.text = new_text
+            self.starts[lo:hi + 1] = new_starts
+            self.analyses[lo:hi + 1] = new_analyses
+            self.issue_ids[lo:hi + 1] = new_ids
+            shift_from = lo + len(new_starts)
+            if delta:
+                for k in range(shift_from, len(self.starts)):
+                    self.starts[k] += delta
+            self.version += 1
+
+            added_issues = [
+                self._issue(new_starts[block], issue, issue_id)
+                for block, (analysis, ids) in enumerate(zip(new_analyses, new_ids))
+                for issue, issue_id in zip(analysis.issues, ids)
+                if issue_id in added_ids
+            ]
+            reply = {
+                "type": "delta",
+                "version": self.version,
+                "added": added_issues,
+                "removed": [entry[2] for entry in removed],
+                "readability": self.readability(),
+                "window": [window_start, window_end],
+            }
+        metrics.record_timing("session.edit", (time.perf_counter() - began) * 1000)
+        return reply
+
+
+def create_session(user_id: int, text: str, checks: Sequence[str] = LOCAL_CHECKS,
+                   ignore_mask: int = 0, max_chars: int = 500000) -> EditSession:
+    if len(text) > max_chars:
+        raise ValueError(f"Text too long. Maximum {max_chars:,} characters allowed.")
+    session = EditSession(user_id, text, checks, ignore_mask, max_chars)
+    _sessions.set(session.id, session)
+    metrics.increment("session.opened")
+    return session
+
+
+def get_session(session_id: Optional[str], user_id: int) -> Optional[EditSession]:
+    """A live session owned by user_id, or None if it never existed or was evicted."""
+    session = _sessions.get(session_id) if session_id else None
+    if session is None or session.user_id != user_id:
+        return None
+    return session
+
+
+def close_session(session_id: str) -> None:
+    _sessions.pop(session_id)
@@ -0,0 +1,156 @@
+"""
+Near-duplicate detection across a user's history with MinHash + LSH.
+
+Each saved document gets a 128-value MinHash signature over word 3-gram
+shingles (512 bytes) and 16 LSH band buckets of 8 rows each. A new
+submission looks up only the history entries that share a bucket with it,
+which is an indexed lookup rather than a scan of the user's history, and
+then ranks those candidates by estimated Jaccard similarity. With 16x8
+bands, drafts above roughly 70% shingle overlap are found with high
+probability.
+
+The permutation seeds below are part of the stored format: changing them
+invalidates every saved signature.
+"""
+
+import zlib
+from functools import lru_cache
+from hashlib import blake2b
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models.document_signature import DocumentBand, DocumentSignature
+from ..models.history import DocumentHistory
+from .matcher import tokenize
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MIN_SIMILARITY = 0.5
+
+# Multiply-shift hash family: h_i(x) = (a_i * x + b_i) >> 32 over uint64, a_i odd
+_rng = np.random.default_rng(0x5EED_D45A)
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+# Shingles hashed per block, which bounds the (block x NUM_PERM) temporary
+_CHUNK = 2048
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """Distinct 64-bit hashes of the word 3-grams of the normalized text."""
+    words = [token for token in tokenize(text).tokens if token[0].isalnum()]
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.fromiter((_token_hash(w) for w in words), dtype=np.uint64, count=len(words))
+    size = min(SHINGLE_SIZE, len(hashes))
+    # Horner combination; uint64 arithmetic wraps, which is fine for hashing
+    shingles = hashes[:len(hashes) - size + 1].copy()
+    for offset in range(1, size):
+        shingles = shingles * _SHINGLE_MULTIPLIER + hashes[offset:len(hashes) - size + 1 + offset]
+    return np.unique(shingles)
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (NUM_PERM uint32 values), or None for text without words."""
+    shingles = shingle_hashes(text)
+    if not len(shingles):
+        return None
+    signature = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    for start in range(0, len(shingles), _CHUNK):
+        block = shingles[start:start + _CHUNK, None]
+        hashed = ((block * _A + _B) >> np.uint64(32)).astype(np.uint32)
+        np.minimum(signature, hashed.min(axis=0), out=signature)
+    return signature
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket per band; the band index is hashed in so bands never collide."""
+    buckets = []
+    for band in range(BANDS):
+        digest = blake2b(bytes([band]) + signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8)
+        buckets.append(int.from_bytes(digest.digest(), "little", signed=True))
+    return buckets
+
+
+def encode_signature(signature: np.ndarray) -> bytes:
+    return signature.astype("<u4").tobytes()
+
+
+def decode_signature(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4")
+
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity: the fraction of matching MinHash values."""
+    return float(np.mean(a == b))
+
+
+def index_document(history_id: int, user_id: int, signature: np.ndarray, db: Session) -> None:
+    """Store a history entry's signature and LSH buckets (caller commits)."""
+    db.add(DocumentSignature(history_id=history_id, user_id=user_id, signature=encode_signature(signature)))
+    db.add_all(
+        DocumentBand(history_id=history_id, user_id=user_id, bucket=bucket)
+        for bucket in band_buckets(signature)
+    )
+
+
+def remove_document(history_id: int, db: Session) -> None:
+    db.query(DocumentBand).filter(DocumentBand.history_id == history_id).delete(synchronize_session=False)
+    db.query(DocumentSignature).filter(DocumentSignature.history_id == history_id).delete(synchronize_session=False)
+
+
+def find_similar(user_id: int, signature: np.ndarray, db: Session, limit: int = 5,
+                 min_similarity: float = MIN_SIMILARITY) -> List[Tuple[int, float]]:
+    """(history_id, similarity) of the user's near-duplicates, most similar first."""
+    candidate_ids = [
+        row[0] for row in db.query(DocumentBand.history_id).filter(
+            DocumentBand.user_id == user_id,
+            DocumentBand.bucket.in_(band_buckets(signature))
+        ).distinct()
+    ]
+    if not candidate_ids:
+        return []
+
+    scored = []
+    rows = db.query(DocumentSignature.history_id, DocumentSignature.signature).filter(
+        DocumentSignature.history_id.in_(candidate_ids)
+    )
+    for history_id, data in rows:
+        similarity = estimate_similarity(signature, decode_signature(data))
+        if similarity >= min_similarity:
+            scored.append((history_id, round(similarity, 3)))
+    scored.sort(key=lambda item: (-item[1], -item[0]))
+    return scored[:limit]
+
+
+def similar_documents(user_id: int, signature: Optional[np.ndarray], db: Session) -> List[dict]:
+    """Near-duplicate history entries in the shape the history list uses."""
+    if signature is None:
+        return []
+    matches = find_similar(user_id, signature, db)
+    if not matches:
+        return []
+    entries = {
+        entry.id: entry for entry in db.query(DocumentHistory).filter(
+            DocumentHistory.id.in_([history_id for history_id, _ in matches])
+        )
+    }
+    return [
+        {
+            "id": history_id,
+            "similarity": similarity,
+            "title": entries[history_id].original_text[:50] + ("..." if len(entries[history_id].original_text) > 50 else ""),
+            "created_at": entries[history_id].created_at,
+        }
+        for history_id, similarity in matches
+        if history_id in entries
+    ]
@@ -0,0 +1,82 @@
+"""
+Single-flight deduplication of identical concurrent work.
+
+The first caller for a key runs the function; callers that arrive with
+the same key while it is still running wait for it and get the same
+result (or exception) instead of repeating the work. Nothing is cached
+afterwards: once the call finishes, the next caller starts a new one.
+
+Callers may pass a CancelToken. The shared work then sees a token that is
+cancelled only once every caller sharing it has cancelled, and a waiter
+whose own token is cancelled stops waiting.
+
+Some failures belong to the caller that ran the work rather than to the
+work itself (being shed by admission control, say). Waiters that see one
+of the retry_on exceptions start over instead: they join the next call
+for the key or run it themselves.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Type
+
+from .cancellation import CancelToken, Cancelled, SharedCancelToken
+
+# How often a waiter checks its own cancel token
+_WAIT_SLICE = 0.1
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "cancel")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancel = SharedCancelToken()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], cancel: Optional[CancelToken] = None,
+           retry_on: Tuple[Type[BaseException], ...] = ()) -> Tuple[Any, bool]:
+        """
+        Run fn once per key at a time; returns (result, shared), shared being True for
+        waiters. With a cancel token, fn is called with the call's shared token. A
+        waiter whose leader fails with one of retry_on tries again rather than raising.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                if cancel is not None:
+                    call.cancel.join(cancel)
+            if leader:
+                break
+
+            while not call.done.wait(_WAIT_SLICE if cancel is not None else None):
+                if cancel.is_cancelled():
+                    raise Cancelled()
+            if call.error is None:
+                return call.result, True
+            if not isinstance(call.error, retry_on):
+                raise call.error
+
+        try:
+            call.result = fn(call.cancel) if cancel is not None else fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,85 @@
+"""
+Structural pre-pass for pasted Markdown and HTML.
+
+Finds regions that aren't prose (fenced code blocks, inline code, URLs,
+HTML tags, comments and script/style blocks) so the matchers and the
+readability calculation can skip them. Ranges are offsets into the
+original text.
+"""
+
+import bisect
+import re
+from typing import List, Optional, Tuple
+
+Range = Tuple[int, int]
+
+# A blank line plus any further blank lines; the separator stays with the block before it
+_BLOCK_BREAK = re.compile(r"\n[ \t]*\n(?:[ \t]*\n)*")
+
+_EXCLUDED_PATTERNS = [
+    # Fenced code blocks; an unclosed fence runs to the end of the document
+    re.compile(r"^[ \t]*(`{3,}|~{3,})[^\n]*\n.*?(?:^[ \t]*\1[ \t]*$|\Z)", re.MULTILINE | re.DOTALL),
+    re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL),
+    re.compile(r"<!--.*?-->", re.DOTALL),
+    re.compile(r"`[^`\n]+`"),
+    re.compile(r"(?:https?://|www\.)[^\s<>()\[\]]+"),
+    re.compile(r"</?[A-Za-z][^<>\n]*>"),
+]
+
+# Cheap check so plain prose skips the regex scans entirely
+_MARKERS = ("`", "~~~", "<", "://", "www.")
+
+
+def find_excluded_ranges(text: str) -> List[Range]:
+    """Return sorted, merged [start, end) ranges of non-prose regions."""
+    if not any(marker in text for marker in _MARKERS):
+        return []
+
+    ranges = [match.span() for pattern in _EXCLUDED_PATTERNS for match in pattern.finditer(text)]
+    ranges.sort()
+
+    merged: List[Range] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def prose_runs(text: str, excluded: List[Range]) -> List[Range]:
+    """Complement of the excluded ranges: the [start, end) runs that are prose."""
+    runs, last = [], 0
+    for start, end in excluded:
+        if start > last:
+            runs.append((last, start))
+        last = end
+    if last < len(text):
+        runs.append((last, len(text)))
+    return runs
+
+
+def strip_excluded(text: str, excluded: List[Range]) -> str:
+    """Text with non-prose regions removed, for readability scoring."""
+    if not excluded:
+        return text
+    return " ".join(text[start:end] for start, end in prose_runs(text, excluded))
+
+
+def split_blocks(text: str, excluded: Optional[List[Range]] = None) -> List[Range]:
+    """[start, end) blocks tiling the whole text, split after blank-line runs outside excluded regions."""
+    if excluded is None:
+        excluded = find_excluded_ranges(text)
+    excluded_starts = [start for start, _ in excluded]
+    blocks = []
+    start = 0
+    for match in _BLOCK_BREAK.finditer(text):
+        i = bisect.bisect_right(excluded_starts, match.start()) - 1
+        if i >= 0 and match.start() < excluded[i][1]:
+            continue
+        blocks.append((start, match.end()))
+        start = match.end()
+    if start < len(text) or not blocks:
+        blocks.append((start, len(text)))
+    return blocks
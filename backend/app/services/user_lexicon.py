@@ -0,0 +1,78 @@
+"""
+Per-user lexicon extensions.
+
+Custom phrase dictionaries are compiled into small token tries and cached by
+(user, dictionary version), so a request only pays for one indexed version
+lookup plus a scan proportional to the document length.
+
+Ignore lists are bitsets over global phrase IDs, cached alongside the matcher,
+so suppressing a hit costs one bit test.
+"""
+
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+
+from ..models.dictionary import CustomDictionary
+from ..models.ignore_list import IgnoreList
+from ..models.user import User
+from ..utils.cache import LRUCache
+from .matcher import PhraseTrie
+from .lexicon import LEXICON_VERSION, decode_bitset, encode_bitset, ids_for_phrases
+
+MAX_CUSTOM_PHRASES = 2000
+MAX_PHRASE_LENGTH = 200
+
+_matcher_cache = LRUCache(max_size=512)
+_ignore_cache = LRUCache(max_size=2048)
+
+
+def compile_custom_matcher(entries: Dict[str, List[str]]) -> PhraseTrie:
+    """Compile {phrase: [suggestions]} into a trie whose payload is the suggestion list."""
+    return PhraseTrie((phrase, list(suggestions or [])) for phrase, suggestions in entries.items())
+
+
+def get_user_matcher(user: Optional[User], db: Session) -> Optional[PhraseTrie]:
+    """Return the cached matcher for the user's custom dictionary, if they have one."""
+    if not user:
+        return None
+
+    row = db.query(CustomDictionary.id, CustomDictionary.version).filter(
+        CustomDictionary.user_id == user.id
+    ).first()
+    if not row:
+        return None
+
+    def build() -> PhraseTrie:
+        entries = db.query(CustomDictionary.entries).filter(CustomDictionary.id == row.id).scalar()
+        return compile_custom_matcher(entries or {})
+
+    # The row id guards against a deleted and recreated dictionary reusing version 1
+    matcher = _matcher_cache.get_or_create((user.id, row.id, row.version), build)
+    return matcher if len(matcher) else None
+
+
+def build_ignore_bitset(phrases: List[str]) -> bytes:
+    """Encode phrases as a bitset over the current lexicon's phrase IDs."""
+    ids, _ = ids_for_phrases(phrases)
+    return encode_bitset(ids)
+
+
+def get_ignore_mask(user: Optional[User], db: Session) -> int:
+    """Return the user's ignore bitset as an int (0 when nothing is ignored)."""
+    if not user:
+        return 0
+
+    row = db.query(IgnoreList.id, IgnoreList.version).filter(
+        IgnoreList.user_id == user.id
+    ).first()
+    if not row:
+        return 0
+
+    def build() -> int:
+        ignore_list = db.query(IgnoreList).filter(IgnoreList.id == row.id).first()
+        if ignore_list.lexicon_version == LEXICON_VERSION:
+            return decode_bitset(ignore_list.bitset)
+        # Phrase IDs shifted since the bitset was stored; rebuild from the phrases
+        return decode_bitset(build_ignore_bitset(ignore_list.phrases or []))
+
+    return _ignore_cache.get_or_create((user.id, row.id, row.version, LEXICON_VERSION), build)
@@ -0,0 +1,53 @@
+"""
+Small in-process caches shared by the analysis services.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used cache."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value for key, building it with factory on a miss."""
+        value = self.get(key)
+        if value is None:
+            # Build outside the lock so a slow factory doesn't block other readers
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
@@ -0,0 +1,110 @@
+"""
+Analysis worker: drains the job queue (see services/jobs.py).
+
+Run one or more alongside the API, sharing JOB_QUEUE_PATH and RESULT_STORE_DIR:
+
+    python -m app.worker
+"""
+
+import logging
+import signal
+import time
+import traceback
+
+from .database import SessionLocal
+from .models.user import User
+from .routes.analysis import save_to_history, update_global_stats
+from .services import jobs, metrics
+from .services.global_stats import global_counters
+from .services.cancellation import CancelToken, Cancelled
+from .services.result_store import save_result
+from .services.segmenter import segment_text
+from .services.similarity import minhash
+from .services.user_lexicon import get_ignore_mask, get_user_matcher
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+# Prune finished jobs about once an hour
+_PRUNE_INTERVAL = 3600
+
+# Detection is most of the work; saving the result takes the rest
+_ANALYSIS_SHARE = 0.9
+
+
+def process_job(job: jobs.Job) -> None:
+    """Analyze one claimed job, save its result and history, and mark it finished."""
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == job.user_id).first()
+        custom_matcher = get_user_matcher(user, db)
+        ignore_mask = get_ignore_mask(user, db)
+
+        # A cancelled job stops updating; the engine then stops at its next detector
+        cancel = CancelToken()
+
+        def on_progress(fraction: float) -> None:
+            if not jobs.set_progress(job.id, fraction * _ANALYSIS_SHARE):
+                cancel.cancel()
+
+        result = segment_text(
+            job.text, custom_matcher=custom_matcher, ignore_mask=ignore_mask, checks=job.checks,
+            on_progress=on_progress, cancel=cancel
+        )
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        cancel.raise_if_cancelled()
+
+        if user is not None:
+            result["history_id"] = save_to_history(user.id, job.text, result, db, signature=minhash(job.text))
+        db.commit()
+        update_global_stats(result)
+
+        jobs.complete(job.id, save_result(job.text, result, job.user_id))
+        metrics.increment("jobs.done")
+    except Cancelled:
+        db.rollback()
+        metrics.increment("jobs.cancelled")
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        jobs.fail(job.id, str(e))
+        metrics.increment("jobs.failed")
+    finally:
+        db.close()
+        metrics.record_timing("jobs.run", (time.perf_counter() - start) * 1000)
+
+
+def run_worker(poll_interval: float = POLL_INTERVAL) -> None:
+    """Claim and process jobs until SIGTERM or SIGINT."""
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    last_prune = 0.0
+    global_counters.start()
+    logger.info("Analysis worker started")
+    try:
+        while not stopping:
+            if time.time() - last_prune > _PRUNE_INTERVAL:
+                jobs.prune_finished()
+                last_prune = time.time()
+            job = jobs.claim()
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            process_job(job)
+    finally:
+        global_counters.stop()
+    logger.info("Analysis worker stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_worker()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark lexicon matching: the old per-type regex alternations versus the
+inflection-aware token trie, on the sample article from test_engine.py.
+
+Usage: python benchmark_matching.py [repeat_factor]
+"""
+
+import ast
+import re
+import sys
+import time
+
+from app.services.lexicon import LEXICON, LEXICON_TRIE, lemmatize
+from app.services.matcher import tokenize
+
+
+def load_sample_text() -> str:
+    """Read the `text` literal out of test_engine.py without running the script."""
+    with open("test_engine.py", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "text" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise RuntimeError("No `text` assignment found in test_engine.py")
+
+
+REGEXES = {
+    issue_type: re.compile('|'.join(r'(?<!\w)' + re.escape(p) + r'(?!\w)' for p in phrases), re.IGNORECASE)
+    for issue_type, phrases in LEXICON.items()
+}
+
+
+def regex_matches(text: str) -> int:
+    return sum(1 for pattern in REGEXES.values() for _ in pattern.finditer(text))
+
+
+def trie_matches(text: str) -> int:
+    stream = tokenize(text)
+    return sum(len(entries) for _, _, entries in LEXICON_TRIE.scan(lemmatize(stream.tokens)))
+
+
+def bench(name: str, fn, text: str, rounds: int) -> None:
+    fn(text)  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        hits = fn(text)
+    elapsed = (time.perf_counter() - start) / rounds
+    mb_per_s = len(text.encode("utf-8")) / elapsed / 1e6
+    print(f"  {name:<6} {elapsed * 1000:8.2f} ms/run  {mb_per_s:6.2f} MB/s  {hits} hits")
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    sample = load_sample_text()
+
+    for factor in sorted({1, repeat}):
+        text = "\n\n".join([sample] * factor)
+        rounds = max(1, 50 // factor)
+        print(f"=== {len(text):,} characters ({factor}x sample, {rounds} rounds) ===")
+        bench("regex", regex_matches, text, rounds)
+        bench("trie", trie_matches, text, rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Backfill MinHash signatures and LSH buckets for existing document history,
+so near-duplicate lookup also covers documents saved before it existed.
+Safe to re-run: entries that already have a signature are skipped.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv('.env')
+
+if not os.getenv("DATABASE_URL"):
+    print("DATABASE_URL environment variable is not set")
+    sys.exit(1)
+
+from app.database import Base, SessionLocal, engine
+from app.models.document_signature import DocumentBand, DocumentSignature
+from app.models.history import DocumentHistory
+from app.services.similarity import index_document, minhash
+
+BATCH_SIZE = 500
+
+def backfill_signatures():
+    """Index every history entry that has no signature yet."""
+    Base.metadata.create_all(bind=engine, tables=[DocumentSignature.__table__, DocumentBand.__table__])
+    db = SessionLocal()
+    indexed = 0
+    try:
+        while True:
+            entries = db.query(DocumentHistory).outerjoin(
+                DocumentSignature, DocumentSignature.history_id == DocumentHistory.id
+            ).filter(DocumentSignature.history_id.is_(None)).order_by(DocumentHistory.id).limit(BATCH_SIZE).all()
+            if not entries:
+                break
+            for entry in entries:
+                signature = minhash(entry.original_text)
+                if signature is None:
+                    # Nothing to shingle; store an empty marker so the entry isn't retried
+                    db.add(DocumentSignature(history_id=entry.id, user_id=entry.user_id, signature=b""))
+                    continue
+                index_document(entry.id, entry.user_id, signature, db)
+            db.commit()
+            indexed += len(entries)
+            print(f"✓ Indexed {indexed} documents")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Backfill failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+    print(f"Done. {indexed} documents indexed.")
+
+if __name__ == "__main__":
+    backfill_signatures()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Add the issue_counts column to document_history. Entries saved before it
+existed keep NULL counts. Safe to re-run.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv('.env')
+
+if not os.getenv("DATABASE_URL"):
+    print("DATABASE_URL environment variable is not set")
+    sys.exit(1)
+
+from sqlalchemy import inspect, text
+
+from app.database import engine
+
+def add_issue_counts():
+    """Add document_history.issue_counts if it is missing."""
+    columns = [column["name"] for column in inspect(engine).get_columns("document_history")]
+    if "issue_counts" in columns:
+        print("✅ Column issue_counts already exists")
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE document_history ADD COLUMN issue_counts JSON"))
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+    print("✅ Added issue_counts")
+
+if __name__ == "__main__":
+    add_issue_counts()
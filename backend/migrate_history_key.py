@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Add the history_key column (and its unique index) to document_history.
+/process returns the key of the entry it queues, so /process/apply can find
+the entry once the history writer has stored it. Older entries keep NULL
+keys. Safe to re-run.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv('.env')
+
+if not os.getenv("DATABASE_URL"):
+    print("DATABASE_URL environment variable is not set")
+    sys.exit(1)
+
+from sqlalchemy import inspect, text
+
+from app.database import engine
+
+def add_history_key():
+    """Add document_history.history_key if it is missing."""
+    columns = [column["name"] for column in inspect(engine).get_columns("document_history")]
+    try:
+        with engine.begin() as conn:
+            if "history_key" not in columns:
+                conn.execute(text("ALTER TABLE document_history ADD COLUMN history_key VARCHAR(32)"))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_document_history_history_key ON document_history (history_key)"
+            ))
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+    print("✅ history_key is in place")
+
+if __name__ == "__main__":
+    add_history_key()
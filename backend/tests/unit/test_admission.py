@@ -0,0 +1,134 @@
+"""
+Unit tests for adaptive admission control.
+"""
+
+import threading
+import time
+import pytest
+from app.services import admission
+from app.services.admission import AdmissionLimiter, Overloaded
+from app.services.cancellation import CancelToken, Cancelled
+
+
+def queue_in_thread(limiter, tier, granted):
+    def worker():
+        try:
+            limiter._acquire(tier)
+            granted.append(tier)
+        except Overloaded:
+            granted.append(f"shed:{tier}")
+    thread = threading.Thread(target=worker)
+    thread.start()
+    return thread
+
+
+def wait_for_queue(limiter, n):
+    deadline = time.time() + 2
+    while limiter.queued() < n and time.time() < deadline:
+        time.sleep(0.005)
+
+
+class TestAdmissionLimiter:
+    """Test queueing, tiered shedding and the AIMD limit."""
+
+    def test_requests_over_the_limit_queue_and_pro_goes_first(self):
+        """Test waiting requests get freed slots in tier order."""
+        limiter = AdmissionLimiter(initial_limit=1, max_limit=1)
+        limiter._acquire("pro")
+        granted = []
+        threads = [queue_in_thread(limiter, "anonymous", granted)]
+        wait_for_queue(limiter, 1)
+        threads.append(queue_in_thread(limiter, "pro", granted))
+        wait_for_queue(limiter, 2)
+
+        limiter._release(0.01, 100)
+        threads[1].join()
+        assert granted == ["pro"]
+        limiter._release(0.01, 100)
+        threads[0].join()
+        assert granted == ["pro", "anonymous"]
+
+    def test_anonymous_is_shed_before_pro(self, monkeypatch):
+        """Test a full anonymous queue sheds anonymous traffic but still queues Pro."""
+        monkeypatch.setitem(admission.QUEUE_LIMITS, "anonymous", 1)
+        limiter = AdmissionLimiter(initial_limit=1, max_limit=1, max_wait=1)
+        limiter._acquire("pro")
+        granted = []
+        first = queue_in_thread(limiter, "anonymous", granted)
+        wait_for_queue(limiter, 1)
+
+        with pytest.raises(Overloaded) as shed:
+            limiter._acquire("anonymous")
+        assert shed.value.retry_after >= 1
+
+        pro = queue_in_thread(limiter, "pro", granted)
+        wait_for_queue(limiter, 2)
+        limiter._release(0.01, 100)
+        pro.join()
+        assert granted == ["pro"]
+        limiter._release(0.01, 100)
+        first.join()
+        assert granted == ["pro", "anonymous"]
+
+    def test_waiting_too_long_is_shed(self):
+        """Test a queued request is shed once it has waited max_wait."""
+        limiter = AdmissionLimiter(initial_limit=1, max_limit=1, max_wait=0.05)
+        limiter._acquire("pro")
+        with pytest.raises(Overloaded):
+            limiter._acquire("basic")
+        assert limiter.queued() == 0
+
+    def test_cancelled_request_leaves_the_queue(self):
+        """Test a queued request whose client went away is removed and not shed."""
+        limiter = AdmissionLimiter(initial_limit=1, max_limit=1, max_wait=5)
+        limiter._acquire("pro")
+        token = CancelToken()
+        threading.Timer(0.05, token.cancel).start()
+
+        began = time.monotonic()
+        with pytest.raises(Cancelled):
+            limiter._acquire("basic", token)
+        assert time.monotonic() - began < 1
+        assert limiter.queued() == 0
+
+    def test_limit_backs_off_on_slow_requests_and_grows_when_saturated(self):
+        """Test the limit drops multiplicatively on latency spikes and climbs additively otherwise."""
+        limiter = AdmissionLimiter(initial_limit=4, max_limit=8)
+        for _ in range(4):
+            limiter._acquire("pro")
+        for _ in range(4):
+            limiter._release(0.01, 10000)
+        assert limiter.limit > 4
+
+        grown = limiter.limit
+        limiter._acquire("pro")
+        limiter._release(1.0, 10000)
+        assert limiter.limit == pytest.approx(grown * admission.BACKOFF)
+
+    def test_lanes_share_slots_by_weight(self):
+        """Test a backlog in every lane is served in proportion to the lane weights."""
+        limiter = AdmissionLimiter(weights={"pro": 3, "basic": 1, "anonymous": 1}, starvation=60)
+        for tier in ("pro", "basic", "anonymous"):
+            for _ in range(10):
+                limiter._queues[tier].append(admission._Waiter())
+
+        order = []
+        for _ in range(10):
+            tier = limiter._next_lane()
+            limiter._queues[tier].popleft()
+            limiter._pass[tier] += 1 / limiter.weights[tier]
+            order.append(tier)
+        assert order.count("pro") == 6
+        assert order.count("basic") == 2
+        assert order.count("anonymous") == 2
+
+    def test_starved_request_goes_next(self):
+        """Test a request waiting past the starvation bound is served regardless of weights."""
+        limiter = AdmissionLimiter(weights={"pro": 100, "basic": 1, "anonymous": 1}, starvation=1)
+        old = admission._Waiter()
+        old.queued_at -= 5
+        limiter._queues["anonymous"].append(old)
+        limiter._queues["pro"].append(admission._Waiter())
+        limiter._pass["anonymous"] = 50
+
+        assert limiter._next_lane() == "anonymous"
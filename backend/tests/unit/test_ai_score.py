@@ -0,0 +1,64 @@
+"""
+Unit tests for the AI-likeness score.
+"""
+
+import os
+import joblib
+import numpy as np
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from app.services import ai_score
+from app.services.segmenter import segment_text, segment_texts
+from train_ai_score import train
+
+AI_TEXTS = [
+    "In today's fast-paced world, it's important to note that we must leverage synergy.",
+    "Let's delve into the rich tapestry of innovation — a game-changer for every stakeholder.",
+    "It's worth noting that this cutting-edge paradigm shift will move the needle.",
+]
+HUMAN_TEXTS = [
+    "The bus was late again, so I walked to work and got soaked.",
+    "My sister planted tomatoes last spring. Half of them died in the heat.",
+    "We fixed the leaking tap on Sunday with a new washer from the hardware shop.",
+]
+
+
+@pytest.fixture
+def model_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "ai_score.joblib")
+    joblib.dump(train(AI_TEXTS + HUMAN_TEXTS, [1, 1, 1, 0, 0, 0]), path)
+    monkeypatch.setattr(ai_score, "MODEL_PATH", path)
+    return path
+
+
+class TestAiScore:
+    """Test model loading and batched scoring."""
+
+    def test_missing_model_scores_none(self, tmp_path, monkeypatch):
+        """Test the check degrades to null scores without a model file."""
+        monkeypatch.setattr(ai_score, "MODEL_PATH", str(tmp_path / "missing.joblib"))
+        result = segment_text("Some text.", checks=["ai_score"])
+        assert result["ai_score"] is None
+
+    def test_model_is_memory_mapped(self, model_path):
+        """Test the weights are loaded with mmap rather than copied."""
+        model = ai_score.get_model()
+        assert isinstance(model["coef"], np.memmap)
+
+    def test_batch_matches_single_document_scores(self, model_path):
+        """Test scoring a batch gives the same numbers as scoring one at a time."""
+        texts = [AI_TEXTS[0], HUMAN_TEXTS[0]]
+        batch = [r["ai_score"] for r in segment_texts(texts, checks=["ai_score"])]
+        single = [segment_text(t, checks=["ai_score"])["ai_score"] for t in texts]
+
+        assert batch == single
+        assert batch[0] > batch[1]
+
+    def test_batch_keeps_segments(self, model_path):
+        """Test batch results carry the usual segments alongside the score."""
+        results = segment_texts(AI_TEXTS, checks=["cliche", "ai_score"])
+        assert len(results) == 3
+        assert any(seg["type"] == "cliche" for seg in results[0]["segments"])
+        assert all(r["ai_score"] is not None for r in results)
@@ -0,0 +1,273 @@
+"""
+Unit tests for the detector registry and per-request check selection.
+"""
+
+import os
+import time
+
+import pytest
+import textstat
+from app.services.cancellation import CancelToken, Cancelled
+from app.services.detectors import DETECTORS, AnalysisContext, resolve_checks, run_detectors, split_sentences
+from app.services.heatmap import readability_summary
+from app.services.matcher import tokenize
+from app.services.normalizer import normalize
+from app.services.repetition import find_repeats
+from app.services.readability import clean_text_for_readability, grade, readability_score, text_counts
+from app.services.segmenter import segment_text
+
+
+class TestResolveChecks:
+    """Test check name validation."""
+
+    def test_none_selects_defaults(self):
+        """Test omitting checks runs every default detector."""
+        assert resolve_checks(None) == [name for name, det in DETECTORS.items() if det.default]
+
+    def test_registry_order_is_kept(self):
+        """Test requested checks run in registry order, not request order."""
+        assert resolve_checks(["readability", "em_dash"]) == ["em_dash", "readability"]
+
+    def test_unknown_check_is_rejected(self):
+        """Test unknown check names raise ValueError."""
+        with pytest.raises(ValueError):
+            resolve_checks(["em_dash", "spellcheck"])
+
+
+class TestRunDetectors:
+    """Test lazy resources and timing."""
+
+    def test_em_dash_only_skips_tokens(self):
+        """Test an em-dash-only request never tokenizes or scores readability."""
+        ctx = AnalysisContext("We leverage synergy—fast.")
+        run_detectors(ctx, ["em_dash"])
+
+        assert [issue["type"] for issue in ctx.issues] == ["em_dash"]
+        assert "tokens" not in ctx.timings
+        assert "readability_score" not in ctx.results
+        assert "em_dash" in ctx.timings
+
+    def test_progress_is_reported_per_detector(self):
+        """Test on_progress sees the fraction of detectors finished."""
+        seen = []
+        run_detectors(AnalysisContext("Some text."), ["em_dash", "cliche"], seen.append)
+        assert seen == [0.5, 1.0]
+
+    def test_deadline_stops_later_detectors(self):
+        """Test detectors after the deadline are skipped and reported, but the first still runs."""
+        ctx = AnalysisContext("We leverage synergy — twice.")
+        pending = run_detectors(ctx, ["em_dash", "jargon", "readability"], deadline=0)
+
+        assert pending == ["jargon", "readability"]
+        assert [issue["type"] for issue in ctx.issues] == ["em_dash"]
+
+    def test_long_detector_stops_at_its_deadline(self):
+        """Test a detector running past the deadline stops at a checkpoint and is reported pending."""
+        text = "<a " * 150000
+        result = segment_text(text, checks=["readability"], deadline=time.monotonic())
+
+        assert result["partial"] is True
+        assert result["completed_checks"] == []
+        assert result["pending_checks"] == ["readability"]
+        assert result["readability_score"] is None
+
+    def test_stopped_detector_reports_nothing(self):
+        """Test issues found by a detector before its deadline checkpoint are dropped."""
+        ctx = AnalysisContext("We leverage synergy daily. " * 20000)
+        pending = run_detectors(ctx, ["repetition"], deadline=time.monotonic())
+
+        assert pending == ["repetition"]
+        assert ctx.issues == []
+        assert not ctx.counts
+
+    def test_unclosed_angle_brackets_stay_linear(self):
+        """Test many unclosed '<' don't make readability cleaning quadratic."""
+        start = time.perf_counter()
+        clean_text_for_readability("<a " * 150000)
+        assert time.perf_counter() - start < 5
+
+    def test_cancelled_token_stops_analysis(self):
+        """Test a cancelled token raises Cancelled instead of returning a fallback result."""
+        token = CancelToken()
+        token.cancel()
+        with pytest.raises(Cancelled):
+            segment_text("We leverage synergy.", cancel=token)
+
+    def test_partial_result_lists_pending_checks(self):
+        """Test segment_text flags a result cut short by its deadline."""
+        text = "We leverage synergy — twice."
+        result = segment_text(text, checks=["em_dash", "jargon"], deadline=0)
+
+        assert result["partial"] is True
+        assert result["analyzed_range"] == [0, len(text)]
+        assert result["completed_checks"] == ["em_dash"]
+        assert result["pending_checks"] == ["jargon"]
+        assert "partial" not in segment_text(text, checks=["em_dash", "jargon"])
+
+    def test_segment_text_reports_timings(self):
+        """Test segment_text returns per-detector timings and honours checks."""
+        result = segment_text("We leverage synergy—fast.", checks=["jargon"])
+
+        assert {seg["type"] for seg in result["segments"]} == {"text", "jargon"}
+        assert result["readability_score"] is None
+        assert "jargon" in result["timings"]
+
+    def test_segment_text_counts_hits_per_type(self):
+        """Test the result counts every hit by type, including ones hidden in repeated phrases."""
+        text = "We leverage synergy—fast. We leverage synergy—again."
+        result = segment_text(text, checks=["em_dash", "jargon", "repetition"])
+
+        assert result["counts"]["em_dash"] == 2
+        assert result["counts"]["jargon"] == 4
+        assert result["counts"]["repetition"] == 2
+        assert segment_text("Plain text.", checks=["em_dash"])["counts"] == {}
+
+
+class TestSplitSentences:
+    """Test the shared sentence splitter."""
+
+    def test_spans_point_into_original_text(self):
+        """Test sentence spans are trimmed and map back to the original text."""
+        text = "First one… Second “two”!\n\nThird"
+        spans = split_sentences(normalize(text))
+
+        assert [text[start:end] for start, end in spans] == ["First one…", "Second “two”!", "Third"]
+
+
+class TestRepetition:
+    """Test the rolling-hash repetition detector."""
+
+    def test_repeated_phrase_is_flagged_each_time(self):
+        """Test every occurrence of a repeated n-gram is reported once, longest first."""
+        stream = tokenize("Quarterly revenue growth matters. Nobody doubts quarterly revenue growth.")
+        spans = find_repeats(stream.tokens)
+
+        assert [" ".join(stream.tokens[a:b]) for a, b in spans] == [
+            "quarterly revenue growth", "quarterly revenue growth"
+        ]
+
+    def test_stopword_only_repeats_are_ignored(self):
+        """Test n-grams without two content words are not flagged."""
+        assert find_repeats(tokenize("It is in the box. It is in the car.").tokens) == []
+
+    def test_repeats_do_not_span_sentences(self):
+        """Test punctuation breaks n-gram runs."""
+        assert find_repeats(tokenize("Blue sky. Green grass. Blue. Sky green.").tokens) == []
+
+    def test_hyphenated_word_is_one_word(self):
+        """Test a repeated compound isn't a repeated phrase, and repeats include whole compounds."""
+        for text in ("Good decision-making matters. Fast decision-making wins.",
+                     "We build low-code apps. Our low-code tools help."):
+            stream = tokenize(text)
+            assert find_repeats(stream.tokens, None, stream.starts, stream.ends) == []
+
+        text = "Good decision-making process. Bad decision-making process."
+        stream = tokenize(text)
+        spans = find_repeats(stream.tokens, None, stream.starts, stream.ends)
+        assert [text[stream.starts[a]:stream.ends[b - 1]] for a, b in spans] == [
+            "decision-making process", "decision-making process"
+        ]
+
+    def test_spaced_dash_breaks_a_run(self):
+        """Test a dash with space around it separates words instead of joining them."""
+        text = "Sales grew - fast. Sales grew - slowly."
+        stream = tokenize(text)
+        spans = find_repeats(stream.tokens, None, stream.starts, stream.ends)
+        assert [text[stream.starts[a]:stream.ends[b - 1]] for a, b in spans] == ["Sales grew", "Sales grew"]
+
+    def test_lexicon_phrases_leave_no_repetition_fragments(self):
+        """Test what lexicon phrases leave of a repeat isn't shown as a one-word repetition."""
+        result = segment_text("We leverage synergy daily. They leverage synergy too.")
+        assert [seg["type"] for seg in result["segments"] if seg["type"] != "text"] == ["jargon"] * 4
+
+    def test_segments_use_repetition_type(self):
+        """Test repeats surface as 'repetition' segments."""
+        result = segment_text("Quarterly revenue growth matters. Nobody doubts quarterly revenue growth.")
+        assert sum(seg["type"] == "repetition" for seg in result["segments"]) == 2
+
+
+class TestParagraphHeatmap:
+    """Test the opt-in per-paragraph heatmap."""
+
+    def test_heatmap_is_not_a_default_check(self):
+        """Test the heatmap only runs when requested."""
+        assert "paragraphs" not in segment_text("One paragraph here.")
+
+    def test_one_row_per_paragraph(self):
+        """Test paragraph offsets, word counts and issue counts line up."""
+        text = "Short words here. And more.\n\nWe must leverage synergy to move the needle."
+        result = segment_text(text, checks=["cliche", "jargon", "ai_tell", "heatmap"])
+        paragraphs = result["paragraphs"]
+
+        assert [text[s:e] for s, e in zip(paragraphs["start"], paragraphs["end"])] == text.split("\n\n")
+        assert paragraphs["words"] == [5, 8]
+        assert paragraphs["issues"][0] == 0
+        assert paragraphs["issues"][1] >= 2
+
+    def test_grade_matches_flesch_kincaid(self):
+        """Test a paragraph's grade uses words per sentence and syllables per word."""
+        ctx = AnalysisContext("The cat sat. The dog ran.")
+        run_detectors(ctx, ["heatmap"])
+
+        # 6 words, 2 sentences, 6 syllables
+        assert ctx.results["paragraphs"]["grade"] == [round(0.39 * 3 + 11.8 * 1 - 15.59, 1)]
+
+
+class TestReadabilitySummary:
+    """Test the aggregated complex-word and long-sentence output."""
+
+    def test_complex_words_are_counted_once_each(self):
+        """Test repeated complex words collapse into one entry with a count."""
+        ctx = AnalysisContext("Remarkable ideas. Remarkable results. A remarkable, beautiful day.")
+        summary = readability_summary(ctx.tokens, ctx.sentences, text_counts(ctx.text))
+
+        assert summary["complex_words"]["word"][0] == "remarkable"
+        assert summary["complex_words"]["count"][0] == 3
+        assert "beautiful" in summary["complex_words"]["word"]
+
+    def test_long_sentences_are_offsets(self):
+        """Test long sentences come back as offsets into the original text."""
+        long_sentence = " ".join(["word"] * 25) + "."
+        text = "Short one. " + long_sentence + " Another short."
+        ctx = AnalysisContext(text)
+        summary = readability_summary(ctx.tokens, ctx.sentences, text_counts(text))
+
+        starts, ends = summary["long_sentences"]["start"], summary["long_sentences"]["end"]
+        assert [text[s:e] for s, e in zip(starts, ends)] == [long_sentence]
+
+    def test_counts_are_the_ones_behind_the_grade(self):
+        """Test the reported counts give exactly the reported grade."""
+        text = "Short one. " + " ".join(["word"] * 25) + ". Another short.\n\nA second paragraph follows here."
+        ctx = AnalysisContext(text)
+        summary = readability_summary(ctx.tokens, ctx.sentences, text_counts(text))
+
+        counts = (summary["words"], summary["sentences"], summary["syllables"])
+        assert counts == text_counts(text)
+        assert summary["readability_score"] == grade(*counts) == readability_score(text)
+
+
+class TestReadabilityScore:
+    """Test that every endpoint reports one readability grade."""
+
+    SAMPLE = (
+        "In today's fast-paced world, it's important to note that we must leverage synergy. "
+        "Moving forward, let's circle back on the deliverables and touch base next week.\n\n"
+        "Quarterly Results\n\n"
+        "Revenue grew in every region except the north, where two large customers delayed "
+        "their renewals until the spring. We expect both to close next quarter."
+    )
+
+    def test_one_paragraph_matches_textstat(self):
+        """Test a paragraph gets exactly textstat's Flesch-Kincaid grade."""
+        paragraph = self.SAMPLE.split("\n\n")[0]
+        expected = textstat.flesch_kincaid_grade(clean_text_for_readability(paragraph))
+        assert readability_score(paragraph) == expected
+
+    def test_process_and_aggregate_readability_agree(self):
+        """Test /readability?aggregate=true reports the same grade as /process."""
+        os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+        from app.routes.analysis import TextProcessRequest, get_readability
+
+        summary = get_readability(TextProcessRequest(text=self.SAMPLE), aggregate=True)
+        assert summary["readability_score"] == segment_text(self.SAMPLE)["readability_score"]
+        assert summary["readability_score"] == readability_score(self.SAMPLE)
@@ -0,0 +1,121 @@
+"""
+Unit tests for version diffing and incremental re-analysis.
+"""
+
+import os
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from app.services import incremental
+from app.services.diff import diff_documents, diff_hunks
+from app.services.incremental import split_blocks
+from app.services.readability import readability_score
+
+
+def apply_hunks(a, b, hunks):
+    out, pos = [], 0
+    for a_lo, a_hi, b_lo, b_hi in hunks:
+        out += a[pos:a_lo] + b[b_lo:b_hi]
+        pos = a_hi
+    return out + a[pos:]
+
+
+class TestDiffHunks:
+    """Test the Myers token diff."""
+
+    def test_hunks_rebuild_the_new_sequence(self):
+        """Test applying the hunks to a yields b."""
+        a = "the cat sat on the mat today".split()
+        b = "the dog sat on a mat today again".split()
+        hunks = diff_hunks(a, b)
+
+        assert apply_hunks(a, b, hunks) == b
+        assert len(hunks) == 3
+
+    def test_identical_sequences_have_no_hunks(self):
+        """Test equal inputs produce no changes."""
+        assert diff_hunks(list("abc"), list("abc")) == []
+
+
+class TestSplitBlocks:
+    """Test block tiling."""
+
+    def test_blocks_tile_the_text(self):
+        """Test blocks cover the text and split at blank lines."""
+        text = "One.\n\nTwo.\n\n\nThree."
+        blocks = split_blocks(text)
+
+        assert [text[s:e] for s, e in blocks] == ["One.\n\n", "Two.\n\n\n", "Three."]
+
+    def test_code_fence_is_not_split(self):
+        """Test a blank line inside a fenced code block doesn't start a new block."""
+        text = "Intro.\n\n```\na = 1\n\nb = 2\n```\n\nOutro."
+        assert len(split_blocks(text)) == 3
+
+
+class TestDiffDocuments:
+    """Test issue and readability deltas."""
+
+    def test_added_and_removed_issues(self):
+        """Test only issues in edited text are reported, at their own offsets."""
+        before = "We leverage it.\n\nSynergy wins."
+        after = "We use it.\n\nSynergy wins. Leverage!"
+        result = diff_documents(before, after, checks=["jargon"])
+
+        assert [(i["content"], i["start"]) for i in result["added"]] == [("Leverage", 26)]
+        assert [(i["content"], i["start"]) for i in result["removed"]] == [("leverage", 3)]
+
+    def test_unchanged_paragraphs_are_not_reanalyzed(self):
+        """Test an edit in one paragraph re-analyzes only that paragraph."""
+        paragraphs = [f"Paragraph {i} says something plain and short." for i in range(50)]
+        before = "\n\n".join(paragraphs)
+        after = before.replace("Paragraph 25 says", "Paragraph 25 now says")
+        result = diff_documents(before, after)
+
+        assert result["reanalyzed_chars"]["after"] < len(after) / 20
+        assert result["added"] == [] and result["removed"] == []
+
+    def test_paragraph_inserted_or_deleted_at_the_top(self):
+        """Test adding or removing a leading paragraph leaves the shared paragraph's issues alone."""
+        body = "We must leverage synergy."
+        edited = "Hello there.\n\n" + body
+
+        inserted = diff_documents(body, edited)
+        assert inserted["added"] == [] and inserted["removed"] == []
+        assert inserted["changes"] == [{"before": [0, 0], "after": [0, len("Hello there.")]}]
+
+        deleted = diff_documents(edited, body)
+        assert deleted["added"] == [] and deleted["removed"] == []
+        assert deleted["reanalyzed_chars"]["after"] == 0
+
+    def test_shared_blocks_reuse_cached_counts(self, monkeypatch):
+        """Test a repeat diff only counts readability for blocks it hasn't seen."""
+        paragraphs = [f"Paragraph {i} is counted just once." for i in range(20)]
+        before = "\n\n".join(paragraphs)
+        diff_documents(before, before.replace("Paragraph 3 is", "Paragraph 3 was"))
+
+        counted = []
+        monkeypatch.setattr(incremental, "block_counts", lambda text: counted.append(text) or (0, 0, 0))
+        diff_documents(before, before.replace("Paragraph 7 is", "Paragraph 7 was"))
+        assert counted == ["Paragraph 7 was counted just once.\n\n"]
+
+    def test_readability_matches_full_count(self):
+        """Test the incremental grades equal the grade /process reports for each version."""
+        before = "Short one.\n\nAnother simple line.\n\nThe end."
+        after = "Short one.\n\nAn extraordinarily complicated, multisyllabic formulation.\n\nThe end."
+        result = diff_documents(before, after)
+
+        assert result["readability"]["before"] == readability_score(before)
+        assert result["readability"]["after"] == readability_score(after)
+        assert result["readability"]["delta"] > 0
+
+    def test_readability_agrees_with_process_score(self):
+        """Test grades agree with readability_score when shared blocks hold several sentences and a link."""
+        shared = "The team met on Monday. They reviewed the plan in detail. See https://example.com/plan for notes."
+        before = f"{shared}\n\nWe ship it soon.\n\n{shared}"
+        after = f"{shared}\n\nWe ship the considerably reorganized onboarding documentation tomorrow morning.\n\n{shared}"
+        result = diff_documents(before, after)
+
+        assert result["readability"]["before"] == readability_score(before)
+        assert result["readability"]["after"] == readability_score(after)
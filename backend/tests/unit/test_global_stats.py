@@ -0,0 +1,137 @@
+"""
+Unit tests for the in-memory global stats counters.
+"""
+
+import os
+import threading
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.stats import GlobalStats
+from app.services.global_stats import GlobalCounters
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    Base.metadata.create_all(bind=engine, tables=[GlobalStats.__table__])
+    return sessionmaker(bind=engine)
+
+
+def document(em_dashes=0, cliches=0):
+    return {
+        "total_texts_cleaned": 1,
+        "total_em_dashes_found": em_dashes,
+        "total_cliches_found": cliches,
+        "total_documents_processed": 1,
+    }
+
+
+def stored(sessions):
+    db = sessions()
+    try:
+        rows = db.query(GlobalStats).all()
+        assert len(rows) == 1
+        return rows[0]
+    finally:
+        db.close()
+
+
+class TestGlobalCounters:
+    """Test accumulating and flushing global stats."""
+
+    def test_counts_accumulate_across_threads(self, sessions):
+        """Test concurrent additions land in different shards and sum exactly."""
+        counters = GlobalCounters(shards=4, session_factory=sessions)
+
+        def work():
+            for _ in range(250):
+                counters.add(document(em_dashes=2))
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        pending = counters.pending()
+        assert pending["total_documents_processed"] == 2000
+        assert pending["total_em_dashes_found"] == 4000
+
+    def test_flush_creates_then_increments_the_row(self, sessions):
+        """Test the first flush inserts the row and later ones add to it."""
+        counters = GlobalCounters(session_factory=sessions)
+        counters.add(document(em_dashes=3))
+        assert counters.flush()
+        assert stored(sessions).total_em_dashes_found == 3
+
+        counters.add(document(em_dashes=1, cliches=2))
+        counters.add(document())
+        assert counters.flush()
+        row = stored(sessions)
+        assert row.total_documents_processed == 3
+        assert row.total_em_dashes_found == 4
+        assert row.total_cliches_found == 2
+        assert not counters.pending()
+        assert not counters.flush()
+
+    def test_flush_treats_empty_columns_as_zero(self, sessions):
+        """Test a row whose columns are NULL is incremented from zero."""
+        db = sessions()
+        db.add(GlobalStats(id=1, total_em_dashes_found=None))
+        db.commit()
+        db.close()
+
+        counters = GlobalCounters(session_factory=sessions)
+        counters.add(document(em_dashes=2))
+        counters.flush()
+        assert stored(sessions).total_em_dashes_found == 2
+
+    def test_failed_flush_keeps_counts(self, sessions):
+        """Test counts survive a flush that fails and are written by the next one."""
+        def broken():
+            raise RuntimeError("database unavailable")
+
+        counters = GlobalCounters(session_factory=broken)
+        counters.add(document(em_dashes=5))
+        with pytest.raises(RuntimeError):
+            counters.flush()
+        assert counters.pending()["total_em_dashes_found"] == 5
+
+        counters._session_factory = sessions
+        counters.flush()
+        assert stored(sessions).total_em_dashes_found == 5
+
+    def test_unknown_fields_are_rejected(self, sessions):
+        """Test adding to a counter that has no column fails."""
+        counters = GlobalCounters(session_factory=sessions)
+        with pytest.raises(ValueError):
+            counters.add({"total_typos_found": 1})
+
+    def test_threshold_wakes_the_flusher(self, sessions):
+        """Test reaching the threshold flushes without waiting for the interval."""
+        counters = GlobalCounters(shards=1, flush_interval=60, flush_threshold=3, session_factory=sessions)
+        counters.start()
+        try:
+            for _ in range(3):
+                counters.add(document())
+            for _ in range(500):
+                if not counters.pending():
+                    break
+                threading.Event().wait(0.01)
+            assert stored(sessions).total_documents_processed == 3
+        finally:
+            counters.stop()
+
+    def test_stop_flushes_pending_counts(self, sessions):
+        """Test stop() writes counts added since the last flush."""
+        counters = GlobalCounters(flush_interval=60, session_factory=sessions)
+        counters.start()
+        counters.add(document(cliches=4))
+        counters.stop()
+        assert stored(sessions).total_cliches_found == 4
@@ -0,0 +1,225 @@
+"""
+Unit tests for write-behind history persistence.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.document_signature import DocumentBand, DocumentSignature
+from app.models.history import DocumentHistory
+from app.models.subscription import Subscription  # noqa: F401 - registers User's relationship target
+from app.models.user import User
+from app.services import history_writer as history_writer_module
+from app.services.history_writer import HistoryWriter
+from app.services.similarity import decode_signature, minhash
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    Base.metadata.create_all(bind=engine, tables=[
+        User.__table__, DocumentHistory.__table__, DocumentSignature.__table__, DocumentBand.__table__
+    ])
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return str(tmp_path / "spool.db")
+
+
+def history(sessions):
+    db = sessions()
+    try:
+        return [(entry.user_id, entry.original_text) for entry in db.query(DocumentHistory).order_by(DocumentHistory.id)]
+    finally:
+        db.close()
+
+
+class TestHistoryWriter:
+    """Test queueing, batching, backpressure and draining."""
+
+    def test_entries_are_written_in_batches(self, sessions, spool):
+        """Test queued entries reach document_history in order, one batch per flush."""
+        writer = HistoryWriter(spool, batch_size=2, session_factory=sessions)
+        for i in range(3):
+            writer.enqueue(1, f"Draft {i}.")
+        assert writer.pending() == 3
+        assert history(sessions) == []
+
+        assert writer.flush() == 2
+        assert writer.flush() == 1
+        assert writer.flush() == 0
+        assert writer.pending() == 0
+        assert history(sessions) == [(1, "Draft 0."), (1, "Draft 1."), (1, "Draft 2.")]
+
+    def test_signatures_are_indexed(self, sessions, spool):
+        """Test an entry's MinHash signature is stored with it."""
+        text = "A short note about the quarterly report and the delayed renewals in the north."
+        writer = HistoryWriter(spool, session_factory=sessions)
+        writer.enqueue(7, text, minhash(text))
+        writer.drain()
+
+        db = sessions()
+        try:
+            stored = db.query(DocumentSignature).one()
+            assert stored.user_id == 7
+            assert (decode_signature(stored.signature) == minhash(text)).all()
+            assert db.query(DocumentBand).count() > 0
+        finally:
+            db.close()
+
+    def test_issue_counts_are_stored(self, sessions, spool):
+        """Test an entry keeps the issue counts it was queued with."""
+        writer = HistoryWriter(spool, session_factory=sessions)
+        writer.enqueue(1, "Counted.", counts={"em_dash": 2, "jargon": 1})
+        writer.enqueue(1, "Not counted.")
+        writer.drain()
+
+        db = sessions()
+        try:
+            entries = db.query(DocumentHistory).order_by(DocumentHistory.id).all()
+            assert [entry.issue_counts for entry in entries] == [{"em_dash": 2, "jargon": 1}, None]
+        finally:
+            db.close()
+
+    def test_cleaned_text_reaches_queued_and_written_entries(self, sessions, spool):
+        """Test an entry's key finds it to store cleaned text, both while queued and once written."""
+        writer = HistoryWriter(spool, session_factory=sessions)
+        queued_key = writer.enqueue(1, "Draft one.")
+        assert writer.set_cleaned_text(queued_key, 1, "Draft one.", "Cleaned one.") is True
+        assert writer.set_cleaned_text(queued_key, 2, "Draft one.", "Not theirs.") is None
+        assert writer.set_cleaned_text(queued_key, 1, "Another text.", "Mismatch.") is False
+        writer.drain()
+
+        assert writer.set_cleaned_text(queued_key, 1, "Draft one.", "Too late.") is None
+        db = sessions()
+        try:
+            entry = db.query(DocumentHistory).filter(DocumentHistory.history_key == queued_key).one()
+            assert entry.cleaned_text == "Cleaned one."
+        finally:
+            db.close()
+
+    def test_retried_batch_skips_written_entries(self, sessions, spool):
+        """Test an entry still spooled after its batch committed isn't written twice."""
+        writer = HistoryWriter(spool, session_factory=sessions)
+        key = writer.enqueue(1, "Once only.")
+        conn = sqlite3.connect(spool)
+        leftover = conn.execute("SELECT user_id, text, created_at, history_key FROM pending").fetchone()
+        conn.close()
+        writer.drain()
+
+        # As if the process died between the commit and dropping the batch from the spool
+        conn = sqlite3.connect(spool)
+        conn.execute("INSERT INTO pending (user_id, text, created_at, history_key) VALUES (?, ?, ?, ?)", leftover)
+        conn.commit()
+        conn.close()
+        writer = HistoryWriter(spool, session_factory=sessions)
+        assert writer.pending() == 1
+        writer.drain()
+
+        assert writer.pending() == 0
+        assert history(sessions) == [(1, "Once only.")]
+        assert leftover[3] == key
+
+    def test_slow_insert_does_not_hold_the_writer(self, sessions, spool):
+        """Test a caller stuck writing to the spool doesn't block others reading the queue."""
+        writer = HistoryWriter(spool, session_factory=sessions)
+        writer.enqueue(1, "First.")
+        release = threading.Event()
+        inserting = threading.Event()
+        real = writer._insert_conn
+
+        class Stalled:
+            def execute(self, *args):
+                inserting.set()
+                release.wait(5)
+                return real.execute(*args)
+
+        writer._insert_conn = Stalled()
+        thread = threading.Thread(target=writer.enqueue, args=(1, "Second."))
+        thread.start()
+        assert inserting.wait(5)
+
+        checked = threading.Event()
+        threading.Thread(target=lambda: (writer.pending(), checked.set())).start()
+        assert checked.wait(1)
+        assert writer.pending() == 2
+
+        release.set()
+        thread.join(5)
+        writer.drain()
+        assert history(sessions) == [(1, "First."), (1, "Second.")]
+
+    def test_spool_survives_restart(self, sessions, spool):
+        """Test entries queued by one writer are written by the next one on the same spool."""
+        HistoryWriter(spool, session_factory=sessions).enqueue(1, "Left over.")
+
+        writer = HistoryWriter(spool, session_factory=sessions)
+        assert writer.pending() == 1
+        writer.drain()
+        assert history(sessions) == [(1, "Left over.")]
+
+    def test_failed_flush_keeps_entries(self, sessions, spool):
+        """Test a batch stays in the spool when its transaction fails."""
+        def broken():
+            raise RuntimeError("database unavailable")
+
+        HistoryWriter(spool, session_factory=sessions).enqueue(1, "Kept.")
+        with pytest.raises(RuntimeError):
+            HistoryWriter(spool, session_factory=broken).flush()
+
+        writer = HistoryWriter(spool, session_factory=sessions)
+        assert writer.pending() == 1
+        writer.drain()
+        assert history(sessions) == [(1, "Kept.")]
+
+    def test_full_spool_blocks_until_flushed(self, sessions, spool):
+        """Test a caller waits while the spool is full and continues once a batch is written."""
+        writer = HistoryWriter(spool, max_pending=2, batch_size=2, session_factory=sessions)
+        writer.enqueue(1, "One.")
+        writer.enqueue(1, "Two.")
+
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (writer.enqueue(1, "Three."), done.set()))
+        thread.start()
+        assert not done.wait(0.2)
+
+        writer.flush()
+        thread.join(5)
+        assert done.is_set()
+        assert writer.pending() == 1
+
+    def test_full_spool_without_flusher_writes_inline(self, sessions, spool, monkeypatch):
+        """Test a caller that waits too long writes a batch itself."""
+        monkeypatch.setattr(history_writer_module, "MAX_BLOCK_SECONDS", 0.05)
+        writer = HistoryWriter(spool, max_pending=2, batch_size=2, session_factory=sessions)
+        for i in range(3):
+            writer.enqueue(1, f"Draft {i}.")
+        assert writer.pending() == 1
+        assert len(history(sessions)) == 2
+
+    def test_stop_drains_the_spool(self, sessions, spool):
+        """Test the background flusher writes entries and stop() writes whatever is left."""
+        writer = HistoryWriter(spool, batch_size=2, flush_interval=0.05, session_factory=sessions)
+        writer.start()
+        writer.enqueue(1, "First.")
+        deadline = time.monotonic() + 5
+        while writer.pending() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert history(sessions) == [(1, "First.")]
+
+        writer.flush_interval = 60
+        writer.enqueue(1, "Second.")
+        writer.stop()
+        assert writer.pending() == 0
+        assert history(sessions) == [(1, "First."), (1, "Second.")]
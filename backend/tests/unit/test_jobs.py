@@ -0,0 +1,68 @@
+"""
+Unit tests for the background analysis job queue.
+"""
+
+import os
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from app.services import jobs
+
+
+@pytest.fixture(autouse=True)
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_QUEUE_PATH", str(tmp_path / "jobs.db"))
+
+
+class TestJobQueue:
+    """Test queueing, claiming and finishing jobs."""
+
+    def test_jobs_are_claimed_oldest_first_and_once(self):
+        """Test each queued job goes to exactly one claim, in order."""
+        first = jobs.enqueue(1, "First text.", ["em_dash"])
+        second = jobs.enqueue(1, "Second text.")
+
+        claimed = [jobs.claim(), jobs.claim(), jobs.claim()]
+        assert [job.id for job in claimed[:2]] == [first, second]
+        assert claimed[0].checks == ["em_dash"]
+        assert claimed[1].checks is None
+        assert claimed[2] is None
+
+    def test_progress_and_completion(self):
+        """Test progress is recorded and completion stores the result id."""
+        job_id = jobs.enqueue(1, "Some text.")
+        jobs.claim()
+        jobs.set_progress(job_id, 0.5)
+        assert jobs.get_job(job_id)["progress"] == 0.5
+
+        jobs.complete(job_id, "result-1")
+        job = jobs.get_job(job_id)
+        assert job["status"] == jobs.DONE
+        assert job["progress"] == 1
+        assert job["result_id"] == "result-1"
+
+    def test_expired_lease_is_requeued_then_failed(self):
+        """Test a job whose worker died is retried up to MAX_ATTEMPTS times."""
+        job_id = jobs.enqueue(1, "Some text.")
+        for _ in range(jobs.MAX_ATTEMPTS):
+            assert jobs.claim(lease_seconds=-1).id == job_id
+
+        assert jobs.claim() is None
+        job = jobs.get_job(job_id)
+        assert job["status"] == jobs.FAILED
+        assert job["error"]
+
+    def test_cancelled_job_is_not_claimed_or_completed(self):
+        """Test cancelling takes a job out of the queue and stops a running one."""
+        queued = jobs.enqueue(1, "Queued text.")
+        assert jobs.cancel(queued)
+        assert jobs.claim() is None
+
+        running = jobs.enqueue(1, "Running text.")
+        jobs.claim()
+        assert jobs.cancel(running)
+        assert jobs.set_progress(running, 0.5) is False
+        jobs.complete(running, "result-1")
+        assert jobs.get_job(running)["status"] == jobs.CANCELLED
+        assert not jobs.cancel(running)
@@ -0,0 +1,124 @@
+"""
+Unit tests for token-level phrase matching and per-user dictionaries.
+"""
+
+import os
+import pytest
+
+# Set environment variables before importing app modules that touch the database
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from app.services.lexicon import INFLECTIONS, decode_bitset, encode_bitset, ids_for_phrases, lemmatize
+from app.services.matcher import PhraseTrie, tokenize
+from app.services.segmenter import segment_text
+from app.services.user_lexicon import compile_custom_matcher
+from app.utils.cache import LRUCache
+
+
+class TestTokenize:
+    """Test the shared tokenizer."""
+
+    def test_tokens_are_lowercase_with_offsets(self):
+        """Test tokens keep offsets into the original text."""
+        text = "Move the Needle, now."
+        stream = tokenize(text)
+
+        assert stream.tokens == ["move", "the", "needle", ",", "now", "."]
+        assert text[stream.starts[2]:stream.ends[2]] == "Needle"
+
+
+class TestPhraseTrie:
+    """Test phrase trie scanning."""
+
+    def test_leftmost_longest_match(self):
+        """Test the longest phrase wins at a given position."""
+        trie = PhraseTrie([("seamless", "short"), ("seamless integration", "long")])
+        stream = tokenize("A seamless integration and seamless UX")
+
+        matches = list(trie.scan(stream.tokens))
+
+        assert [payload for _, _, payload in matches] == ["long", "short"]
+
+    def test_partial_prefix_does_not_match(self):
+        """Test an unfinished phrase prefix is not reported."""
+        trie = PhraseTrie([("move the needle", 1)])
+        assert list(trie.scan(tokenize("move the goalposts").tokens)) == []
+
+    def test_whitespace_between_tokens_is_ignored(self):
+        """Test phrases match across line breaks and repeated spaces."""
+        trie = PhraseTrie([("move the needle", 1)])
+        assert len(list(trie.scan(tokenize("move  the\nneedle").tokens))) == 1
+
+
+class TestCustomDictionary:
+    """Test per-user phrases flow through segment_text."""
+
+    def test_custom_phrase_is_flagged_with_suggestions(self):
+        """Test custom phrases become 'custom' segments with the user's suggestions."""
+        matcher = compile_custom_matcher({"per our call": ["as discussed"]})
+        result = segment_text("Per our call, the plan is set.", custom_matcher=matcher)
+
+        custom = [seg for seg in result["segments"] if seg["type"] == "custom"]
+        assert len(custom) == 1
+        assert custom[0]["content"] == "Per our call"
+        assert custom[0]["suggestions"] == ["As discussed"]
+
+    def test_no_matcher_leaves_output_unchanged(self):
+        """Test segment_text without a matcher has no custom segments."""
+        result = segment_text("Per our call, the plan is set.")
+        assert not any(seg["type"] == "custom" for seg in result["segments"])
+
+
+class TestLRUCache:
+    """Test the shared LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is evicted first."""
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.get_or_create("d", lambda: 4) == 4
+
+
+class TestInflections:
+    """Test inflection-aware lexicon matching."""
+
+    def test_inflected_jargon_is_flagged_with_suggestions(self):
+        """Test variants of a lexicon word match and borrow its suggestions."""
+        result = segment_text("We leveraged data and are optimizing workflows.")
+
+        jargon = {seg["content"]: seg for seg in result["segments"] if seg["type"] == "jargon"}
+        assert {"leveraged", "optimizing", "workflows"} <= set(jargon)
+        assert len(jargon["leveraged"]["suggestions"]) > 0
+
+    def test_function_words_are_not_inflected(self):
+        """Test short function words keep their exact form."""
+        assert "its" not in INFLECTIONS
+        assert lemmatize(["leveraging", "the"]) == ["leverage", "the"]
+
+
+class TestIgnoreList:
+    """Test ignore bitsets over global phrase IDs."""
+
+    def test_bitset_round_trip(self):
+        """Test phrase IDs survive encoding to bytes and back."""
+        ids, unmatched = ids_for_phrases(["framework", "not a lexicon phrase"])
+        mask = decode_bitset(encode_bitset(ids))
+
+        assert unmatched == ["not a lexicon phrase"]
+        assert all((mask >> pid) & 1 for pid in ids)
+
+    def test_ignored_phrase_is_not_flagged(self):
+        """Test ignored phrases are filtered after matching."""
+        text = "We need to leverage our synergy."
+        ids, _ = ids_for_phrases(["leverage"])
+        result = segment_text(text, ignore_mask=decode_bitset(encode_bitset(ids)))
+
+        flagged = [seg["content"] for seg in result["segments"] if seg["type"] == "jargon"]
+        assert "leverage" not in flagged
+        assert "synergy" in flagged
@@ -0,0 +1,53 @@
+"""
+Unit tests for the normalized matching view.
+"""
+
+import pytest
+from app.services.normalizer import normalize
+from app.services.matcher import tokenize
+
+
+class TestNormalize:
+    """Test view construction and offset mapping."""
+
+    def test_ascii_view_is_lowercase_identity(self):
+        """Test ASCII text maps offsets one-to-one."""
+        view = normalize("Hello World")
+
+        assert view.text == "hello world"
+        assert view.to_original(6, 11) == (6, 11)
+
+    def test_quotes_and_ellipsis_are_folded(self):
+        """Test curly quotes and ellipses normalize to their ASCII forms."""
+        view = normalize("It’s “done”…")
+        assert view.text == "it's \"done\"..."
+
+    def test_offsets_map_back_through_expansions(self):
+        """Test spans after an expanded character still map to the original text."""
+        text = "Wait… Straße is here"
+        view = normalize(text)
+
+        start = view.text.index("here")
+        orig_start, orig_end = view.to_original(start, start + 4)
+        assert text[orig_start:orig_end] == "here"
+
+    def test_zero_width_characters_are_dropped(self):
+        """Test zero-width characters don't split tokens."""
+        stream = tokenize("lever\u200bage")
+
+        assert stream.tokens == ["leverage"]
+        assert (stream.starts[0], stream.ends[0]) == (0, 9)
+
+
+class TestNormalizedMatching:
+    """Test lexicon matching against the normalized view."""
+
+    def test_straight_apostrophe_matches_curly_lexicon_entry(self):
+        """Test 'it's' in user text matches the lexicon's 'it’s … that…' entry."""
+        from app.services.segmenter import segment_text
+
+        text = "Remember, it's important to note that prices rose."
+        result = segment_text(text)
+
+        flagged = [seg["content"] for seg in result["segments"] if seg["type"] != "text"]
+        assert "it's important to note that" in flagged
@@ -0,0 +1,114 @@
+"""
+Unit tests for /process running its analysis alongside the tier check.
+"""
+
+import asyncio
+import os
+import pytest
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from fastapi import HTTPException
+
+from app.routes import analysis
+from app.services.admission import Overloaded
+from app.services.cancellation import CancelToken
+from app.services.history_writer import HistoryWriter
+
+
+class FakeSession:
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def process(monkeypatch):
+    """Run _process_text for a signed-in user with no cached tier hint who turns out to be Pro."""
+    runs = []
+
+    def fake_analyze(text, ignore_mask, custom_matcher, tier, checks, deadline, cancel):
+        runs.append(tier)
+        return outcomes[tier]()
+
+    outcomes = {}
+    monkeypatch.setattr(analysis, "_tier_hints", analysis.LRUCache(16))
+    monkeypatch.setattr(analysis, "_user_lexicon", lambda user, db: (0, None))
+    monkeypatch.setattr(analysis, "_authorize", lambda *args: "pro")
+    monkeypatch.setattr(analysis, "_analyze", fake_analyze)
+    monkeypatch.setattr(analysis, "_finish_process", lambda text, result, *args: result)
+
+    def run():
+        return asyncio.run(analysis._process_text(
+            analysis.TextProcessRequest(text="Some text."), None, None, None, None, False,
+            FakeSession(), SimpleNamespace(id=1), CancelToken()
+        ))
+    return run, outcomes, runs
+
+
+class TestHintedTier:
+    """Test a Pro user analyzed under a lower hinted tier isn't held to that tier."""
+
+    def test_partial_result_is_rerun_under_the_real_tier(self, process):
+        """Test a result cut off by the hinted tier's budget is redone with the Pro budget."""
+        run, outcomes, runs = process
+        outcomes["basic"] = lambda: {"segments": [], "partial": True}
+        outcomes["pro"] = lambda: {"segments": []}
+
+        assert run() == {"segments": []}
+        assert runs == ["basic", "pro"]
+
+    def test_shed_analysis_is_readmitted_under_the_real_tier(self, process):
+        """Test being shed from the hinted tier's lane doesn't fail a Pro request."""
+        run, outcomes, runs = process
+
+        def shed():
+            raise analysis.server_busy(Overloaded(1))
+        outcomes["basic"] = shed
+        outcomes["pro"] = lambda: {"segments": []}
+
+        assert run() == {"segments": []}
+        assert runs == ["basic", "pro"]
+
+    def test_complete_result_is_kept(self, process):
+        """Test a complete speculative result isn't redone."""
+        run, outcomes, runs = process
+        outcomes["basic"] = lambda: {"segments": []}
+
+        assert run() == {"segments": []}
+        assert runs == ["basic"]
+
+    def test_shed_under_the_real_tier_is_reported(self, process, monkeypatch):
+        """Test a request shed in its own tier's lane still gets the 503."""
+        run, outcomes, runs = process
+        monkeypatch.setattr(analysis, "_authorize", lambda *args: "basic")
+
+        def shed():
+            raise analysis.server_busy(Overloaded(1))
+        outcomes["basic"] = shed
+
+        with pytest.raises(HTTPException) as raised:
+            run()
+        assert raised.value.status_code == 503
+        assert runs == ["basic"]
+
+
+class TestBatchHistory:
+    """Test /process/batch queues history instead of writing it inline."""
+
+    def test_entries_are_queued_with_their_keys(self, monkeypatch, tmp_path):
+        """Test every document is queued in the spool and its result carries the entry's key."""
+        writer = HistoryWriter(str(tmp_path / "spool.db"))
+        monkeypatch.setattr(analysis, "history_writer", writer)
+        monkeypatch.setattr(analysis, "get_user_tier", lambda user, db: "pro")
+        monkeypatch.setattr(analysis, "get_user_matcher", lambda user, db: None)
+        monkeypatch.setattr(analysis, "get_ignore_mask", lambda user, db: 0)
+        monkeypatch.setattr(analysis, "update_global_stats", lambda result: None)
+
+        texts = ["We leverage synergy.", "A plain note."]
+        response = analysis.process_batch(analysis.BatchProcessRequest(texts=texts), None, FakeSession(), SimpleNamespace(id=3))
+
+        keys = [result["history_key"] for result in response["results"]]
+        assert len(set(keys)) == 2
+        assert writer.pending() == 2
+        assert writer.set_cleaned_text(keys[1], 3, texts[1], "A plain note.") is True
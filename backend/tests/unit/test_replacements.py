@@ -0,0 +1,42 @@
+"""
+Unit tests for applying chosen suggestions to a document.
+"""
+
+import pytest
+from app.services.replacements import Replacement, apply_replacements
+
+
+class TestApplyReplacements:
+    """Test the single-pass replacement builder."""
+
+    def test_replacements_apply_in_offset_order(self):
+        """Test out-of-order replacements land at their own offsets."""
+        text = "We must leverage synergy — now."
+        result = apply_replacements(text, [
+            Replacement(25, 26, ","),
+            Replacement(8, 16, "use"),
+        ])
+        assert result == "We must use synergy , now."
+
+    def test_insertion_before_replacement_at_same_offset(self):
+        """Test a zero-width insertion and a replacement can share a start offset."""
+        assert apply_replacements("abc", [Replacement(1, 2, "B"), Replacement(1, 1, "+")]) == "a+Bc"
+
+    def test_overlapping_spans_are_rejected(self):
+        """Test overlapping replacements raise ValueError."""
+        with pytest.raises(ValueError):
+            apply_replacements("abcdef", [Replacement(0, 3, "x"), Replacement(2, 4, "y")])
+
+    def test_stale_original_is_rejected(self):
+        """Test a replacement whose expected text no longer matches raises ValueError."""
+        with pytest.raises(ValueError):
+            apply_replacements("hello world", [Replacement(0, 5, "hi", original="howdy")])
+
+    def test_many_replacements_on_large_document(self):
+        """Test thousands of replacements on a long document."""
+        text = "word " * 100000
+        replacements = [Replacement(i * 5, i * 5 + 4, "WORD") for i in range(0, 100000, 10)]
+        result = apply_replacements(text, replacements)
+
+        assert len(result) == len(text)
+        assert result.count("WORD") == 10000
@@ -0,0 +1,75 @@
+"""
+Unit tests for stored results and windowed segment retrieval.
+"""
+
+import os
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from app.services import result_store
+from app.services.segmenter import segment_text
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, "RESULT_STORE_DIR", str(tmp_path))
+    result_store._cache.clear()
+    return tmp_path
+
+
+def stored(text):
+    result = segment_text(text)
+    return result, result_store.load_result(result_store.save_result(text, result, owner_id=None))
+
+
+class TestResultStore:
+    """Test persisting results and paging their segments."""
+
+    def test_window_returns_overlapping_segments_with_offsets(self):
+        """Test a character window returns exactly the segments that overlap it."""
+        text = "Plain start. We leverage synergy here. Plain end."
+        result, saved = stored(text)
+        window = saved.window(15, 25)
+
+        assert all(text[s["start"]:s["end"]] == s["content"] for s in window)
+        assert window[0]["start"] == 15 and window[-1]["end"] == 25
+        assert len(window) < len(result["segments"])
+
+    def test_window_inside_one_segment_is_clipped(self):
+        """Test a window inside a single large segment returns only the requested slice."""
+        text = " ".join(f"item{i}" for i in range(1000)) + "."
+        result, saved = stored(text)
+        assert len(result["segments"]) == 1
+
+        window = saved.window(100, 130)
+        assert window == [{
+            "start": 100, "end": 130, "segment_start": 0, "segment_end": len(text),
+            "type": "text", "content": text[100:130], "suggestions": [],
+        }]
+
+    def test_full_window_reproduces_segments(self):
+        """Test the whole-document window equals the original segment list."""
+        text = "One — two.\n\nWe leverage synergy.\n\nAt the end of the day, fine."
+        result, saved = stored(text)
+
+        window = saved.window(0, len(text))
+        assert [{k: s[k] for k in ("type", "content", "suggestions")} for s in window] == result["segments"]
+
+    def test_paragraph_range(self):
+        """Test paragraph indices map to the right character range."""
+        text = "First para.\n\nSecond para.\n\nThird para."
+        _, saved = stored(text)
+
+        start, end = saved.paragraph_range(1, 2)
+        assert text[start:end] == "Second para.\n\n"
+
+    def test_result_survives_cache_eviction(self):
+        """Test results are reloaded from disk once dropped from memory."""
+        result = segment_text("We leverage synergy.")
+        result_id = result_store.save_result("We leverage synergy.", result, owner_id=7)
+        result_store._cache.clear()
+
+        loaded = result_store.load_result(result_id)
+        assert loaded.owner_id == 7
+        assert result_store.load_result("../etc/passwd") is None
@@ -111,6 +111,16 @@ class TestSegmentText:
         
         # Suggestions should be capitalized
         assert all(suggestion[0].isupper() for suggestion in leverage_segment["suggestions"])
+
+    def test_overlapping_repetition_keeps_phrase_suggestions(self):
+        """Test a repeated phrase that overlaps a lexicon phrase doesn't cost it its suggestions."""
+        text = "We sell seamless integration platform tools. Buyers want integration platform tools."
+        result = segment_text(text)
+
+        phrase = next(seg for seg in result["segments"] if seg["content"] == "seamless integration")
+        assert phrase["type"] == "jargon"
+        assert phrase["suggestions"]
+        assert "".join(seg["content"] for seg in result["segments"]) == text
     
     def test_readability_score_calculation(self):
         """Test readability score calculation."""
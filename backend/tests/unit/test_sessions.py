@@ -0,0 +1,86 @@
+"""
+Unit tests for live analysis sessions.
+"""
+
+import os
+import random
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from app.services.incremental import analyze_block, split_blocks
+from app.services.readability import readability_score
+from app.services.sessions import EditSession, create_session, get_session
+
+
+def full_issues(text):
+    """Issues of a from-scratch analysis, as (start, end, type)."""
+    return sorted(
+        (start + issue[0], start + issue[1], issue[2])
+        for start, end in split_blocks(text)
+        for issue in analyze_block(text[start:end]).issues
+    )
+
+
+def session_issues(session):
+    return sorted((i["start"], i["end"], i["type"]) for i in session.snapshot()["issues"])
+
+
+class TestEditSession:
+    """Test incremental edits against from-scratch analysis."""
+
+    def test_edit_reports_added_and_removed_ids(self):
+        """Test replacing a jargon word removes its issues and adding one reports it."""
+        session = EditSession(1, "We leverage it.\n\nPlain text here.")
+        old_ids = {i["id"] for i in session.snapshot()["issues"]}
+
+        delta = session.apply_edit(3, 11, "use")
+        assert set(delta["removed"]) == old_ids
+        assert delta["added"] == []
+
+        delta = session.apply_edit(len(session.text), len(session.text), " Synergy!")
+        assert {i["content"] for i in delta["added"]} == {"Synergy"}
+        assert delta["version"] == 2
+
+    def test_untouched_issues_keep_their_ids(self):
+        """Test an edit elsewhere doesn't churn ids of unrelated issues."""
+        session = EditSession(1, "First leverage.\n\nMiddle.\n\nLast synergy.")
+        before = {i["content"]: i["id"] for i in session.snapshot()["issues"]}
+
+        delta = session.apply_edit(17, 23, "Centre")
+        after = {i["content"]: i["id"] for i in session.snapshot()["issues"]}
+        assert delta["added"] == [] and delta["removed"] == []
+        assert after == before
+
+    def test_random_edits_match_full_analysis(self):
+        """Test a run of random edits leaves the same issues and grade as a fresh analysis."""
+        rng = random.Random(7)
+        pieces = ["leverage ", "synergy ", "— ", "\n\n", "at the end of the day ", "plain words. ", "```\n", "x"]
+        session = EditSession(1, "Start here. We leverage synergy.\n\nAnother paragraph — with a dash.")
+        for _ in range(200):
+            start = rng.randint(0, len(session.text))
+            end = min(len(session.text), start + rng.randint(0, 12))
+            session.apply_edit(start, end, rng.choice(pieces))
+
+        assert session_issues(session) == full_issues(session.text)
+        assert session.readability() == readability_score(session.text)
+
+    def test_readability_agrees_with_process_score(self):
+        """Test the session grade equals the grade /process reports, before and after an edit."""
+        text = ("The quarterly report is late again. Finance needs two more days to close the books.\n\n"
+                "Marketing will present the new campaign on Friday. Everyone should attend.")
+        session = EditSession(1, text)
+        assert session.readability() == readability_score(text)
+
+        session.apply_edit(text.index("Everyone"), len(text), "Attendance is mandatory for departmental representatives.")
+        assert session.readability() == readability_score(session.text)
+
+
+class TestSessionStore:
+    """Test session lookup."""
+
+    def test_sessions_are_scoped_to_their_user(self):
+        """Test another user can't resume a session."""
+        session = create_session(1, "Some text.")
+        assert get_session(session.id, 1) is session
+        assert get_session(session.id, 2) is None
@@ -0,0 +1,88 @@
+"""
+Unit tests for MinHash/LSH near-duplicate detection.
+"""
+
+import os
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.document_signature import DocumentBand, DocumentSignature
+from app.models.history import DocumentHistory
+from app.models.subscription import Subscription  # noqa: F401 - registers User's relationship target
+from app.models.user import User
+from app.services.similarity import (
+    BANDS, NUM_PERM, band_buckets, estimate_similarity, find_similar, index_document, minhash, remove_document
+)
+
+DRAFT = (
+    "Our quarterly report shows revenue grew in every region except the north, "
+    "where two large customers delayed renewals until the spring. We expect the "
+    "delayed renewals to close next quarter and have hired one more account manager "
+    "to cover the northern accounts while the team lead is on leave."
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[
+        User.__table__, DocumentHistory.__table__, DocumentSignature.__table__, DocumentBand.__table__
+    ])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def save(db, user_id, text):
+    entry = DocumentHistory(user_id=user_id, original_text=text, cleaned_text=text)
+    db.add(entry)
+    db.flush()
+    index_document(entry.id, user_id, minhash(text), db)
+    return entry.id
+
+
+class TestMinHash:
+    """Test signatures and similarity estimates."""
+
+    def test_signature_is_stable_and_compact(self):
+        """Test the same text always yields the same 128-value signature."""
+        signature = minhash(DRAFT)
+        assert signature.shape == (NUM_PERM,)
+        assert (signature == minhash(DRAFT.upper())).all()
+        assert len(band_buckets(signature)) == BANDS
+
+    def test_small_edit_stays_similar(self):
+        """Test a lightly edited draft scores far above an unrelated text."""
+        edited = DRAFT.replace("one more account manager", "another account manager")
+        unrelated = "The cat slept on the warm windowsill all afternoon while rain fell outside."
+
+        assert estimate_similarity(minhash(DRAFT), minhash(edited)) > 0.7
+        assert estimate_similarity(minhash(DRAFT), minhash(unrelated)) < 0.2
+
+    def test_text_without_words_has_no_signature(self):
+        """Test punctuation-only input is not indexed."""
+        assert minhash("— ... !!") is None
+
+
+class TestFindSimilar:
+    """Test the LSH index lookup."""
+
+    def test_finds_near_duplicate_for_same_user_only(self, db):
+        """Test an edited draft finds the original, and other users' history is invisible."""
+        original_id = save(db, 1, DRAFT)
+        save(db, 2, DRAFT)
+        save(db, 1, "Completely different notes about gardening, tomatoes and the summer heat wave.")
+
+        matches = find_similar(1, minhash(DRAFT.replace("spring", "summer")), db)
+        assert [history_id for history_id, _ in matches] == [original_id]
+
+    def test_removed_document_is_not_returned(self, db):
+        """Test deleting a history entry drops it from the index."""
+        history_id = save(db, 1, DRAFT)
+        remove_document(history_id, db)
+        assert find_similar(1, minhash(DRAFT), db) == []
@@ -0,0 +1,120 @@
+"""
+Unit tests for single-flight request coalescing.
+"""
+
+import threading
+import time
+from app.services.cancellation import CancelToken
+from app.services.singleflight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, n):
+    results = [None] * n
+    errors = [None] * n
+
+    def worker(i):
+        try:
+            results[i] = flight.do(key, fn)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class TestSingleFlight:
+    """Test deduplication of identical in-flight calls."""
+
+    def test_concurrent_calls_share_one_run(self):
+        """Test callers arriving while a call runs wait for it and share its result."""
+        flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"value": 42}
+
+        results, errors = run_concurrently(flight, "key", slow, 5)
+        assert errors == [None] * 5
+        assert len(calls) == 1
+        assert all(result == {"value": 42} for result, _ in results)
+        assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+        assert len(flight) == 0
+
+    def test_errors_reach_every_waiter(self):
+        """Test an exception in the shared call is raised for each caller."""
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.2)
+            raise ValueError("boom")
+
+        _, errors = run_concurrently(flight, "key", failing, 3)
+        assert all(isinstance(e, ValueError) for e in errors)
+
+    def test_sequential_calls_are_not_cached(self):
+        """Test a finished call is not reused by later callers."""
+        flight = SingleFlight()
+        assert flight.do("key", lambda: 1) == (1, False)
+        assert flight.do("key", lambda: 2) == (2, False)
+
+    def test_shared_work_is_cancelled_only_when_every_caller_is(self):
+        """Test the shared token stays live while any caller still wants the result."""
+        flight = SingleFlight()
+        leader, follower = CancelToken(), CancelToken()
+        seen = []
+
+        def work(shared):
+            time.sleep(0.1)
+            leader.cancel()
+            seen.append(shared.is_cancelled())
+            follower.cancel()
+            seen.append(shared.is_cancelled())
+            return "done"
+
+        def follow():
+            time.sleep(0.02)
+            try:
+                flight.do("key", work, follower)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=follow)
+        thread.start()
+        assert flight.do("key", work, leader) == ("done", False)
+        thread.join()
+        assert seen == [False, True]
+
+    def test_waiters_retry_on_listed_errors(self):
+        """Test a waiter whose leader fails with a retry_on error runs the call itself."""
+        flight = SingleFlight()
+        calls = []
+
+        def shed_first():
+            calls.append(1)
+            time.sleep(0.2)
+            if len(calls) == 1:
+                raise OverflowError("shed")
+            return "done"
+
+        leader_errors = []
+
+        def lead():
+            try:
+                flight.do("key", shed_first, retry_on=(OverflowError,))
+            except OverflowError as e:
+                leader_errors.append(e)
+
+        thread = threading.Thread(target=lead)
+        thread.start()
+        time.sleep(0.05)
+        assert flight.do("key", shed_first, retry_on=(OverflowError,)) == ("done", False)
+        thread.join()
+
+        assert len(calls) == 2
+        assert len(leader_errors) == 1
@@ -0,0 +1,48 @@
+"""
+Unit tests for the Markdown/HTML structural pre-pass.
+"""
+
+import pytest
+from app.services.structure import find_excluded_ranges, strip_excluded
+from app.services.segmenter import segment_text
+
+
+class TestExcludedRanges:
+    """Test detection of non-prose regions."""
+
+    def test_plain_prose_has_no_ranges(self):
+        """Test prose without markup skips the scan."""
+        assert find_excluded_ranges("Just some words.") == []
+
+    def test_code_url_and_tags_are_excluded(self):
+        """Test fences, inline code, URLs and tags are all found."""
+        text = "See `leverage()` at https://x.io/synergy <b>now</b>\n```\nsynergy = 1\n```\n"
+        excluded = [text[start:end] for start, end in find_excluded_ranges(text)]
+
+        assert "`leverage()`" in excluded
+        assert "https://x.io/synergy" in excluded
+        assert "<b>" in excluded and "</b>" in excluded
+        assert any(chunk.startswith("```") and "synergy = 1" in chunk for chunk in excluded)
+
+    def test_strip_excluded_keeps_prose(self):
+        """Test stripping leaves only the prose runs."""
+        text = "Read <a href='#'>this</a> today."
+        assert strip_excluded(text, find_excluded_ranges(text)) == "Read  this  today."
+
+
+class TestSegmentSkipsExcluded:
+    """Test segment_text ignores non-prose regions."""
+
+    def test_jargon_in_code_is_not_flagged(self):
+        """Test lexicon words inside code and URLs are skipped, prose still matches."""
+        text = "We leverage it.\n```python\nleverage = synergy()\n```\nVisit https://a.io/synergy"
+        result = segment_text(text)
+
+        flagged = [seg["content"] for seg in result["segments"] if seg["type"] == "jargon"]
+        assert flagged == ["leverage"]
+        assert "".join(seg["content"] for seg in result["segments"]) == text
+
+    def test_em_dash_in_inline_code_is_not_flagged(self):
+        """Test em-dashes inside inline code are skipped."""
+        result = segment_text("Use `a—b` here.")
+        assert not any(seg["type"] == "em_dash" for seg in result["segments"])
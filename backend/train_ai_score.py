@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Train the AI-likeness model used by the ai_score check.
+
+Input is a JSONL file with one {"text": ..., "label": 0|1} object per line
+(1 = AI-generated). Features are built exactly as at inference time, so the
+saved weights line up with app/services/ai_score.py. The model is saved
+uncompressed, which lets the API memory-map it.
+
+Usage: python train_ai_score.py corpus.jsonl [output_path]
+"""
+
+import json
+import sys
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+from app.services.ai_score import COUNT_FEATURES, MODEL_PATH, N_HASH_FEATURES, feature_matrix
+from app.services.detectors import AnalysisContext, signal_counts
+
+
+def load_corpus(path: str):
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                texts.append(row["text"])
+                labels.append(int(row["label"]))
+    return texts, np.array(labels)
+
+
+def build_features(texts):
+    contexts = [AnalysisContext(text) for text in texts]
+    return feature_matrix([ctx.prose for ctx in contexts], [signal_counts(ctx) for ctx in contexts])
+
+
+def train(texts, labels, C: float = 4.0) -> dict:
+    """Fit a logistic model and return the weights in the format ai_score loads."""
+    classifier = LogisticRegression(C=C, max_iter=1000)
+    classifier.fit(build_features(texts), labels)
+    return {
+        "coef": np.ascontiguousarray(classifier.coef_.ravel(), dtype=np.float64),
+        "intercept": float(classifier.intercept_[0]),
+        "n_hash_features": N_HASH_FEATURES,
+        "count_features": COUNT_FEATURES,
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    output_path = sys.argv[2] if len(sys.argv) > 2 else MODEL_PATH
+
+    texts, labels = load_corpus(sys.argv[1])
+    print(f"Loaded {len(texts)} documents ({int(labels.sum())} AI, {int(len(labels) - labels.sum())} human)")
+
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, labels, test_size=0.2, random_state=42, stratify=labels
+    )
+    model = train(train_texts, train_labels)
+    logits = build_features(test_texts) @ model["coef"] + model["intercept"]
+    accuracy = float(((logits > 0).astype(int) == test_labels).mean())
+    print(f"Held-out accuracy: {accuracy:.3f}")
+
+    # Refit on everything before saving
+    model = train(texts, labels)
+    joblib.dump(model, output_path)
+    print(f"Saved model to {output_path}")
+
+
+if __name__ == "__main__":
+    main()